@@ -0,0 +1,333 @@
+"""Monte Carlo balance runs for Skibidi City Showdown.
+
+Plays many complete headless games in parallel, each driven by a scripted bot,
+and aggregates per-wave clear rates, time to clear, damage taken per form and
+score curves. Tuning constants from ``main`` can be overridden per run.
+
+    python balance_sim.py --games 2000
+    python balance_sim.py --games 500 --set ENEMY_SPAWN_TIME=1800 --set PUNCH_DAMAGE_CAMERAMAN=3
+"""
+
+import argparse
+import csv
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import pygame
+
+import main
+from main import (
+    ACTION_FLASH,
+    ACTION_LEFT,
+    ACTION_PUNCH,
+    ACTION_RIGHT,
+    ACTION_SPECIAL,
+    ACTION_UPGRADE,
+    ACTION_UPGRADE_ALT,
+    FORM_MAX_HEALTH,
+    MAX_WAVE,
+    SCREEN_WIDTH,
+    SIM_DT,
+    Game,
+)
+
+# Distance ahead of the player covered by the punch hitbox (see CameraMan.punch_hitbox).
+PUNCH_NEAR = 28 + main.PUNCH_RANGE // 2 - 13
+PUNCH_FAR = 28 + main.PUNCH_RANGE // 2 + 13
+SPECIAL_REACH = {
+    "soundwave": 16 + main.SOUNDWAVE_RANGE,
+    "kick": 24 + main.KICK_RANGE,
+    "stab": 22 + main.STAB_RANGE,
+}
+SCORE_SAMPLE_TICKS = round(60 * 1000 / SIM_DT)  # one score-curve sample per simulated minute
+# The bot walks back to mid-street at the start of each wave; this close counts as arrived.
+REGROUP_SLACK = 24
+
+
+class BotPolicy:
+    """Scripted input source: close to punch range, punch, fire F/X off cooldown, upgrade when affordable.
+
+    ``prefer`` picks the branch after TV Man: "speaker" saves up for Large
+    Speakerman, "camera" takes Large Cameraman as soon as it is affordable.
+    Each wave opens with a walk back to mid-street so clear times do not
+    depend on where the previous wave happened to end (the player cannot move
+    during intermission, and the wave-5 Saint spawns on the first tick).
+    """
+
+    def __init__(self, game: Game, prefer: str = "speaker") -> None:
+        self.game = game
+        self.prefer = prefer
+        self.regrouped_wave = 0
+
+    def regroup_buttons(self) -> int:
+        """Movement toward mid-street until the bot gets there or a toilet is already in reach."""
+        game, player = self.game, self.game.player
+        if self.regrouped_wave == game.wave:
+            return 0
+        home = SCREEN_WIDTH / 2 - player.position.x
+        in_reach = any(abs(e.position.x - player.position.x) <= PUNCH_FAR for e in game.enemies)
+        if abs(home) <= REGROUP_SLACK or in_reach:
+            self.regrouped_wave = game.wave
+            return 0
+        return ACTION_RIGHT if home > 0 else ACTION_LEFT
+
+    def upgrade_buttons(self) -> int:
+        form, score = self.game.player.form, self.game.score
+        if form == "cameraman" and score >= main.SPEAKERMAN_SCORE_COST:
+            return ACTION_UPGRADE
+        if form == "speakerman" and score >= main.TVMAN_SCORE_COST:
+            return ACTION_UPGRADE
+        if form == "tvman":
+            if self.prefer == "speaker":
+                return ACTION_UPGRADE_ALT if score >= main.LARGE_SPEAKER_SCORE_COST else 0
+            return ACTION_UPGRADE if score >= main.LARGE_CAM_SCORE_COST else 0
+        if form == "large_cameraman" and self.prefer == "speaker" and score >= main.LARGE_SPEAKER_SCORE_COST:
+            return ACTION_UPGRADE
+        return 0
+
+    def __call__(self) -> int:
+        game, player = self.game, self.game.player
+        if game.state != "playing":
+            return 0
+        regroup = self.regroup_buttons()
+        if regroup or not game.enemies:
+            return regroup
+        buttons = self.upgrade_buttons()
+        target = min(game.enemies, key=lambda e: abs(e.position.x - player.position.x))
+        dx = target.position.x - player.position.x
+        distance = abs(dx)
+        toward = ACTION_RIGHT if dx > 0 else ACTION_LEFT
+        ahead = (dx >= 0) == (player.facing.x >= 0)
+
+        if distance > PUNCH_FAR:
+            buttons |= toward
+        elif distance < PUNCH_NEAR:
+            buttons |= ACTION_LEFT if dx > 0 else ACTION_RIGHT  # back off to get the hitbox on it
+        elif not ahead:
+            buttons |= toward  # one step to turn around
+        elif player.can_punch():
+            buttons |= ACTION_PUNCH
+
+        profile = player.profile
+        if player.can_flash():
+            if profile.flash == "blast":
+                if distance <= main.ULTRA_BLAST_RADIUS:
+                    buttons |= ACTION_FLASH
+            elif ahead and distance <= main.FLASH_BEAM_LENGTH:
+                buttons |= ACTION_FLASH
+
+        if profile.special in SPECIAL_REACH and ahead and distance <= SPECIAL_REACH[profile.special]:
+            if profile.special == "soundwave":
+                ready = player.can_soundwave()
+            elif profile.special == "kick":
+                ready = player.can_kick()
+            else:
+                ready = player.can_stab()
+            if ready:
+                buttons |= ACTION_SPECIAL
+        return buttons
+
+
+def play_game(game: Game, seed: int, max_ticks: int, prefer: str) -> Dict[str, object]:
+    """Play one seeded session to victory, defeat or ``max_ticks`` and return its per-game stats."""
+    game.reset(seed=seed)
+    game.input_source = BotPolicy(game, prefer)
+    wave_start = {1: 0}
+    clear_ms: Dict[int, int] = {}
+    score_at_clear: Dict[int, int] = {}
+    damage: Dict[str, int] = defaultdict(int)
+    form_ticks: Dict[str, int] = defaultdict(int)
+    score_curve = [0]
+    while game.tick < max_ticks and not game.game_over:
+        state, wave = game.state, game.wave
+        form, health = game.player.form, game.player.health
+        game.update(SIM_DT)
+        form_ticks[form] += 1
+        if game.player.form == form and game.player.health < health:
+            damage[form] += health - game.player.health
+        if state == "playing" and game.state in ("intermission", "victory"):
+            clear_ms[wave] = round((game.tick - wave_start[wave]) * SIM_DT)
+            score_at_clear[wave] = game.score
+        if game.wave != wave:
+            wave_start[game.wave] = game.tick
+        if game.tick % SCORE_SAMPLE_TICKS == 0:
+            score_curve.append(game.score)
+    outcome = game.state if game.game_over else "timeout"
+    return {
+        "seed": seed,
+        "outcome": outcome,
+        "final_wave": game.wave,
+        "score": game.score,
+        "ticks": game.tick,
+        "waves_reached": sorted(wave_start),
+        "clear_ms": clear_ms,
+        "score_at_clear": score_at_clear,
+        "damage": dict(damage),
+        "form_ticks": dict(form_ticks),
+        "score_curve": score_curve,
+    }
+
+
+def apply_overrides(overrides: Dict[str, float]) -> None:
+    for name, value in overrides.items():
+        setattr(main, name, value)
+    if overrides:
+        # Form profiles capture damage, cooldown and cost constants when built.
+        main.FORM_PROFILES.update(main.build_form_profiles())
+
+
+def run_batch(
+    seeds: List[int], max_ticks: int, prefer: str, overrides: Dict[str, float], vectorized: bool
+) -> List[Dict[str, object]]:
+    """Worker entry point: one Game per process, reset for every seed in the batch."""
+    apply_overrides(overrides)
+    game = Game(headless=True, vectorized=vectorized)
+    try:
+        return [play_game(game, seed, max_ticks, prefer) for seed in seeds]
+    finally:
+        pygame.quit()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def aggregate(games: List[Dict[str, object]]) -> Dict[str, object]:
+    waves = []
+    for wave in range(1, MAX_WAVE + 1):
+        reached = [g for g in games if wave in g["waves_reached"]]
+        times = [g["clear_ms"][wave] / 1000 for g in reached if wave in g["clear_ms"]]
+        scores = [g["score_at_clear"][wave] for g in reached if wave in g["score_at_clear"]]
+        waves.append({
+            "wave": wave,
+            "reached": len(reached),
+            "cleared": len(times),
+            "clear_rate": len(times) / len(reached) if reached else 0.0,
+            "mean_clear_s": sum(times) / len(times) if times else 0.0,
+            "p50_clear_s": percentile(times, 50),
+            "p90_clear_s": percentile(times, 90),
+            "mean_score_at_clear": sum(scores) / len(scores) if scores else 0.0,
+        })
+
+    forms = {}
+    for form in FORM_MAX_HEALTH:
+        taken = sum(g["damage"].get(form, 0) for g in games)
+        minutes = sum(g["form_ticks"].get(form, 0) for g in games) * SIM_DT / 60000
+        forms[form] = {
+            "games": sum(1 for g in games if form in g["form_ticks"]),
+            "damage_taken": taken,
+            "minutes_played": minutes,
+            "damage_per_minute": taken / minutes if minutes else 0.0,
+        }
+
+    longest = max((len(g["score_curve"]) for g in games), default=0)
+    # Finished games keep their final score for the remaining samples.
+    curve = [
+        sum(g["score_curve"][min(i, len(g["score_curve"]) - 1)] for g in games) / len(games)
+        for i in range(longest)
+    ]
+    outcomes: Dict[str, int] = defaultdict(int)
+    for g in games:
+        outcomes[g["outcome"]] += 1
+    return {
+        "games": len(games),
+        "outcomes": dict(outcomes),
+        "mean_score": sum(g["score"] for g in games) / len(games) if games else 0.0,
+        "waves": waves,
+        "forms": forms,
+        "mean_score_by_minute": curve,
+    }
+
+
+def write_csv(path: str, games: List[Dict[str, object]]) -> None:
+    """One row per game, with per-wave clear times and per-form damage as columns."""
+    waves = range(1, MAX_WAVE + 1)
+    header = ["seed", "outcome", "final_wave", "score", "ticks"]
+    header += [f"clear_s_w{wave}" for wave in waves]
+    header += [f"damage_{form}" for form in FORM_MAX_HEALTH]
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        for g in games:
+            row = [g["seed"], g["outcome"], g["final_wave"], g["score"], g["ticks"]]
+            row += [g["clear_ms"][wave] / 1000 if wave in g["clear_ms"] else "" for wave in waves]
+            row += [g["damage"].get(form, 0) for form in FORM_MAX_HEALTH]
+            writer.writerow(row)
+
+
+def parse_override(text: str) -> tuple[str, float]:
+    name, _, value = text.partition("=")
+    current = getattr(main, name, None)
+    if not name.isupper() or not isinstance(current, (int, float)) or isinstance(current, bool):
+        raise argparse.ArgumentTypeError(f"{name!r} is not a numeric tuning constant in main.py")
+    try:
+        return name, type(current)(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a valid {type(current).__name__} for {name}")
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Play many bot-driven headless games and report balance stats.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--max-minutes", type=float, default=20, help="simulated minutes before a game counts as a timeout")
+    parser.add_argument("--prefer", choices=("speaker", "camera"), default="speaker", help="upgrade branch after TV Man")
+    parser.add_argument("--set", dest="overrides", action="append", type=parse_override, default=[],
+                        metavar="NAME=VALUE", help="override a tuning constant from main.py (repeatable)")
+    parser.add_argument("--vectorized", action="store_true", help="use the NumPy enemy store")
+    parser.add_argument("--json", default="balance_report.json", help="aggregate report path")
+    parser.add_argument("--csv", default="balance_games.csv", help="per-game table path")
+    return parser.parse_args(argv)
+
+
+def run_simulation() -> None:
+    args = parse_args()
+    overrides = dict(args.overrides)
+    max_ticks = int(args.max_minutes * 60000 / SIM_DT)
+    seeds = list(range(args.seed, args.seed + args.games))
+    jobs = max(1, min(args.jobs, len(seeds)))
+    chunk = max(1, len(seeds) // (jobs * 4))
+    batches = [seeds[i:i + chunk] for i in range(0, len(seeds), chunk)]
+
+    games: List[Dict[str, object]] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_batch, batch, max_ticks, args.prefer, overrides, args.vectorized) for batch in batches]
+        for future in futures:
+            games.extend(future.result())
+            print(f"\r{len(games)}/{len(seeds)} games", end="", flush=True)
+    print()
+
+    report = aggregate(games)
+    report["settings"] = {
+        "seed": args.seed,
+        "max_minutes": args.max_minutes,
+        "prefer": args.prefer,
+        "overrides": overrides,
+        "vectorized": args.vectorized,
+    }
+    print(f"{'wave':>4} {'reached':>8} {'clear%':>7} {'mean s':>7} {'p90 s':>7} {'score':>7}")
+    for wave in report["waves"]:
+        print(
+            f"{wave['wave']:>4} {wave['reached']:>8} {wave['clear_rate'] * 100:>6.1f}% "
+            f"{wave['mean_clear_s']:>7.1f} {wave['p90_clear_s']:>7.1f} {wave['mean_score_at_clear']:>7.1f}"
+        )
+    for form, stats in report["forms"].items():
+        print(f"{form:<17} damage/min {stats['damage_per_minute']:.2f} over {stats['minutes_played']:.1f} min")
+    print("outcomes: " + ", ".join(f"{name}={count}" for name, count in sorted(report["outcomes"].items())))
+
+    with open(args.json, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    write_csv(args.csv, games)
+    print(f"Wrote {args.json} and {args.csv}")
+
+
+if __name__ == "__main__":
+    run_simulation()
@@ -0,0 +1,226 @@
+"""Scenario benchmarks for Skibidi City Showdown.
+
+Each scenario builds a game state directly, then times ``Game.update`` and
+``Game.draw`` separately for a fixed number of frames using the fixed
+simulation step. Results are printed as a table and written to JSON.
+
+    python bench.py
+    python bench.py --scenario wave8_horde --frames 600 --out bench_results.json
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+import pygame
+
+import main
+from main import ACTION_FLASH, SIM_DT, Game
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": sum(samples) / len(samples) if samples else 0.0,
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples) if samples else 0.0,
+    }
+
+
+def fill_horde(game: Game, count: int, labels: set[str] | None = None) -> None:
+    """Spawn through ``Game.spawn_enemy`` until ``count`` toilets (optionally of the given labels) exist."""
+    for enemy in [e for e in game.enemies if labels is not None and e.label not in labels]:
+        game.remove_enemy(enemy)
+    while len(game.enemies) < count:
+        before = len(game.enemies)
+        game.spawn_enemy()
+        if len(game.enemies) == before:
+            break
+        enemy = game.enemies[-1]
+        if labels is not None and enemy.label not in labels:
+            game.remove_enemy(enemy)
+            continue
+        enemy.position = pygame.Vector2(game.rng.uniform(main.SCREEN_WIDTH * 0.3, main.SCREEN_WIDTH + 400), enemy.position.y)
+
+
+def keep_player_alive(game: Game) -> None:
+    game.player.health = main.FORM_MAX_HEALTH[game.player.form]
+    for ally in game.allies:
+        ally.health = main.FORM_MAX_HEALTH["cameraman"]
+
+
+def setup_wave8_horde(game: Game) -> Callable[[Game], None]:
+    game.start_wave(8)
+    fill_horde(game, 200, {"Large", "Police"})
+
+    def per_frame(game: Game) -> None:
+        keep_player_alive(game)
+
+    return per_frame
+
+
+def setup_center_allies(game: Game) -> Callable[[Game], None]:
+    game.start_wave(7)
+    fill_horde(game, 80)
+
+    def per_frame(game: Game) -> None:
+        keep_player_alive(game)
+        if len(game.enemies) < 80:
+            fill_horde(game, 80)
+
+    return per_frame
+
+
+def setup_center_squad(game: Game) -> Callable[[Game], None]:
+    game.squad_size = 24
+    game.start_wave(7)
+    fill_horde(game, 150)
+
+    def per_frame(game: Game) -> None:
+        keep_player_alive(game)
+        if len(game.enemies) < 150:
+            fill_horde(game, 150)
+
+    return per_frame
+
+
+def setup_ultra_blast_spam(game: Game) -> Callable[[Game], None]:
+    game.player.upgrade_to_large_speakerman()
+    game.start_wave(8)
+    fill_horde(game, 150)
+    game.input_source = lambda: ACTION_FLASH
+
+    def per_frame(game: Game) -> None:
+        keep_player_alive(game)
+        game.player.flash_cooldown_timer = 0
+        if len(game.enemies) < 150:
+            fill_horde(game, 150)
+
+    return per_frame
+
+
+def setup_horde_2000(game: Game) -> Callable[[Game], None]:
+    game.start_wave(8)
+    fill_horde(game, 2000)
+
+    def per_frame(game: Game) -> None:
+        keep_player_alive(game)
+
+    return per_frame
+
+
+def setup_endless_horde(game: Game) -> Callable[[Game], None]:
+    game.endless = True
+    game.start_wave(24)
+    fill_horde(game, main.ENDLESS_ENTITY_BUDGET)
+
+    def per_frame(game: Game) -> None:
+        keep_player_alive(game)
+        if len(game.enemies) < main.ENDLESS_ENTITY_BUDGET:
+            fill_horde(game, main.ENDLESS_ENTITY_BUDGET)
+
+    return per_frame
+
+
+SCENARIOS: Dict[str, Callable[[Game], Callable[[Game], None]]] = {
+    "wave8_horde": setup_wave8_horde,
+    "center_allies": setup_center_allies,
+    "center_squad": setup_center_squad,
+    "ultra_blast_spam": setup_ultra_blast_spam,
+    "horde_2000": setup_horde_2000,
+    "endless_horde": setup_endless_horde,
+}
+
+
+def run_scenario(
+    name: str,
+    frames: int,
+    warmup: int,
+    seed: int,
+    vectorized: bool = False,
+    quality: int = 0,
+    render_scale: float = 1.0,
+) -> Dict[str, object]:
+    game = Game(headless=True, vectorized=vectorized, seed=seed, quality=quality, render_scale=render_scale)
+    if main.np is not None:
+        game.particles = main.ParticleSystem()  # headless games skip particles, but the benchmark draws
+    game.reset()
+    game.input_source = lambda: 0
+    per_frame = SCENARIOS[name](game)
+
+    update_ms: List[float] = []
+    draw_ms: List[float] = []
+    enemy_counts: List[int] = []
+    for frame in range(warmup + frames):
+        per_frame(game)
+        start = time.perf_counter()
+        game.update(SIM_DT)
+        mid = time.perf_counter()
+        game.draw(False)
+        end = time.perf_counter()
+        if frame >= warmup:
+            update_ms.append((mid - start) * 1000)
+            draw_ms.append((end - mid) * 1000)
+            enemy_counts.append(len(game.enemies))
+
+    return {
+        "scenario": name,
+        "vectorized": vectorized,
+        "quality": quality,
+        "render_scale": render_scale,
+        "frames": frames,
+        "mean_enemies": sum(enemy_counts) / len(enemy_counts) if enemy_counts else 0,
+        "update": summarize(update_ms),
+        "draw": summarize(draw_ms),
+    }
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run scripted stress scenarios and report frame times.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run (repeatable)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--vectorized", action="store_true", help="use the NumPy enemy store")
+    parser.add_argument(
+        "--quality", type=int, default=0, choices=range(len(main.QUALITY_STEPS) + 1),
+        help="draw with this many quality steps dropped",
+    )
+    parser.add_argument("--render-scale", type=float, default=1.0, help="render the scene at this fraction of full size")
+    return parser.parse_args(argv)
+
+
+def run_benchmarks() -> None:
+    args = parse_args()
+    names = args.scenario or list(SCENARIOS)
+    results = [
+        run_scenario(name, args.frames, args.warmup, args.seed, args.vectorized, args.quality, args.render_scale)
+        for name in names
+    ]
+    pygame.quit()
+
+    print(f"{'scenario':<18} {'enemies':>8} {'phase':>7} {'mean':>8} {'p95':>8} {'p99':>8}")
+    for result in results:
+        for phase in ("update", "draw"):
+            stats = result[phase]
+            print(
+                f"{result['scenario']:<18} {result['mean_enemies']:>8.0f} {phase:>7} "
+                f"{stats['mean_ms']:>8.3f} {stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f}"
+            )
+    with open(args.out, "w", encoding="utf-8") as handle:
+        json.dump({"results": results}, handle, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    run_benchmarks()
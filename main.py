@@ -1,25 +1,34 @@
+import argparse
+import asyncio
+import json
 import math
+import os
 import random
+import struct
 import sys
-from dataclasses import dataclass
-from typing import List
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, fields, replace
+from typing import Callable, ClassVar, List
 
 import pygame
 
+try:
+    import numpy as np
+except ImportError:  # optional: only the vectorised enemy store and particles need it
+    np = None
+
 # Game constants
 SCREEN_WIDTH = 960
 SCREEN_HEIGHT = 640
 FPS = 60
+SIM_DT = 1000 / FPS  # milliseconds per simulation tick, in real time and on every game timer; movement is per tick
+MAX_FRAME_TIME = 250  # milliseconds of simulation a single rendered frame may catch up on
 CITY_GRID_SIZE = 80
 PLAYER_SPEED = 4
 MAX_WAVE = 8
-FORM_MAX_HEALTH = {
-    "cameraman": 5,
-    "speakerman": 6,
-    "tvman": 8,
-    "large_cameraman": 9,
-    "large_speakerman": 10,
-}
 PLAYER_GROUND_Y = SCREEN_HEIGHT - 104
 PUNCH_RANGE = 60
 PUNCH_COOLDOWN = 280  # milliseconds
@@ -63,42 +72,313 @@ ALLY_PUNCH_DAMAGE = 4
 ALLY_FLASH_RANGE = 260
 ALLY_PUNCH_RANGE = 82
 ALLY_STAND_DISTANCE = 120
+ALLY_SQUAD_SIZE = 2  # allies that join you in the center city
+ALLY_RETARGET_INTERVAL = 250  # milliseconds between target picks per ally, staggered across the squad
+ALLY_SEARCH_RADIUS = 360  # grid search radius for targets before falling back to every enemy
+ALLY_CROWD_PENALTY = 60  # extra pixels of distance per ally already on a target
+ALLY_SPACING = 40  # minimum street gap between allies
 ENEMY_CONTACT_DISTANCE = 26
 CITY_SCROLL_SPEED = 70  # pixels per second
 CITY_SCROLL_SPEED_CENTER = 40
 INTERMISSION_TIME = 2200  # milliseconds between waves
 PLAYER_DAMAGE_COOLDOWN = 1200  # milliseconds
+ENEMY_GRID_CELL = 64  # pixels per spatial index cell for enemy hit queries
+ENDLESS_WAVE_GROWTH = 12  # extra toilets in each --endless wave goal past MAX_WAVE
+ENDLESS_ENTITY_BUDGET = 320  # toilets alive at once in endless mode; spawning waits below the cap
+ENDLESS_RAMP_CAP_WAVE = 20  # endless speed, mix and burst ramps stop here; health keeps climbing
+LOD_CROWD = 60  # on-screen toilets before the horde switches to reduced-detail sprites
+LOD_CROWD_EXIT = 45  # and back to full detail below this, so a crowd near the limit does not flicker
+LOD_FAR_DISTANCE = 380  # in a dense crowd, toilets this far from the player draw as flat silhouettes
+LOD_SILHOUETTE_COLOR = (58, 62, 80)
+MIN_RENDER_SCALE = 0.25  # smallest --render-scale; below this the scene is mostly blur
+VIEWPORT_CACHE_LIMIT = 512  # scaled copies of sprites, layers and text kept by a Viewport
+DIRTY_FULL_FLIP_RATIO = 0.6  # present with a full flip once dirty rects cover this much of the screen
+PROFILE_WINDOW = 120  # frames averaged by the profiler overlay
+PROFILE_REFRESH = 15  # frames between profiler overlay redraws
+TRACE_EVENT_LIMIT = 50000  # newest phase timings kept for a trace dump
+QUALITY_BUDGET_MS = 1000 / FPS  # work time one rendered frame may take before it misses a 60 Hz deadline
+QUALITY_WINDOW = 120  # frames in the rolling frame-time histogram
+QUALITY_COOLDOWN = 90  # frames measured at a quality level before it may change again
+QUALITY_HEADROOM = 0.6  # step quality back up once p95 is under this share of the budget
+QUALITY_MAX_BACKOFF = 8  # cap on the multiplier that slows retries of a step up that did not hold
+QUALITY_STEPS = ("tv crack", "effect fades", "building windows", "toilet detail")  # dropped in this order
+HISTOGRAM_BUCKET_MS = 0.5
+HISTOGRAM_BUCKETS = 128  # the last bucket also holds every slower frame
+EFFECT_FADE_STEPS = 4  # pre-faded copies per overlay when effect fades are coarse
+PARTICLE_CAPACITY = 2048  # hard cap on live particles; new ones overwrite the oldest
+PARTICLE_SIZE_STEPS = 3  # sprite sizes a particle shrinks through as its life runs out
+BLAST_DUST_COUNT = 48  # particles in the ultra blast's shockwave ring
+SPECTATOR_PORT = 8765  # default localhost port for --serve and spectator.py
+SPECTATOR_POSITION_SCALE = 4  # spectator positions travel as int16 quarter pixels
+SPECTATOR_MAX_BACKLOG = 1 << 20  # bytes queued for one spectator before it is dropped as too slow
+FONT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "skibidi_city", "fonts.json"
+)  # resolved system font files, reused between launches
 
+# Input actions, one bit each. A tick's input is the OR of every held action.
+ACTION_LEFT = 1 << 0
+ACTION_RIGHT = 1 << 1
+ACTION_PUNCH = 1 << 2
+ACTION_FLASH = 1 << 3
+ACTION_SPECIAL = 1 << 4
+ACTION_UPGRADE = 1 << 5
+ACTION_UPGRADE_ALT = 1 << 6
+KEY_BINDINGS: dict[int, tuple[int, ...]] = {
+    ACTION_LEFT: (pygame.K_a, pygame.K_LEFT),
+    ACTION_RIGHT: (pygame.K_d, pygame.K_RIGHT),
+    ACTION_PUNCH: (pygame.K_SPACE,),
+    ACTION_FLASH: (pygame.K_f,),
+    ACTION_SPECIAL: (pygame.K_x,),
+    ACTION_UPGRADE: (pygame.K_u,),
+    ACTION_UPGRADE_ALT: (pygame.K_i,),
+}
 
-@dataclass
+# Replay files: header, then (buttons, run length) pairs, then one CRC32 per hashed tick.
+REPLAY_MAGIC = b"SKRP"
+# Bumped whenever a gameplay change makes older recordings diverge:
+# 3 - player and ally hits resolve together against start-of-tick positions.
+# 4 - timers advance by the exact 1000 / FPS ms per tick (was 16) and the tick length is stored as a double.
+# 5 - --vectorized toilets keep the fractional ms of their stun timers instead of truncating them.
+# 6 - --vectorized movement and knockback round exactly like the scalar path.
+REPLAY_VERSION = 6
+REPLAY_HEADER = struct.Struct("<4sBBQdHHII")  # magic, version, flags, seed, dt, hash interval, squad size, ticks, runs
+REPLAY_RUN = struct.Struct("<BH")
+REPLAY_VECTORIZED = 1 << 0
+REPLAY_ENDLESS = 1 << 1
+
+# Snapshot files: magic, then zlib-compressed JSON mapping wave number to that wave's starting state.
+SNAPSHOT_MAGIC = b"SKSN"
+SNAPSHOT_VERSION = 1
+
+# Spectator stream: each message is a u32 byte length, a header, then spawn, update, removal and ally records.
+SPECTATOR_KEYFRAME = 1
+SPECTATOR_DELTA = 2
+SPECTATOR_STATES = ("menu", "playing", "intermission", "victory", "game_over")
+SPECTATOR_KINDS = ("", "Medium", "Police", "Large", "Saint")  # toilet labels
+SPECTATOR_LENGTH = struct.Struct("<I")
+# kind, tick, state, wave, intermission (cs), score, form, health, x, y, facing, 5 effect timers (4 ms), record counts
+SPECTATOR_HEADER = struct.Struct("<BIBBHIBBhhb5BHHHB")
+SPECTATOR_SPAWN = struct.Struct("<IBBB9BhhHB")  # uid, kind, scale*20, wiggle*20, body/rim/eye rgb, x, y, health, flags
+SPECTATOR_UPDATE = struct.Struct("<IhhHB")  # uid, x, y, health, flags
+SPECTATOR_REMOVE = struct.Struct("<I")
+SPECTATOR_ALLY = struct.Struct("<hhB")  # x, y, health
+SPECTATOR_ANGRY = 1 << 0
+SPECTATOR_STUNNED = 1 << 1
+
+
+def read_keyboard() -> int:
+    """Pack the currently held keys into an action bitmask."""
+    keys = pygame.key.get_pressed()
+    buttons = 0
+    for action, bound in KEY_BINDINGS.items():
+        if any(keys[key] for key in bound):
+            buttons |= action
+    return buttons
+
+
+@dataclass(frozen=True, slots=True)
+class FormProfile:
+    """Everything that differs between player forms, resolved once when the form changes."""
+
+    name: str
+    label: str
+    max_health: int
+    bob_amplitude: float
+    punch_damage: int
+    punch_knockback: int
+    flash: str  # "beam", "stun" or "blast"
+    flash_label: str
+    flash_damage: int
+    flash_cooldown: int
+    beam_length: int
+    special: str | None  # "soundwave", "kick", "stab" or None
+    special_label: str
+    special_color: tuple[int, int, int]
+    body_color: tuple[int, int, int]
+    head_color: tuple[int, int, int]
+    body_size: tuple[int, int]
+    head: str
+    instructions: tuple[str, ...]
+    upgrades: tuple[tuple[int, int, str], ...]  # (action, score cost, new form), first affordable one wins
+
+
+def build_form_profiles() -> dict[str, FormProfile]:
+    """Profile table built from the tuning constants; rebuild it after changing them."""
+    profiles = [
+        FormProfile(
+            name="cameraman",
+            label="Cameraman",
+            max_health=5,
+            bob_amplitude=2.5,
+            punch_damage=PUNCH_DAMAGE_CAMERAMAN,
+            punch_knockback=12,
+            flash="beam",
+            flash_label="Flash",
+            flash_damage=FLASH_DAMAGE_CAMERAMAN,
+            flash_cooldown=FLASH_COOLDOWN,
+            beam_length=FLASH_BEAM_LENGTH,
+            special=None,
+            special_label="",
+            special_color=(255, 255, 255),
+            body_color=(30, 120, 200),
+            head_color=(230, 240, 255),
+            body_size=(36, 48),
+            head="camera",
+            instructions=("F: Beam flash", f"U ({SPEAKERMAN_SCORE_COST} pts): Speakerman"),
+            upgrades=((ACTION_UPGRADE, SPEAKERMAN_SCORE_COST, "speakerman"),),
+        ),
+        FormProfile(
+            name="speakerman",
+            label="Speakerman",
+            max_health=6,
+            bob_amplitude=3.2,
+            punch_damage=PUNCH_DAMAGE_SPEAKERMAN,
+            punch_knockback=16,
+            flash="beam",
+            flash_label="Flash",
+            flash_damage=FLASH_DAMAGE_SPEAKERMAN,
+            flash_cooldown=FLASH_COOLDOWN,
+            beam_length=FLASH_BEAM_LENGTH + 30,
+            special="soundwave",
+            special_label="Soundwave",
+            special_color=(220, 200, 255),
+            body_color=(30, 30, 36),
+            head_color=(180, 180, 185),
+            body_size=(36, 48),
+            head="speaker",
+            instructions=("F: Beam flash", "X: Soundwave cone", f"U ({TVMAN_SCORE_COST} pts): TV Man"),
+            upgrades=((ACTION_UPGRADE, TVMAN_SCORE_COST, "tvman"),),
+        ),
+        FormProfile(
+            name="tvman",
+            label="TV Man",
+            max_health=8,
+            bob_amplitude=3.4,
+            punch_damage=PUNCH_DAMAGE_TVMAN,
+            punch_knockback=16,
+            flash="stun",
+            flash_label="Stun Screen",
+            flash_damage=0,
+            flash_cooldown=STUN_COOLDOWN,
+            beam_length=FLASH_BEAM_LENGTH,
+            special="stab",
+            special_label="Stab",
+            special_color=(255, 205, 170),
+            body_color=(30, 30, 36),
+            head_color=(180, 180, 185),
+            body_size=(36, 48),
+            head="tv",
+            instructions=(
+                "F: Stun screen",
+                "X: Stab",
+                f"U ({LARGE_CAM_SCORE_COST} pts): Large Cam",
+                f"I ({LARGE_SPEAKER_SCORE_COST} pts): Large Speakerman",
+            ),
+            upgrades=(
+                (ACTION_UPGRADE, LARGE_SPEAKER_SCORE_COST, "large_speakerman"),
+                (ACTION_UPGRADE, LARGE_CAM_SCORE_COST, "large_cameraman"),
+                (ACTION_UPGRADE_ALT, LARGE_SPEAKER_SCORE_COST, "large_speakerman"),
+            ),
+        ),
+        FormProfile(
+            name="large_cameraman",
+            label="Large Cameraman",
+            max_health=9,
+            bob_amplitude=3.6,
+            punch_damage=PUNCH_DAMAGE_LARGE,
+            punch_knockback=12,
+            flash="beam",
+            flash_label="Flash",
+            flash_damage=FLASH_DAMAGE_LARGE,
+            flash_cooldown=FLASH_COOLDOWN,
+            beam_length=FLASH_BEAM_LENGTH + 50,
+            special=None,
+            special_label="",
+            special_color=(255, 255, 255),
+            body_color=(44, 44, 48),
+            head_color=(180, 180, 185),
+            body_size=(50, 66),
+            head="large_camera",
+            instructions=("F: Heavy beam",),
+            upgrades=((ACTION_UPGRADE, LARGE_SPEAKER_SCORE_COST, "large_speakerman"),),
+        ),
+        FormProfile(
+            name="large_speakerman",
+            label="Large Speakerman",
+            max_health=10,
+            bob_amplitude=3.8,
+            punch_damage=PUNCH_DAMAGE_LARGE_SPEAK,
+            punch_knockback=12,
+            flash="blast",
+            flash_label="Ultra Blast",
+            flash_damage=FLASH_DAMAGE_LARGE_SPEAK,
+            flash_cooldown=FLASH_COOLDOWN,
+            beam_length=FLASH_BEAM_LENGTH + 70,
+            special="kick",
+            special_label="Kick",
+            special_color=(255, 200, 180),
+            body_color=(46, 46, 56),
+            head_color=(180, 180, 185),
+            body_size=(72, 96),
+            head="large_speaker",
+            instructions=("F: Ultra sound blast (360°)", "X: Kick strike"),
+            upgrades=(),
+        ),
+    ]
+    return {profile.name: profile for profile in profiles}
+
+
+FORM_PROFILES = build_form_profiles()
+FORM_MAX_HEALTH = {name: profile.max_health for name, profile in FORM_PROFILES.items()}
+
+
+@dataclass(slots=True)
 class CameraMan:
     position: pygame.Vector2
     facing: pygame.Vector2
     form: str = "cameraman"
     health: int = FORM_MAX_HEALTH["cameraman"]
-    punch_cooldown_timer: int = 0
-    flash_cooldown_timer: int = 0
-    soundwave_cooldown_timer: int = 0
-    stab_cooldown_timer: int = 0
-    damage_cooldown_timer: int = 0
+    punch_cooldown_timer: float = 0
+    flash_cooldown_timer: float = 0
+    soundwave_cooldown_timer: float = 0
+    stab_cooldown_timer: float = 0
+    damage_cooldown_timer: float = 0
     bob_phase: float = 0.0
     bob_amplitude: float = 2.5
+    prev_position: pygame.Vector2 | None = None
+    profile: FormProfile = field(init=False, repr=False, compare=False)
 
-    def handle_input(self, keys: pygame.key.ScancodeWrapper) -> None:
-        movement = pygame.Vector2(0, 0)
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            movement.x -= 1
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            movement.x += 1
+    def __post_init__(self) -> None:
+        self.profile = FORM_PROFILES[self.form]
 
-        if movement.length_squared() > 0:
-            movement = movement.normalize() * PLAYER_SPEED
-            self.position += movement
-            self.position.x = max(26, min(SCREEN_WIDTH - 26, self.position.x))
-            self.position.y = PLAYER_GROUND_Y
-            self.facing = movement.normalize()
-        else:
-            self.position.y = PLAYER_GROUND_Y
+    def detached(self) -> "CameraMan":
+        """Copy with its own vectors, for a frame snapshot drawn while the simulation moves on."""
+        prev = self.prev_position
+        return replace(
+            self, position=self.position.copy(), facing=self.facing.copy(), prev_position=None if prev is None else prev.copy()
+        )
+
+    def render_position(self, alpha: float) -> pygame.Vector2:
+        """Position blended between the last two simulation ticks."""
+        if self.prev_position is None:
+            return self.position
+        return self.prev_position.lerp(self.position, alpha)
+
+    def posed(self, alpha: float) -> "CameraMan":
+        """Shallow copy standing at render_position(alpha), for drawing; the simulated player is left alone."""
+        return replace(self, position=self.render_position(alpha))
+
+    def handle_input(self, buttons: int) -> None:
+        step = 0
+        if buttons & ACTION_LEFT:
+            step -= 1
+        if buttons & ACTION_RIGHT:
+            step += 1
+
+        if step:
+            self.position.x = max(26, min(SCREEN_WIDTH - 26, self.position.x + step * PLAYER_SPEED))
+            self.facing.update(step, 0)
+        self.position.y = PLAYER_GROUND_Y
 
     def can_punch(self) -> bool:
         return self.punch_cooldown_timer <= 0
@@ -110,22 +390,22 @@ class CameraMan:
         return self.flash_cooldown_timer <= 0
 
     def start_flash(self) -> None:
-        self.flash_cooldown_timer = FLASH_COOLDOWN if self.form != "tvman" else STUN_COOLDOWN
+        self.flash_cooldown_timer = self.profile.flash_cooldown
 
     def can_soundwave(self) -> bool:
-        return self.form == "speakerman" and self.soundwave_cooldown_timer <= 0
+        return self.profile.special == "soundwave" and self.soundwave_cooldown_timer <= 0
 
     def start_soundwave(self) -> None:
         self.soundwave_cooldown_timer = SOUNDWAVE_COOLDOWN
 
     def can_kick(self) -> bool:
-        return self.form == "large_speakerman" and self.soundwave_cooldown_timer <= 0
+        return self.profile.special == "kick" and self.soundwave_cooldown_timer <= 0
 
     def start_kick(self) -> None:
         self.soundwave_cooldown_timer = KICK_COOLDOWN
 
     def can_stab(self) -> bool:
-        return self.form == "tvman" and self.stab_cooldown_timer <= 0
+        return self.profile.special == "stab" and self.stab_cooldown_timer <= 0
 
     def start_stab(self) -> None:
         self.stab_cooldown_timer = STAB_COOLDOWN
@@ -136,7 +416,7 @@ class CameraMan:
         self.health = max(0, self.health - amount)
         self.damage_cooldown_timer = PLAYER_DAMAGE_COOLDOWN
 
-    def update(self, dt: int) -> None:
+    def update(self, dt: float) -> None:
         self.punch_cooldown_timer = max(0, self.punch_cooldown_timer - dt)
         self.flash_cooldown_timer = max(0, self.flash_cooldown_timer - dt)
         self.soundwave_cooldown_timer = max(0, self.soundwave_cooldown_timer - dt)
@@ -144,123 +424,174 @@ class CameraMan:
         self.damage_cooldown_timer = max(0, self.damage_cooldown_timer - dt)
         self.bob_phase = (self.bob_phase + dt * 0.005) % (2 * math.pi)
 
+    def become(self, form: str) -> None:
+        """Switch forms: resolve the new profile once and refill health to its maximum."""
+        self.form = form
+        self.profile = FORM_PROFILES[form]
+        # each bigger form bobs a little harder
+        self.bob_amplitude = self.profile.bob_amplitude
+        self.health = self.profile.max_health
+
     def upgrade_to_speakerman(self) -> None:
-        self.form = "speakerman"
-        # small celebratory bob boost for the upgraded stance
-        self.bob_amplitude = 3.2
-        self.health = FORM_MAX_HEALTH[self.form]
+        self.become("speakerman")
 
     def upgrade_to_tvman(self) -> None:
-        self.form = "tvman"
-        self.bob_amplitude = 3.4
-        self.health = FORM_MAX_HEALTH[self.form]
+        self.become("tvman")
 
     def upgrade_to_large_cameraman(self) -> None:
-        self.form = "large_cameraman"
-        self.bob_amplitude = 3.6
-        self.health = FORM_MAX_HEALTH[self.form]
+        self.become("large_cameraman")
 
     def upgrade_to_large_speakerman(self) -> None:
-        self.form = "large_speakerman"
-        self.bob_amplitude = 3.8
-        self.health = FORM_MAX_HEALTH[self.form]
+        self.become("large_speakerman")
 
-    def draw(self, surface: pygame.Surface) -> None:
-        body_color = (30, 120, 200) if self.form == "cameraman" else (30, 30, 36)
-        if self.form == "large_cameraman":
-            body_color = (44, 44, 48)
-        if self.form == "large_speakerman":
-            body_color = (46, 46, 56)
-        head_color = (230, 240, 255) if self.form == "cameraman" else (180, 180, 185)
-        base_size = (36, 48)
-        if self.form == "large_cameraman":
-            base_size = (50, 66)
-        elif self.form == "large_speakerman":
-            base_size = (72, 96)
-        base_rect = pygame.Rect(0, 0, *base_size)
+    def beam_rect(self) -> pygame.Rect:
+        """Area of the forward flash or stun beam for the current form and facing."""
+        direction = 1 if self.facing.x >= 0 else -1
+        start_x = self.position.x + (20 * direction)
+        rect = pygame.Rect(0, 0, self.profile.beam_length, FLASH_BEAM_WIDTH)
+        if direction < 0:
+            rect.right = start_x
+        else:
+            rect.left = start_x
+        rect.centery = self.position.y - 4
+        return rect
+
+    def punch_hitbox(self) -> pygame.Rect:
+        if self.facing.length_squared() == 0:
+            facing = pygame.Vector2(0, -1)
+        else:
+            facing = self.facing.normalize()
+
+        punch_origin = self.position + facing * 28
+        hitbox_center = punch_origin + facing * (PUNCH_RANGE // 2)
+        size = (26, 26)
+        hitbox = pygame.Rect(0, 0, *size)
+        hitbox.center = (int(hitbox_center.x), int(hitbox_center.y))
+        return hitbox
+
+    def bounds(self) -> pygame.Rect:
+        """Conservative screen area covered by draw() in any form, including bob and antenna."""
+        return pygame.Rect(int(self.position.x) - 48, int(self.position.y) - 104, 96, 158)
+
+    def body_rect(self) -> pygame.Rect:
+        """Torso rect at the current position and bob; heads and overlays are placed relative to it."""
+        base_rect = pygame.Rect(0, 0, *self.profile.body_size)
         bob = math.sin(self.bob_phase) * self.bob_amplitude
         base_rect.center = (self.position.x, self.position.y + bob)
-        pygame.draw.rect(surface, body_color, base_rect, border_radius=6)
-
-        if self.form == "cameraman":
-            head_rect = pygame.Rect(0, 0, 24, 18)
-            head_rect.midbottom = base_rect.midtop
-            pygame.draw.rect(surface, head_color, head_rect, border_radius=4)
-
-            # Camera lens
-            lens_center = (int(head_rect.centerx + self.facing.x * 6), int(head_rect.centery + self.facing.y * 6))
-            pygame.draw.circle(surface, (20, 20, 20), lens_center, 4)
-        elif self.form == "speakerman":
-            speaker_rect = pygame.Rect(0, 0, 30, 20)
-            speaker_rect.midbottom = base_rect.midtop
-            pygame.draw.rect(surface, head_color, speaker_rect, border_radius=3)
-            grill_rect = speaker_rect.inflate(-10, -8)
-            pygame.draw.rect(surface, (40, 40, 44), grill_rect, border_radius=2, width=2)
-            center = speaker_rect.center
-            pygame.draw.circle(surface, (140, 140, 150), (center[0] - 6, center[1]), 4)
-            pygame.draw.circle(surface, (90, 90, 100), (center[0] + 8, center[1]), 3)
-            pygame.draw.rect(surface, (90, 90, 100), grill_rect.inflate(-6, -6), border_radius=2)
-        elif self.form == "large_speakerman":
-            speaker_rect = pygame.Rect(0, 0, 48, 32)
-            speaker_rect.midbottom = base_rect.midtop
-            pygame.draw.rect(surface, (34, 34, 42), speaker_rect, border_radius=5)
-            inner = speaker_rect.inflate(-12, -10)
-            pygame.draw.rect(surface, (96, 96, 110), inner, border_radius=4)
-            pygame.draw.circle(surface, (220, 220, 230), inner.center, 14)
-            pygame.draw.circle(surface, (150, 150, 160), (inner.centerx - 12, inner.centery - 4), 7)
-            pygame.draw.circle(surface, (110, 110, 120), (inner.centerx + 14, inner.centery + 6), 6)
-            ridge = pygame.Rect(0, 0, speaker_rect.width + 6, 6)
-            ridge.midtop = speaker_rect.midtop
-            pygame.draw.rect(surface, (60, 60, 72), ridge, border_radius=3)
-            beam_mount = pygame.Rect(0, 0, 18, 8)
-            beam_mount.midtop = speaker_rect.midtop
-            pygame.draw.rect(surface, (220, 90, 90), beam_mount, border_radius=3)
-        elif self.form == "large_cameraman":
-            head_rect = pygame.Rect(0, 0, 34, 24)
-            head_rect.midbottom = base_rect.midtop
-            pygame.draw.rect(surface, (38, 38, 44), head_rect, border_radius=3)
-            lens_rect = pygame.Rect(0, 0, 22, 12)
-            lens_rect.midleft = head_rect.midleft
-            pygame.draw.rect(surface, (20, 24, 28), lens_rect, border_radius=2)
-            rim_rect = lens_rect.inflate(-8, -4)
-            pygame.draw.rect(surface, (130, 180, 220), rim_rect, border_radius=2)
-            handle_rect = pygame.Rect(0, 0, 8, 20)
-            handle_rect.midright = head_rect.midright
-            pygame.draw.rect(surface, (22, 26, 30), handle_rect, border_radius=2)
-            beam_mount = pygame.Rect(0, 0, 14, 6)
-            beam_mount.midtop = head_rect.midtop
-            pygame.draw.rect(surface, (60, 60, 66), beam_mount, border_radius=2)
-        else:
-            tv_rect = pygame.Rect(0, 0, 34, 26)
-            tv_rect.midbottom = base_rect.midtop
-            screen_rect = tv_rect.inflate(-8, -10)
-            pygame.draw.rect(surface, (26, 26, 28), tv_rect, border_radius=3)
-            pygame.draw.rect(surface, (160, 160, 180), screen_rect, border_radius=2)
-            pygame.draw.rect(surface, (230, 230, 240), screen_rect.inflate(-6, -6), border_radius=2)
-            scan_y = int(screen_rect.centery + math.sin(self.bob_phase * 1.6) * 3)
-            pygame.draw.line(surface, (120, 120, 160), (screen_rect.left + 4, scan_y), (screen_rect.right - 4, scan_y), 2)
-            antena_center = (tv_rect.centerx, tv_rect.top - 6)
-            pygame.draw.line(surface, (200, 200, 210), antena_center, (antena_center[0] - 6, antena_center[1] - 10), 2)
-            pygame.draw.line(surface, (200, 200, 210), antena_center, (antena_center[0] + 6, antena_center[1] - 10), 2)
-            if self.health <= 1:
-                crack_overlay = pygame.Surface(screen_rect.size, pygame.SRCALPHA)
-                for x in range(0, screen_rect.width, 4):
-                    band_alpha = 80 + (x % 12) * 6
-                    color = ((80 + x * 2) % 255, (120 + x * 3) % 255, (200 + x * 5) % 255, min(180, band_alpha))
-                    pygame.draw.line(crack_overlay, color, (x, 0), (x, screen_rect.height))
-                crack_points = [
-                    (screen_rect.width * 0.15, screen_rect.height * 0.2),
-                    (screen_rect.width * 0.5, screen_rect.height * 0.35),
-                    (screen_rect.width * 0.35, screen_rect.height * 0.7),
-                    (screen_rect.width * 0.75, screen_rect.height * 0.55),
-                    (screen_rect.width * 0.6, screen_rect.height * 0.15),
-                ]
-                pygame.draw.lines(crack_overlay, (255, 255, 255, 220), False, crack_points, 2)
-                pygame.draw.circle(crack_overlay, (255, 255, 255, 200), crack_points[1], 4, width=1)
-                surface.blit(crack_overlay, screen_rect.topleft)
+        return base_rect
 
+    def pose_key(self, detailed: bool = True) -> tuple:
+        """Everything draw_pose() depends on besides where the torso is, for ActorSpriteCache."""
+        scan = math.floor(math.sin(self.bob_phase * 1.6) * 3) if self.profile.head == "tv" else 0
+        cracked = detailed and self.profile.head == "tv" and self.health <= 1
+        return (self.form, self.facing.x, self.facing.y, scan, cracked)
 
-@dataclass
+    def draw(self, surface: pygame.Surface, detailed: bool = True) -> None:
+        """``detailed=False`` skips the TV Man's animated crack overlay when quality is scaled down."""
+        self.draw_pose(surface, self.body_rect(), detailed)
+
+    def draw_pose(self, surface: pygame.Surface, base_rect: pygame.Rect, detailed: bool = True) -> None:
+        profile = self.profile
+        pygame.draw.rect(surface, profile.body_color, base_rect, border_radius=6)
+        self.HEAD_DRAWERS[profile.head](self, surface, base_rect, profile.head_color)
+        if detailed and profile.head == "tv" and self.health <= 1:
+            self.draw_tv_crack(surface, base_rect)
+
+    def draw_camera_head(self, surface: pygame.Surface, base_rect: pygame.Rect, head_color: tuple) -> None:
+        head_rect = pygame.Rect(0, 0, 24, 18)
+        head_rect.midbottom = base_rect.midtop
+        pygame.draw.rect(surface, head_color, head_rect, border_radius=4)
+
+        # Camera lens
+        lens_center = (int(head_rect.centerx + self.facing.x * 6), int(head_rect.centery + self.facing.y * 6))
+        pygame.draw.circle(surface, (20, 20, 20), lens_center, 4)
+
+    def draw_speaker_head(self, surface: pygame.Surface, base_rect: pygame.Rect, head_color: tuple) -> None:
+        speaker_rect = pygame.Rect(0, 0, 30, 20)
+        speaker_rect.midbottom = base_rect.midtop
+        pygame.draw.rect(surface, head_color, speaker_rect, border_radius=3)
+        grill_rect = speaker_rect.inflate(-10, -8)
+        pygame.draw.rect(surface, (40, 40, 44), grill_rect, border_radius=2, width=2)
+        center = speaker_rect.center
+        pygame.draw.circle(surface, (140, 140, 150), (center[0] - 6, center[1]), 4)
+        pygame.draw.circle(surface, (90, 90, 100), (center[0] + 8, center[1]), 3)
+        pygame.draw.rect(surface, (90, 90, 100), grill_rect.inflate(-6, -6), border_radius=2)
+
+    def draw_large_speaker_head(self, surface: pygame.Surface, base_rect: pygame.Rect, head_color: tuple) -> None:
+        speaker_rect = pygame.Rect(0, 0, 48, 32)
+        speaker_rect.midbottom = base_rect.midtop
+        pygame.draw.rect(surface, (34, 34, 42), speaker_rect, border_radius=5)
+        inner = speaker_rect.inflate(-12, -10)
+        pygame.draw.rect(surface, (96, 96, 110), inner, border_radius=4)
+        pygame.draw.circle(surface, (220, 220, 230), inner.center, 14)
+        pygame.draw.circle(surface, (150, 150, 160), (inner.centerx - 12, inner.centery - 4), 7)
+        pygame.draw.circle(surface, (110, 110, 120), (inner.centerx + 14, inner.centery + 6), 6)
+        ridge = pygame.Rect(0, 0, speaker_rect.width + 6, 6)
+        ridge.midtop = speaker_rect.midtop
+        pygame.draw.rect(surface, (60, 60, 72), ridge, border_radius=3)
+        beam_mount = pygame.Rect(0, 0, 18, 8)
+        beam_mount.midtop = speaker_rect.midtop
+        pygame.draw.rect(surface, (220, 90, 90), beam_mount, border_radius=3)
+
+    def draw_large_camera_head(self, surface: pygame.Surface, base_rect: pygame.Rect, head_color: tuple) -> None:
+        head_rect = pygame.Rect(0, 0, 34, 24)
+        head_rect.midbottom = base_rect.midtop
+        pygame.draw.rect(surface, (38, 38, 44), head_rect, border_radius=3)
+        lens_rect = pygame.Rect(0, 0, 22, 12)
+        lens_rect.midleft = head_rect.midleft
+        pygame.draw.rect(surface, (20, 24, 28), lens_rect, border_radius=2)
+        rim_rect = lens_rect.inflate(-8, -4)
+        pygame.draw.rect(surface, (130, 180, 220), rim_rect, border_radius=2)
+        handle_rect = pygame.Rect(0, 0, 8, 20)
+        handle_rect.midright = head_rect.midright
+        pygame.draw.rect(surface, (22, 26, 30), handle_rect, border_radius=2)
+        beam_mount = pygame.Rect(0, 0, 14, 6)
+        beam_mount.midtop = head_rect.midtop
+        pygame.draw.rect(surface, (60, 60, 66), beam_mount, border_radius=2)
+
+    def draw_tv_head(self, surface: pygame.Surface, base_rect: pygame.Rect, head_color: tuple) -> None:
+        tv_rect = pygame.Rect(0, 0, 34, 26)
+        tv_rect.midbottom = base_rect.midtop
+        screen_rect = tv_rect.inflate(-8, -10)
+        pygame.draw.rect(surface, (26, 26, 28), tv_rect, border_radius=3)
+        pygame.draw.rect(surface, (160, 160, 180), screen_rect, border_radius=2)
+        pygame.draw.rect(surface, (230, 230, 240), screen_rect.inflate(-6, -6), border_radius=2)
+        scan_y = int(screen_rect.centery + math.sin(self.bob_phase * 1.6) * 3)
+        pygame.draw.line(surface, (120, 120, 160), (screen_rect.left + 4, scan_y), (screen_rect.right - 4, scan_y), 2)
+        antena_center = (tv_rect.centerx, tv_rect.top - 6)
+        pygame.draw.line(surface, (200, 200, 210), antena_center, (antena_center[0] - 6, antena_center[1] - 10), 2)
+        pygame.draw.line(surface, (200, 200, 210), antena_center, (antena_center[0] + 6, antena_center[1] - 10), 2)
+
+    def draw_tv_crack(self, surface: pygame.Surface, base_rect: pygame.Rect) -> None:
+        tv_rect = pygame.Rect(0, 0, 34, 26)
+        tv_rect.midbottom = base_rect.midtop
+        screen_rect = tv_rect.inflate(-8, -10)
+        crack_overlay = pygame.Surface(screen_rect.size, pygame.SRCALPHA)
+        for x in range(0, screen_rect.width, 4):
+            band_alpha = 80 + (x % 12) * 6
+            color = ((80 + x * 2) % 255, (120 + x * 3) % 255, (200 + x * 5) % 255, min(180, band_alpha))
+            pygame.draw.line(crack_overlay, color, (x, 0), (x, screen_rect.height))
+        crack_points = [
+            (screen_rect.width * 0.15, screen_rect.height * 0.2),
+            (screen_rect.width * 0.5, screen_rect.height * 0.35),
+            (screen_rect.width * 0.35, screen_rect.height * 0.7),
+            (screen_rect.width * 0.75, screen_rect.height * 0.55),
+            (screen_rect.width * 0.6, screen_rect.height * 0.15),
+        ]
+        pygame.draw.lines(crack_overlay, (255, 255, 255, 220), False, crack_points, 2)
+        pygame.draw.circle(crack_overlay, (255, 255, 255, 200), crack_points[1], 4, width=1)
+        surface.blit(crack_overlay, screen_rect.topleft)
+
+    HEAD_DRAWERS: ClassVar[dict[str, Callable[..., None]]] = {
+        "camera": draw_camera_head,
+        "speaker": draw_speaker_head,
+        "large_speaker": draw_large_speaker_head,
+        "large_camera": draw_large_camera_head,
+        "tv": draw_tv_head,
+    }
+
+
+@dataclass(slots=True)
 class SkibidiToilet:
     position: pygame.Vector2
     health: int
@@ -278,27 +609,35 @@ class SkibidiToilet:
     eye_color: tuple[int, int, int] = (40, 40, 40)
     score_value: int = 1
     contact_damage: int = ENEMY_DAMAGE
-    stun_timer: int = 0
-    _label_font: pygame.font.Font | None = None
+    stun_timer: float = 0
+    uid: int = 0  # session-unique id assigned by Game.add_enemy, used by the spectator stream
+    prev_position: pygame.Vector2 | None = None
+    _label_font: ClassVar[pygame.font.Font | None] = None
+    _label_surfaces: ClassVar[dict[str, pygame.Surface]] = {}
 
-    def update(self, target: pygame.Vector2, dt: int) -> None:
+    def update(self, target: pygame.Vector2, dt: float) -> None:
         if self.stun_timer > 0:
             self.stun_timer = max(0, self.stun_timer - dt)
             self.wobble_phase = (self.wobble_phase + dt * 0.01) % (2 * math.pi)
             return
-        direction = target - self.position
-        if direction.length_squared() > 0:
-            direction = direction.normalize()
+        position = self.position
+        dx = target.x - position.x
+        dy = target.y - position.y
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance > 0:
             speed = self.speed
             if self.is_saint and (self.angry or self.health <= 6):
                 speed += 0.7
                 self.angry = True
                 self.eye_color = (160, 20, 20)
-            self.position += direction * speed
+            # Scalar normalize() * speed without the Vector2 temporaries, in the same operation
+            # order so positions (and replay hashes) stay bit-identical.
+            position.x += dx / distance * speed
+            position.y += dy / distance * speed
 
         # Extra wobble and occasional vertical shimmy for variety.
         self.wobble_phase = (self.wobble_phase + dt * 0.01) % (2 * math.pi)
-        self.position.y += math.sin(self.wobble_phase * 0.6) * 0.12 * self.wiggle_amp
+        position.y += math.sin(self.wobble_phase * 0.6) * 0.12 * self.wiggle_amp
 
     def take_damage(self, amount: int) -> None:
         self.health -= amount
@@ -306,21 +645,71 @@ class SkibidiToilet:
     def is_dead(self) -> bool:
         return self.health <= 0
 
+    def detached(self) -> "SkibidiToilet":
+        """Plain copy with its own vectors, for a frame snapshot; swarm views come out as ordinary toilets."""
+        prev = self.prev_position
+        # Positional construction is several times faster than dataclasses.replace for a whole horde per tick.
+        return SkibidiToilet(
+            self.position.copy(), self.health, self.speed, self.label, self.scale, self.is_saint, self.is_medium,
+            self.is_police, self.angry, self.wobble_phase, self.wiggle_amp, self.body_color, self.rim_color,
+            self.eye_color, self.score_value, self.contact_damage, self.stun_timer, self.uid,
+            None if prev is None else prev.copy(),
+        )
+
+    def render_position(self, alpha: float) -> pygame.Vector2:
+        """Position blended between the last two simulation ticks."""
+        if self.prev_position is None:
+            return self.position
+        return self.prev_position.lerp(self.position, alpha)
+
+    def sprite_key(self) -> tuple:
+        """Everything that changes how the body looks, with the wobble quantised to whole pixels."""
+        return (
+            self.scale,
+            self.body_color,
+            self.rim_color,
+            self.eye_color,
+            self.is_police,
+            "" if self.is_saint else self.label,
+            round(math.sin(self.wobble_phase) * self.wiggle_amp),
+        )
+
     def draw(self, surface: pygame.Surface) -> None:
         wobble_offset = math.sin(self.wobble_phase) * self.wiggle_amp
-        shadow_rect = pygame.Rect(0, 0, int(52 * self.scale), int(16 * self.scale))
-        shadow_rect.center = (int(self.position.x), int(self.position.y + wobble_offset + 24))
-        pygame.draw.ellipse(surface, (24, 24, 32), shadow_rect)
+        self.draw_body(surface, self.position, wobble_offset, with_label=not self.is_saint)
+        if self.is_saint:
+            self.draw_saint_overlay(surface, wobble_offset)
 
+    def body_rects(self, center: tuple[float, float], wobble_offset: float) -> tuple[pygame.Rect, pygame.Rect]:
         base_rect = pygame.Rect(0, 0, int(44 * self.scale), int(30 * self.scale))
-        base_rect.center = self.position
+        base_rect.center = center
         base_rect.y += wobble_offset
-        pygame.draw.rect(surface, self.body_color, base_rect, border_radius=8)
 
         tank_rect = pygame.Rect(0, 0, int(40 * self.scale), int(16 * self.scale))
         tank_rect.midbottom = base_rect.midtop
         tank_rect.y -= 6
         tank_rect.y += wobble_offset
+        return base_rect, tank_rect
+
+    def draw_body(
+        self,
+        surface: pygame.Surface,
+        center: tuple[float, float],
+        wobble_offset: float,
+        with_label: bool = True,
+        detailed: bool = True,
+    ) -> None:
+        """Shadow, bowl, tank, face and police gear around ``center``; also used to bake sprites.
+
+        ``detailed=False`` leaves out the shadow and face for crowd level-of-detail sprites.
+        """
+        if detailed:
+            shadow_rect = pygame.Rect(0, 0, int(52 * self.scale), int(16 * self.scale))
+            shadow_rect.center = (int(center[0]), int(center[1] + wobble_offset + 24))
+            pygame.draw.ellipse(surface, (24, 24, 32), shadow_rect)
+
+        base_rect, tank_rect = self.body_rects(center, wobble_offset)
+        pygame.draw.rect(surface, self.body_color, base_rect, border_radius=8)
         pygame.draw.rect(surface, (220, 225, 235), tank_rect, border_radius=6)
         pygame.draw.rect(surface, (110, 140, 170), tank_rect.inflate(-18, -8), border_radius=4, width=2)
 
@@ -341,212 +730,2276 @@ class SkibidiToilet:
             badge_center = (hat_rect.centerx, hat_rect.centery)
             pygame.draw.circle(surface, (180, 180, 120), badge_center, max(2, int(3 * self.scale)))
 
-        seat_rect = pygame.Rect(0, 0, int(32 * self.scale), int(14 * self.scale))
-        seat_rect.midtop = base_rect.midtop
-        seat_rect.y += wobble_offset - 2
-        pygame.draw.rect(surface, self.rim_color, seat_rect, border_radius=8)
-        pygame.draw.rect(surface, (180, 180, 200), seat_rect.inflate(-10, -6), border_radius=6)
+        seat_rect = pygame.Rect(0, 0, int(32 * self.scale), int(14 * self.scale))
+        seat_rect.midtop = base_rect.midtop
+        seat_rect.y += wobble_offset - 2
+        pygame.draw.rect(surface, self.rim_color, seat_rect, border_radius=8)
+        pygame.draw.rect(surface, (180, 180, 200), seat_rect.inflate(-10, -6), border_radius=6)
+
+        water_center = (base_rect.centerx, base_rect.centery + wobble_offset)
+        pygame.draw.circle(surface, (130, 190, 255), water_center, 8)
+        pygame.draw.circle(surface, (220, 240, 255), water_center, 4)
+        if not detailed:
+            return
+
+        # Face
+        eye_y = base_rect.top + 8 * self.scale + wobble_offset
+        eye_offset = 10 * self.scale
+        eye_radius = max(3, int(5 * self.scale))
+        pupil_radius = max(2, int(3 * self.scale))
+        pygame.draw.circle(surface, (255, 255, 255), (base_rect.centerx - eye_offset, int(eye_y)), eye_radius)
+        pygame.draw.circle(surface, (255, 255, 255), (base_rect.centerx + eye_offset, int(eye_y)), eye_radius)
+        pygame.draw.circle(surface, self.eye_color, (base_rect.centerx - eye_offset, int(eye_y)), pupil_radius)
+        pygame.draw.circle(surface, self.eye_color, (base_rect.centerx + eye_offset, int(eye_y)), pupil_radius)
+        mouth_rect = pygame.Rect(0, 0, int(18 * self.scale), int(8 * self.scale))
+        mouth_rect.midtop = (base_rect.centerx, eye_y + 8 * self.scale)
+        pygame.draw.arc(surface, (180, 60, 60), mouth_rect, math.radians(10), math.radians(170), max(2, int(2 * self.scale)))
+
+        if with_label and self.label:
+            self.draw_label(surface, base_rect)
+
+    @classmethod
+    def label_surface(cls, label: str) -> pygame.Surface:
+        surface = cls._label_surfaces.get(label)
+        if surface is None:
+            if cls._label_font is None:
+                cls._label_font = pygame.font.SysFont("arial", 14)
+            surface = cls._label_surfaces[label] = cls._label_font.render(label, True, (20, 20, 40))
+        return surface
+
+    def draw_label(self, surface: pygame.Surface, base_rect: pygame.Rect) -> pygame.Rect:
+        label_surface = SkibidiToilet.label_surface(self.label)
+        label_rect = label_surface.get_rect(center=(base_rect.centerx, base_rect.top - 12))
+        return surface.blit(label_surface, label_rect)
+
+    def draw_saint_overlay(
+        self, surface: pygame.Surface, wobble_offset: float, center: pygame.Vector2 | None = None
+    ) -> pygame.Rect:
+        """Halo, boss health bar and label; these change every frame so they are never baked.
+
+        Returns the area drawn so dirty-rect presentation can include it.
+        """
+        base_rect, halo_rect, bar_rect = self.saint_overlay_rects(wobble_offset, center)
+        drawn = self.draw_halo(surface, halo_rect)
+        drawn.union_ip(self.draw_boss_bar(surface, bar_rect, self.boss_bar_fill()))
+        if self.label:
+            drawn.union_ip(self.draw_label(surface, base_rect))
+        return drawn
+
+    def saint_overlay_rects(
+        self, wobble_offset: float, center: pygame.Vector2 | None = None
+    ) -> tuple[pygame.Rect, pygame.Rect, pygame.Rect]:
+        """Body, halo and boss-bar rects for this frame; the halo bobs on its own phase."""
+        base_rect, tank_rect = self.body_rects(self.position if center is None else center, wobble_offset)
+        halo_rect = pygame.Rect(0, 0, 40, 10)
+        halo_rect.midbottom = (tank_rect.centerx, tank_rect.top - 8)
+        halo_rect.y += math.sin(self.wobble_phase * 1.4) * 2
+        bar_rect = pygame.Rect(0, 0, 120, 12)
+        bar_rect.midbottom = (base_rect.centerx, base_rect.top - 6)
+        return base_rect, halo_rect, bar_rect
+
+    def boss_bar_fill(self) -> int:
+        return int(120 * max(0, min(1, self.health / 14)))
+
+    @staticmethod
+    def draw_halo(surface: pygame.Surface, halo_rect: pygame.Rect) -> pygame.Rect:
+        drawn = pygame.draw.ellipse(surface, (255, 225, 120), halo_rect, width=3)
+        pygame.draw.ellipse(surface, (255, 245, 200), halo_rect.inflate(-6, -4), width=2)
+        return drawn
+
+    @staticmethod
+    def draw_boss_bar(surface: pygame.Surface, bar_rect: pygame.Rect, fill: int) -> pygame.Rect:
+        drawn = pygame.draw.rect(surface, (40, 20, 20), bar_rect.inflate(4, 4), border_radius=4)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = fill
+        pygame.draw.rect(surface, (220, 120, 120), fill_rect, border_radius=3)
+        pygame.draw.rect(surface, (255, 220, 180), bar_rect, width=2, border_radius=4)
+        return drawn
+
+
+class ToiletSpriteCache:
+    """Bakes each toilet look once into an alpha surface and draws the horde in one ``blits`` batch.
+
+    Toilets wholly off screen are skipped. Once LOD_CROWD toilets are on screen the
+    horde drops to level-of-detail sprites: bodies without faces or labels over
+    one merged shadow per cluster, and flat silhouettes beyond LOD_FAR_DISTANCE of
+    the player. These sprites ignore colour and label, so far fewer variants are baked.
+    """
+
+    MAX_SPRITES = 2048
+    LOD_FULL = 0
+    LOD_REDUCED = 1
+    LOD_SILHOUETTE = 2
+
+    def __init__(self) -> None:
+        self.sprites: dict[tuple, tuple[pygame.Surface, int, int]] = {}
+        self.dense = False
+
+    def sprite_for(self, enemy: SkibidiToilet, lod: int = LOD_FULL) -> tuple[pygame.Surface, int, int]:
+        """Returns the baked surface and the offset from the toilet position to its top-left."""
+        key = enemy.sprite_key()
+        if lod == self.LOD_REDUCED:
+            key = ("reduced", key[0], key[1], key[2], key[4], key[-1])
+        elif lod == self.LOD_SILHOUETTE:
+            key = ("silhouette", key[0], key[4], key[-1])
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            if len(self.sprites) >= self.MAX_SPRITES:
+                self.sprites.clear()
+            sprite = self.bake(enemy, key[-1], lod)
+            self.sprites[key] = sprite
+        return sprite
+
+    def bake(self, enemy: SkibidiToilet, wobble_offset: int, lod: int = LOD_FULL) -> tuple[pygame.Surface, int, int]:
+        margin = int(80 * enemy.scale) + 48
+        canvas = pygame.Surface((margin * 2, margin * 2), pygame.SRCALPHA)
+        full = lod == self.LOD_FULL
+        enemy.draw_body(canvas, (margin, margin), wobble_offset, with_label=full and not enemy.is_saint, detailed=full)
+        if lod == self.LOD_SILHOUETTE:
+            canvas = pygame.mask.from_surface(canvas).to_surface(setcolor=LOD_SILHOUETTE_COLOR, unsetcolor=(0, 0, 0, 0))
+        bounds = canvas.get_bounding_rect()
+        sprite = canvas.subsurface(bounds).copy().convert_alpha()
+        return sprite, bounds.x - margin, bounds.y - margin
+
+    def draw_all(
+        self,
+        surface: pygame.Surface,
+        enemies: List[SkibidiToilet],
+        dirty: List[pygame.Rect] | None = None,
+        alpha: float = 1.0,
+        focus: pygame.Vector2 | None = None,
+        simplified: bool = False,
+    ) -> None:
+        """Blit every visible toilet in one batch; sprite areas are appended to ``dirty`` when given.
+
+        ``focus`` is the player position that silhouettes are measured from in a dense crowd.
+        ``simplified`` uses the crowd level of detail whatever the crowd size.
+        """
+        width = surface.get_width()
+        visible = []
+        for enemy in enemies:
+            position = enemy.render_position(alpha) if alpha < 1.0 else enemy.position
+            reach = 80 * enemy.scale + 48  # the bake margin bounds every sprite
+            if -reach < position.x < width + reach:
+                visible.append((enemy, position))
+        self.dense = len(visible) > LOD_CROWD_EXIT if self.dense else len(visible) >= LOD_CROWD
+        dense = self.dense or simplified
+
+        batch = []
+        saints = []
+        shadows = []
+        for enemy, position in visible:
+            lod = self.LOD_FULL
+            if enemy.is_saint:
+                saints.append((enemy, position))
+            elif dense:
+                far = focus is not None and abs(position.x - focus.x) > LOD_FAR_DISTANCE
+                lod = self.LOD_SILHOUETTE if far else self.LOD_REDUCED
+                half = 26 * enemy.scale
+                shadows.append((position.x - half, position.x + half, position.y + 24))
+            sprite, dx, dy = self.sprite_for(enemy, lod)
+            batch.append((sprite, (int(position.x) + dx, int(position.y) + dy)))
+        if shadows:
+            for rect in self.merged_shadows(shadows):
+                drawn = draw_ellipse(surface, (24, 24, 32), rect)
+                if dirty is not None:
+                    dirty.append(drawn)
+        fblits = getattr(surface, "fblits", None)
+        if fblits is not None:
+            fblits(batch)
+        else:
+            surface.blits(batch, doreturn=False)
+        if dirty is not None:
+            dirty.extend(pygame.Rect(dest, sprite.get_size()) for sprite, dest in batch)
+        for saint, position in saints:
+            drawn = self.draw_saint_overlay(surface, saint, position)
+            if dirty is not None:
+                dirty.append(drawn)
+
+    def draw_saint_overlay(self, surface: pygame.Surface, saint: SkibidiToilet, position: pygame.Vector2) -> pygame.Rect:
+        """SkibidiToilet.draw_saint_overlay() from baked halo and boss-bar sprites placed at this frame's rects."""
+        wobble_offset = math.sin(saint.wobble_phase) * saint.wiggle_amp
+        base_rect, halo_rect, bar_rect = saint.saint_overlay_rects(wobble_offset, position)
+        halo = self.sprites.get(("halo",))
+        if halo is None:
+            canvas = pygame.Surface(halo_rect.size, pygame.SRCALPHA)
+            SkibidiToilet.draw_halo(canvas, canvas.get_rect())
+            halo = self.sprites[("halo",)] = (canvas.convert_alpha(), 0, 0)
+        fill = saint.boss_bar_fill()
+        bar = self.sprites.get(("boss_bar", fill))
+        if bar is None:
+            canvas = pygame.Surface(bar_rect.inflate(4, 4).size, pygame.SRCALPHA)
+            SkibidiToilet.draw_boss_bar(canvas, bar_rect.move(2 - bar_rect.x, 2 - bar_rect.y), fill)
+            bar = self.sprites[("boss_bar", fill)] = (canvas.convert_alpha(), -2, -2)
+        drawn = surface.blit(halo[0], halo_rect.topleft)
+        drawn.union_ip(surface.blit(bar[0], (bar_rect.x + bar[1], bar_rect.y + bar[2])))
+        if saint.label:
+            drawn.union_ip(saint.draw_label(surface, base_rect))
+        return drawn
+
+    @staticmethod
+    def merged_shadows(spans: List[tuple[float, float, float]]) -> List[pygame.Rect]:
+        """One ellipse rect per run of overlapping (left, right, y) shadows in the same 16 px ground band."""
+        bands: dict[int, List[tuple[float, float, float]]] = {}
+        for span in spans:
+            bands.setdefault(int(span[2]) // 16, []).append(span)
+        rects = []
+        for band in bands.values():
+            band.sort()
+            left, right, y_total = band[0]
+            count = 1
+            for span_left, span_right, y in band[1:]:
+                if span_left <= right:
+                    right = max(right, span_right)
+                    y_total += y
+                    count += 1
+                    continue
+                rects.append(pygame.Rect(int(left), int(y_total / count) - 8, int(right - left), 16))
+                left, right, y_total = span_left, span_right, y
+                count = 1
+            rects.append(pygame.Rect(int(left), int(y_total / count) - 8, int(right - left), 16))
+        return rects
+
+
+class ActorSpriteCache:
+    """Bakes player and ally poses into alpha sprites so each draws as a single blit.
+
+    The key holds only what changes the pixels (form, facing, TV scanline, crack,
+    health bar fill). Position and bob stay live rect math, and the sprite is
+    placed relative to the torso rect, so it lands on the pixels drawing the
+    shapes would. On a Viewport the blit reuses its cached scaled copy.
+    """
+
+    MAX_SPRITES = 512
+
+    def __init__(self) -> None:
+        self.sprites: dict[tuple, tuple[pygame.Surface, int, int]] = {}
+
+    def bake(
+        self, key: tuple, body_size: tuple[int, int], margin: int, draw: Callable[[pygame.Surface, pygame.Rect], None]
+    ) -> tuple[pygame.Surface, int, int]:
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            if len(self.sprites) >= self.MAX_SPRITES:
+                self.sprites.clear()
+            canvas = pygame.Surface((body_size[0] + margin * 2, body_size[1] + margin * 2), pygame.SRCALPHA)
+            draw(canvas, pygame.Rect((margin, margin), body_size))
+            bounds = canvas.get_bounding_rect()
+            sprite = canvas.subsurface(bounds).copy().convert_alpha(), bounds.x - margin, bounds.y - margin
+            self.sprites[key] = sprite
+        return sprite
+
+    def draw_player(self, surface: pygame.Surface, player: CameraMan, detailed: bool = True) -> pygame.Rect:
+        base_rect = player.body_rect()
+        sprite, dx, dy = self.bake(
+            ("player", *player.pose_key(detailed)),
+            base_rect.size,
+            64,
+            lambda canvas, rect: player.draw_pose(canvas, rect, detailed),
+        )
+        return surface.blit(sprite, (base_rect.x + dx, base_rect.y + dy))
+
+    def draw_ally(self, surface: pygame.Surface, ally: "Ally") -> pygame.Rect:
+        torso = ally.body_rect()
+        sprite, dx, dy = self.bake(("ally", ally.health_fill()), torso.size, 48, ally.draw_pose)
+        return surface.blit(sprite, (torso.x + dx, torso.y + dy))
+
+
+class EnemyGrid:
+    """Uniform grid over toilet positions so hit queries only look at nearby cells.
+
+    ``invalidate`` marks the index stale and the next query rebuilds it from
+    the enemy list. Player hit queries all run against positions from the
+    start of the tick, before ``CombatResolver.resolve()`` applies knockback
+    and kills, so the grid is never patched for them; it is invalidated again
+    after movement for the ally-contact pass, where ``move`` re-buckets each
+    repelled toilet. Ticks without any query never pay for a rebuild.
+    """
+
+    def __init__(self, cell_size: int = ENEMY_GRID_CELL) -> None:
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], List[SkibidiToilet]] = {}
+        self.cell_of: dict[int, tuple[int, int]] = {}
+        self.source: List[SkibidiToilet] = []
+        self.stale = True
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def invalidate(self, enemies: List[SkibidiToilet]) -> None:
+        self.source = enemies
+        self.stale = True
+
+    def _sync(self) -> None:
+        if not self.stale:
+            return
+        self.stale = False
+        self.cells.clear()
+        self.cell_of.clear()
+        for enemy in self.source:
+            self.insert(enemy)
+
+    def insert(self, enemy: SkibidiToilet) -> None:
+        cell = self._cell(enemy.position.x, enemy.position.y)
+        self.cells.setdefault(cell, []).append(enemy)
+        self.cell_of[id(enemy)] = cell
+
+    def remove(self, enemy: SkibidiToilet) -> None:
+        if self.stale:
+            return
+        cell = self.cell_of.pop(id(enemy), None)
+        if cell is None:
+            return
+        bucket = self.cells[cell]
+        bucket.remove(enemy)
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, enemy: SkibidiToilet) -> None:
+        """Re-bucket a toilet after its position changed."""
+        if self.stale:
+            return
+        cell = self._cell(enemy.position.x, enemy.position.y)
+        if self.cell_of.get(id(enemy)) != cell:
+            self.remove(enemy)
+            self.insert(enemy)
+
+    def _candidates(self, left: float, top: float, right: float, bottom: float) -> List[SkibidiToilet]:
+        # One cell of margin covers Rect's truncating point tests at cell borders.
+        min_cx, min_cy = self._cell(left, top)
+        max_cx, max_cy = self._cell(right, bottom)
+        found: List[SkibidiToilet] = []
+        cells = self.cells
+        for cy in range(min_cy - 1, max_cy + 2):
+            for cx in range(min_cx - 1, max_cx + 2):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def query_rect(self, rect: pygame.Rect) -> List[SkibidiToilet]:
+        """Toilets whose position passes ``rect.collidepoint``."""
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+        self._sync()
+        return [
+            enemy
+            for enemy in self._candidates(rect.left, rect.top, rect.right, rect.bottom)
+            if rect.collidepoint(enemy.position.x, enemy.position.y)
+        ]
+
+    def query_radius(self, center: pygame.Vector2, radius: float) -> List[SkibidiToilet]:
+        """Toilets within ``radius`` of ``center``, compared on squared distance."""
+        self._sync()
+        cx, cy = center.x, center.y
+        radius_sq = radius * radius
+        hits = []
+        for enemy in self._candidates(cx - radius, cy - radius, cx + radius, cy + radius):
+            dx = enemy.position.x - cx
+            dy = enemy.position.y - cy
+            if dx * dx + dy * dy <= radius_sq:
+                hits.append(enemy)
+        return hits
+
+
+class ToiletView(SkibidiToilet):
+    """SkibidiToilet facade whose moving parts live in a ToiletSwarm slot.
+
+    Static look and scoring fields are copied onto the view; position, health,
+    speed, stun, wobble and anger read and write the swarm arrays, so hit
+    handlers and draw code can treat it like any other toilet. A view is
+    detached (``slot == -1``) once removed from its swarm and must not be read.
+    """
+
+    __slots__ = ("swarm", "slot")
+
+    def __init__(self, swarm: "ToiletSwarm", slot: int, source: SkibidiToilet) -> None:
+        for field in fields(SkibidiToilet):
+            if field.name not in ToiletSwarm.ARRAY_FIELDS:
+                setattr(self, field.name, getattr(source, field.name))
+        self.swarm = swarm
+        self.slot = slot
+
+    @property
+    def position(self) -> pygame.Vector2:
+        return pygame.Vector2(self.swarm.x[self.slot], self.swarm.y[self.slot])
+
+    @position.setter
+    def position(self, value: pygame.Vector2) -> None:
+        self.swarm.x[self.slot] = value[0]
+        self.swarm.y[self.slot] = value[1]
+
+    @property
+    def prev_position(self) -> pygame.Vector2:
+        return pygame.Vector2(self.swarm.prev_x[self.slot], self.swarm.prev_y[self.slot])
+
+    @prev_position.setter
+    def prev_position(self, value: pygame.Vector2 | None) -> None:
+        if value is not None:
+            self.swarm.prev_x[self.slot] = value[0]
+            self.swarm.prev_y[self.slot] = value[1]
+
+    @property
+    def health(self) -> int:
+        return int(self.swarm.health[self.slot])
+
+    @health.setter
+    def health(self, value: int) -> None:
+        self.swarm.health[self.slot] = value
+
+    @property
+    def speed(self) -> float:
+        return float(self.swarm.speed[self.slot])
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        self.swarm.speed[self.slot] = value
+
+    @property
+    def stun_timer(self) -> float:
+        return float(self.swarm.stun[self.slot])
+
+    @stun_timer.setter
+    def stun_timer(self, value: float) -> None:
+        self.swarm.stun[self.slot] = value
+
+    @property
+    def wobble_phase(self) -> float:
+        return float(self.swarm.wobble[self.slot])
+
+    @wobble_phase.setter
+    def wobble_phase(self, value: float) -> None:
+        self.swarm.wobble[self.slot] = value
+
+    @property
+    def wiggle_amp(self) -> float:
+        return float(self.swarm.wiggle[self.slot])
+
+    @wiggle_amp.setter
+    def wiggle_amp(self, value: float) -> None:
+        self.swarm.wiggle[self.slot] = value
+
+    @property
+    def angry(self) -> bool:
+        return bool(self.swarm.angry[self.slot])
+
+    @angry.setter
+    def angry(self, value: bool) -> None:
+        self.swarm.angry[self.slot] = value
+
+    def is_dead(self) -> bool:
+        return self.slot < 0 or self.health <= 0
+
+    def update(self, target: pygame.Vector2, dt: float) -> None:
+        raise RuntimeError("swarm toilets are stepped by ToiletSwarm.step")
+
+
+class ToiletPool:
+    """Recycles toilets and swarm views so a warmed-up session spawns without allocating.
+
+    Toilets retired during a tick only become reusable at the next recycle(), so
+    that tick's combat events still describe the toilets that died.
+    """
+
+    def __init__(self) -> None:
+        self.free: List[SkibidiToilet] = []
+        self.free_views: List[ToiletView] = []
+        self.retired: List[SkibidiToilet] = []
+
+    def acquire(self, x: float, y: float, **values) -> SkibidiToilet:
+        if not self.free:
+            return SkibidiToilet(position=pygame.Vector2(x, y), **values)
+        toilet = self.free.pop()
+        position, prev = toilet.position, toilet.prev_position
+        position.update(x, y)
+        # Re-running the dataclass __init__ resets every field to its spawn default.
+        toilet.__init__(position=position, **values)
+        if prev is not None:
+            prev.update(x, y)
+            toilet.prev_position = prev
+        return toilet
+
+    def view(self, swarm: "ToiletSwarm", slot: int, source: SkibidiToilet) -> ToiletView:
+        if not self.free_views:
+            return ToiletView(swarm, slot, source)
+        view = self.free_views.pop()
+        view.__init__(swarm, slot, source)
+        return view
+
+    def retire(self, toilets: List[SkibidiToilet]) -> None:
+        self.retired.extend(toilets)
+
+    def recycle(self) -> None:
+        for toilet in self.retired:
+            (self.free_views if isinstance(toilet, ToiletView) else self.free).append(toilet)
+        self.retired.clear()
+
+
+class ToiletSwarm:
+    """Struct-of-arrays enemy store that moves and collides every toilet with NumPy.
+
+    ``views`` is the game's enemy list: one ToiletView per live slot, kept in
+    slot order. Removal swaps the last slot into the hole, so it is O(1) but
+    does not preserve spawn order.
+    """
+
+    ARRAY_FIELDS = ("position", "prev_position", "health", "speed", "stun_timer", "wobble_phase", "wiggle_amp", "angry")
+    COLUMNS = {
+        "x": float, "y": float, "prev_x": float, "prev_y": float,
+        "speed": float, "wobble": float, "wiggle": float,
+        "health": np.int64 if np else int, "stun": float, "contact": np.int64 if np else int,
+        "angry": bool, "saint": bool,
+    }
+
+    def __init__(self, views: List[SkibidiToilet], pool: ToiletPool | None = None, capacity: int = 256) -> None:
+        self.views = views
+        self.pool = pool if pool is not None else ToiletPool()
+        self.count = 0
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def _arrays(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.COLUMNS)
+
+    def _grow(self) -> None:
+        capacity = len(self.x) * 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[: self.count] = old[: self.count]
+            setattr(self, name, grown)
+
+    def add(self, toilet: SkibidiToilet) -> ToiletView:
+        if self.count == len(self.x):
+            self._grow()
+        slot = self.count
+        self.count += 1
+        self.x[slot] = self.prev_x[slot] = toilet.position.x
+        self.y[slot] = self.prev_y[slot] = toilet.position.y
+        self.speed[slot] = toilet.speed
+        self.wobble[slot] = toilet.wobble_phase
+        self.wiggle[slot] = toilet.wiggle_amp
+        self.health[slot] = toilet.health
+        self.stun[slot] = toilet.stun_timer
+        self.contact[slot] = toilet.contact_damage
+        self.angry[slot] = toilet.angry
+        self.saint[slot] = toilet.is_saint
+        view = self.pool.view(self, slot, toilet)
+        self.views.append(view)
+        return view
+
+    def remove(self, view: ToiletView) -> None:
+        slot = view.slot
+        last = self.count - 1
+        if slot != last:
+            for array in self._arrays():
+                array[slot] = array[last]
+            moved = self.views[last]
+            moved.slot = slot
+            self.views[slot] = moved
+        self.views.pop()
+        self.count = last
+        view.slot = -1
+
+    def remove_many(self, views: List[ToiletView]) -> None:
+        """Drop several slots with one compaction of every column; survivors keep their order."""
+        n = self.count
+        gone = np.zeros(n, dtype=bool)
+        gone[[view.slot for view in views]] = True
+        keep = np.flatnonzero(~gone)
+        for array in self._arrays():
+            array[: len(keep)] = array[keep]
+        survivors = [self.views[i] for i in keep]
+        for slot, view in enumerate(survivors):
+            view.slot = slot
+        for view in views:
+            view.slot = -1
+        self.views[:] = survivors
+        self.count = len(keep)
+
+    def clear(self) -> None:
+        for view in self.views:
+            view.slot = -1
+        self.views.clear()
+        self.count = 0
+
+    def store_previous(self) -> None:
+        self.prev_x[: self.count] = self.x[: self.count]
+        self.prev_y[: self.count] = self.y[: self.count]
+
+    def detached(self) -> List[SkibidiToilet]:
+        """SkibidiToilet.detached for every view, reading each moving field as one column instead of per property."""
+        n = self.count
+        columns = zip(
+            self.x[:n].tolist(), self.y[:n].tolist(), self.prev_x[:n].tolist(), self.prev_y[:n].tolist(),
+            self.health[:n].tolist(), self.speed[:n].tolist(), self.stun[:n].tolist(),
+            self.wobble[:n].tolist(), self.wiggle[:n].tolist(), self.angry[:n].tolist(),
+        )
+        return [
+            SkibidiToilet(
+                pygame.Vector2(x, y), health, speed, view.label, view.scale, view.is_saint, view.is_medium,
+                view.is_police, angry, wobble, wiggle, view.body_color, view.rim_color, view.eye_color,
+                view.score_value, view.contact_damage, stun, view.uid, pygame.Vector2(prev_x, prev_y),
+            )
+            for view, (x, y, prev_x, prev_y, health, speed, stun, wobble, wiggle, angry) in zip(self.views, columns)
+        ]
+
+    def step(self, target: pygame.Vector2, dt: float) -> None:
+        """Vectorised SkibidiToilet.update for every slot."""
+        n = self.count
+        if n == 0:
+            return
+        x, y = self.x[:n], self.y[:n]
+        stun = self.stun[:n]
+        stunned = stun > 0
+        np.maximum(stun - dt, 0, out=stun, where=stunned)
+        wobble = self.wobble[:n]
+        wobble += dt * 0.01
+        np.mod(wobble, 2 * math.pi, out=wobble)
+
+        moving = ~stunned
+        dx = target.x - x
+        dy = target.y - y
+        dist = np.sqrt(dx * dx + dy * dy)
+        heading = moving & (dist > 0)
+        speed = self.speed[:n].copy()
+        angry = self.angry[:n]
+        enraged = heading & self.saint[:n] & (angry | (self.health[:n] <= 6))
+        if enraged.any():
+            speed[enraged] += 0.7
+            angry |= enraged
+            for i in np.flatnonzero(enraged):
+                self.views[i].eye_color = (160, 20, 20)
+        # Divide then scale, as SkibidiToilet.update does, so both stores round alike and stay bit-identical.
+        x += np.divide(dx, dist, out=np.zeros(n), where=heading) * speed
+        y += np.divide(dy, dist, out=np.zeros(n), where=heading) * speed
+        y += np.where(moving, np.sin(wobble * 0.6) * 0.12 * self.wiggle[:n], 0.0)
+
+    def _push_from(self, origin: pygame.Vector2, strength: float) -> np.ndarray:
+        """Knock back active toilets touching ``origin``; returns the contact mask."""
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        dx = x - origin.x
+        dy = y - origin.y
+        dist_sq = dx * dx + dy * dy
+        hits = (self.stun[:n] <= 0) & (dist_sq <= ENEMY_CONTACT_DISTANCE * ENEMY_CONTACT_DISTANCE)
+        if hits.any():
+            push = hits & (dist_sq > 0)
+            dist = np.sqrt(dist_sq)
+            # away.normalize() * strength, in that order.
+            x += np.divide(dx, dist, out=np.zeros(n), where=push) * strength
+            y += np.divide(dy, dist, out=np.zeros(n), where=push) * strength
+        return hits
+
+    def resolve_contacts(self, player: "CameraMan", allies: List["Ally"]) -> None:
+        """Vectorised player and ally contact damage plus repel from Game.update."""
+        if self.count == 0:
+            return
+        hits = self._push_from(player.position, 16)
+        if hits.any():
+            # Only the first contact lands; take_damage starts the player's i-frames.
+            player.take_damage(int(self.contact[: self.count][hits][0]))
+        for ally in allies:
+            hits = self._push_from(ally.position, 10)
+            if hits.any():
+                ally.health = max(0, ally.health - int(self.contact[: self.count][hits].sum()))
+
+
+# Particle colours and full-size radii; kinds pick from these and the sprite table is built from them.
+PARTICLE_PALETTE: tuple[tuple[tuple[int, int, int, int], int], ...] = (
+    ((255, 230, 140, 255), 3),  # 0 spark
+    ((255, 255, 255, 255), 2),  # 1 white spark
+    ((228, 232, 238, 255), 4),  # 2 porcelain
+    ((130, 190, 255, 255), 3),  # 3 water
+    ((150, 150, 165, 255), 3),  # 4 grey chip
+    ((255, 170, 80, 230), 3),  # 5 ember
+    ((190, 160, 255, 200), 4),  # 6 violet dust
+    ((150, 140, 170, 150), 6),  # 7 dust
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ParticleKind:
+    colors: tuple[int, ...]  # PARTICLE_PALETTE indices, picked at random per particle
+    count: int  # particles per emission point
+    life: int  # milliseconds
+    speed: tuple[float, float]  # pixels per tick
+    gravity: float  # pixels per tick added to the vertical speed each tick; negative drifts up
+    drag: float  # velocity kept per tick
+    lift: float = 0.0  # extra upward pixels per tick at launch
+
+
+PARTICLE_KINDS = {
+    "spark": ParticleKind((0, 1), 5, 220, (2.0, 5.0), 0.0, 0.85),
+    "debris": ParticleKind((2, 2, 3, 4), 12, 700, (2.0, 6.0), 0.35, 0.98, lift=3.0),
+    "ember": ParticleKind((5, 0), 3, 500, (0.5, 2.0), -0.05, 0.95),
+    "dust": ParticleKind((7, 6), 4, 450, (1.0, 3.0), -0.02, 0.9),
+    "shockwave": ParticleKind((7, 7, 6), 1, 420, (16.0, 22.0), -0.02, 0.88),
+}
+# Which particles a landed hit throws, by CombatEvent source; kills always throw debris.
+HIT_PARTICLES = {
+    "punch": "spark", "kick": "spark", "stab": "spark", "ally_punch": "spark",
+    "flash": "ember", "ally_flash": "ember", "blast": "dust", "soundwave": "dust",
+}
+
+
+class ParticleSystem:
+    """Cosmetic particles in fixed NumPy arrays, written as a ring so the oldest are recycled first.
+
+    emit() fills a batch of slots at once, update() advances every slot with a
+    handful of array operations, and draw() blits the live ones from a small
+    sprite table in one ``blits`` call. Particles roll their own generator, so
+    they never touch the game's seeded RNG or its state hashes.
+    """
+
+    def __init__(self, capacity: int = PARTICLE_CAPACITY) -> None:
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.drag = np.ones(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.max_life = np.ones(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.intp)
+        self.head = 0  # next slot to write; the slots after it hold the oldest particles
+        self.live = 0
+        self.rng = np.random.default_rng()
+        self.sprites: List[pygame.Surface] = []
+        self.offsets = np.zeros(0, dtype=np.intp)
+
+    def clear(self) -> None:
+        self.life[:] = 0
+        self.live = 0
+
+    def emit(self, name: str, xs: List[float], ys: List[float], count: int | None = None) -> None:
+        """Throw ``count`` (default: the kind's count) particles of kind ``name`` from each origin."""
+        kind = PARTICLE_KINDS[name]
+        per_origin = kind.count if count is None else count
+        n = min(self.capacity, len(xs) * per_origin)
+        if n == 0:
+            return
+        slots = (self.head + np.arange(n)) % self.capacity
+        self.head = int(slots[-1] + 1) % self.capacity
+        rng = self.rng
+        angle = rng.uniform(0, 2 * math.pi, n)
+        speed = rng.uniform(*kind.speed, n)
+        self.position[slots, 0] = np.repeat(np.asarray(xs, dtype=np.float32), per_origin)[:n]
+        self.position[slots, 1] = np.repeat(np.asarray(ys, dtype=np.float32), per_origin)[:n]
+        self.velocity[slots, 0] = np.cos(angle) * speed
+        self.velocity[slots, 1] = np.sin(angle) * speed - kind.lift
+        self.gravity[slots] = kind.gravity
+        self.drag[slots] = kind.drag
+        life = rng.uniform(0.7, 1.0, n) * kind.life
+        self.life[slots] = life
+        self.max_life[slots] = life
+        self.color[slots] = rng.choice(kind.colors, n)
+        self.live = min(self.capacity, self.live + n)
+
+    def update(self, dt: float) -> None:
+        if not self.live:
+            return
+        velocity = self.velocity
+        velocity[:, 1] += self.gravity
+        velocity *= self.drag[:, None]
+        self.position += velocity
+        self.life -= dt
+        self.live = int(np.count_nonzero(self.life > 0))
+
+    def build_sprites(self) -> None:
+        """One soft dot per palette colour and size step, indexed colour * PARTICLE_SIZE_STEPS + step."""
+        sprites = []
+        offsets = []
+        for color, radius in PARTICLE_PALETTE:
+            for step in range(1, PARTICLE_SIZE_STEPS + 1):
+                r = max(1, round(radius * step / PARTICLE_SIZE_STEPS))
+                sprite = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+                pygame.draw.circle(sprite, color, (r, r), r)
+                sprites.append(sprite.convert_alpha())
+                offsets.append(r)
+        self.sprites = sprites
+        self.offsets = np.array(offsets, dtype=np.intp)
+
+    def draw(self, surface: pygame.Surface) -> pygame.Rect | None:
+        """Blit the live particles; returns the area they cover, or None when there are none."""
+        if not self.live:
+            return None
+        if not self.sprites:
+            self.build_sprites()
+        alive = np.flatnonzero(self.life > 0)
+        step = np.ceil(self.life[alive] / self.max_life[alive] * PARTICLE_SIZE_STEPS).astype(np.intp) - 1
+        sprite_ids = self.color[alive] * PARTICLE_SIZE_STEPS + np.clip(step, 0, PARTICLE_SIZE_STEPS - 1)
+        offsets = self.offsets[sprite_ids]
+        xs = self.position[alive, 0].astype(np.intp) - offsets
+        ys = self.position[alive, 1].astype(np.intp) - offsets
+        sprites = self.sprites
+        batch = list(zip([sprites[i] for i in sprite_ids.tolist()], zip(xs.tolist(), ys.tolist())))
+        fblits = getattr(surface, "fblits", None)
+        if fblits is not None:
+            fblits(batch)
+        else:
+            surface.blits(batch, doreturn=False)
+        size = 2 * int(self.offsets.max())
+        left, top = int(xs.min()), int(ys.min())
+        return pygame.Rect(left, top, int(xs.max()) - left + size, int(ys.max()) - top + size)
+
+
+class ParticleRelay:
+    """Stands in for a ParticleSystem on the simulation thread.
+
+    emit, update and clear only append to a deque; draw() on the render thread
+    replays whatever has arrived into the real system before drawing it, so the
+    particle arrays are only ever touched by one thread.
+    """
+
+    def __init__(self, target: ParticleSystem) -> None:
+        self.target = target
+        self.calls: deque[tuple] = deque()
+
+    def clear(self) -> None:
+        self.calls.append(("clear",))
+
+    def emit(self, name: str, xs: List[float], ys: List[float], count: int | None = None) -> None:
+        self.calls.append(("emit", name, xs, ys, count))
+
+    def update(self, dt: float) -> None:
+        self.calls.append(("update", dt))
+
+    def draw(self, surface: pygame.Surface) -> pygame.Rect | None:
+        calls, target = self.calls, self.target
+        while calls:
+            name, *args = calls.popleft()
+            getattr(target, name)(*args)
+        return target.draw(surface)
+
+
+@dataclass
+class CombatEvent:
+    kind: str  # "hit" or "kill"
+    source: str  # ability that landed it, e.g. "punch", "blast", "ally_flash"
+    enemy: SkibidiToilet
+    damage: int = 0
+    score: int = 0
+
+
+class CombatResolver:
+    """Collects a tick's hits from the player and allies and applies them in one pass.
+
+    Abilities only queue hits while they query the enemy grid. resolve() applies
+    damage, knockback and stun in queue order and returns the toilets that died,
+    so the game can remove them with a single compaction. ``events`` holds the
+    current tick's hits and kills (with their score) until the next clear().
+    """
+
+    def __init__(self) -> None:
+        self.pending: List[tuple[SkibidiToilet, str, int, pygame.Vector2 | None, int]] = []
+        self.events: List[CombatEvent] = []
+
+    def clear(self) -> None:
+        self.pending.clear()
+        self.events.clear()
+
+    def hit(
+        self,
+        enemy: SkibidiToilet,
+        source: str,
+        damage: int,
+        knock: pygame.Vector2 | None = None,
+        stun: int = 0,
+    ) -> None:
+        self.pending.append((enemy, source, damage, knock, stun))
+
+    def resolve(self) -> List[SkibidiToilet]:
+        killed: List[SkibidiToilet] = []
+        for enemy, source, damage, knock, stun in self.pending:
+            if enemy.is_dead():
+                continue  # already killed earlier this tick
+            enemy.take_damage(damage)
+            if knock is not None:
+                enemy.position += knock
+            if stun:
+                enemy.stun_timer = max(enemy.stun_timer, stun)
+            self.events.append(CombatEvent("hit", source, enemy, damage))
+            if enemy.is_dead():
+                killed.append(enemy)
+                self.events.append(CombatEvent("kill", source, enemy, score=enemy.score_value))
+        self.pending.clear()
+        return killed
+
+
+@dataclass(eq=False)
+class Building:
+    rect: pygame.Rect
+    color: tuple[int, int, int]
+    window_color: tuple[int, int, int]
+    windows: List[tuple[int, int, int]]  # (x, y, size) relative to the building's top-left
+    surface: pygame.Surface | None = None
+    prev_x: int | None = None
+
+    def render_x(self, alpha: float) -> int:
+        if self.prev_x is None:
+            return self.rect.x
+        return int(self.prev_x + (self.rect.x - self.prev_x) * alpha)
+
+    # The building a detached copy was taken from; render() bakes into it so every copy shares one surface.
+    source: "Building | None" = None
+
+    def detached(self) -> "Building":
+        """Copy at the current scroll position; it bakes lazily, on whichever thread draws it."""
+        return Building(
+            self.rect.copy(), self.color, self.window_color, self.windows, prev_x=self.prev_x, source=self.source or self
+        )
+
+    def render(self) -> pygame.Surface:
+        """Bakes the wall and its windows once; windows no longer reshuffle every frame."""
+        owner = self.source or self
+        if owner.surface is None:
+            surface = pygame.Surface(self.rect.size).convert()
+            surface.fill(self.color)
+            for x, y, size in self.windows:
+                pygame.draw.rect(surface, self.window_color, pygame.Rect(x, y, size, size))
+            owner.surface = surface
+        return owner.surface
+
+
+class CityMap:
+    # Static backdrop and street per map mode, shared by every CityMap once built.
+    _layers: dict[str, tuple[pygame.Surface, pygame.Surface]] = {}
+
+    def __init__(
+        self, mode: str = "street", rng: random.Random | None = None, buildings: List[Building] | None = None
+    ) -> None:
+        self.rng = rng if rng is not None else random.Random()
+        self.buildings: List[Building] = []
+        self.street_lines: List[int] = (
+            [SCREEN_HEIGHT - 190, SCREEN_HEIGHT - 120] if mode == "center" else [SCREEN_HEIGHT - 160, SCREEN_HEIGHT - 110]
+        )
+        self.mode = mode
+        self.street_y = SCREEN_HEIGHT - (140 if self.mode == "center" else 80)
+        if buildings is not None:
+            self.buildings = buildings  # restored from a snapshot; the skyline is not rolled again
+            return
+        start_x = 0
+        building_count = 16 if self.mode == "street" else 22
+        for _ in range(building_count):
+            w, h, y_offset = self.random_building_size()
+            x = start_x + self.rng.randint(30, 120)
+            start_x = x + w + self.rng.randint(40, 140 if self.mode == "center" else 120)
+            self.buildings.append(self.make_building(x, w, h, y_offset))
+
+    def random_building_size(self) -> tuple[int, int, int]:
+        if self.mode == "center":
+            w, h = self.rng.randint(180, 280), self.rng.randint(220, 320)
+            y_offset = self.rng.randint(60, 120)
+        else:
+            w, h = self.rng.randint(80, 200), self.rng.randint(80, 180)
+            y_offset = self.rng.randint(120, 200)
+        return w, h, y_offset
+
+    def make_building(self, x: int, w: int, h: int, y_offset: int) -> Building:
+        y = SCREEN_HEIGHT - h - y_offset
+        window_palette = (
+            [(255, 220, 120), (140, 180, 230), (90, 110, 160)]
+            if self.mode == "center"
+            else [(255, 200, 40), (120, 150, 190), (70, 90, 120)]
+        )
+        window_color = self.rng.choice(window_palette)
+        windows = []
+        for _ in range(self.rng.randint(3, 7)):
+            size = self.rng.randint(6, 10)
+            px = self.rng.randint(6, w - 6)
+            py = self.rng.randint(6, h - 6)
+            windows.append((px, py, size))
+        color = (70, 82, 102) if self.mode == "center" else (58, 68, 83)
+        return Building(pygame.Rect(x, y, w, h), color, window_color, windows)
+
+    def detached(self) -> "CityMap":
+        """The skyline as it stands now; the copy is only drawn, so it shares the generator and never rolls it."""
+        return CityMap(self.mode, self.rng, [building.detached() for building in self.buildings])
+
+    def update(self, dt: float) -> None:
+        dx = (CITY_SCROLL_SPEED_CENTER if self.mode == "center" else CITY_SCROLL_SPEED) * (dt / 1000.0)
+        for building in list(self.buildings):
+            building.prev_x = building.rect.x
+            building.rect.x -= dx
+            if building.rect.right < -80:
+                self.buildings.remove(building)
+                w, h, y_offset = self.random_building_size()
+                x = SCREEN_WIDTH + self.rng.randint(40, 180)
+                self.buildings.append(self.make_building(x, w, h, y_offset))
+
+    def layers(self) -> tuple[pygame.Surface, pygame.Surface]:
+        layers = CityMap._layers.get(self.mode)
+        if layers is None:
+            backdrop = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            backdrop.fill((26, 30, 40) if self.mode == "center" else (30, 34, 42))
+            # Grid floor to hint the cameraman is moving right across the city.
+            for x in range(-CITY_GRID_SIZE, SCREEN_WIDTH + CITY_GRID_SIZE, CITY_GRID_SIZE):
+                pygame.draw.line(backdrop, (48, 54, 63), (x, 0), (x, SCREEN_HEIGHT))
+            for y in range(0, SCREEN_HEIGHT, CITY_GRID_SIZE):
+                pygame.draw.line(backdrop, (48, 54, 63), (0, y), (SCREEN_WIDTH, y))
+
+            # Street lane markers to sell the walking-forward direction.
+            street = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT - self.street_y)).convert()
+            street.fill((20, 22, 28) if self.mode == "center" else (26, 28, 34))
+            dash_step = 60 if self.mode == "center" else 80
+            for i in range(0, SCREEN_WIDTH, dash_step):
+                pygame.draw.rect(street, (255, 215, 120), pygame.Rect(i + 10, 38, 40, 6), border_radius=3)
+            layers = (backdrop, street)
+            CityMap._layers[self.mode] = layers
+        return layers
+
+    def draw(self, surface: pygame.Surface, alpha: float = 1.0, windows: bool = True) -> List[pygame.Rect]:
+        """Composites the cached layers; returns the building areas, which change as the skyline scrolls.
+
+        ``windows=False`` fills each building with its wall colour instead of blitting its baked surface.
+        """
+        backdrop, street = self.layers()
+        surface.blit(backdrop, (0, 0))
+        if windows:
+            drawn = surface.blits(
+                [(building.render(), (building.render_x(alpha), building.rect.y)) for building in self.buildings]
+            )
+        else:
+            drawn = [
+                surface.fill(building.color, (building.render_x(alpha), building.rect.y, *building.rect.size))
+                for building in self.buildings
+            ]
+        surface.blit(street, (0, self.street_y))
+        return drawn
+
+
+@dataclass(slots=True)
+class Ally:
+    position: pygame.Vector2
+    health: int = FORM_MAX_HEALTH["cameraman"]
+    flash_cooldown_timer: float = 0
+    punch_cooldown_timer: float = 0
+    bob_phase: float = 0.0
+    prev_position: pygame.Vector2 | None = None
+    target: SkibidiToilet | None = field(default=None, compare=False, repr=False)
+    retarget_timer: float = 0
+
+    def detached(self) -> "Ally":
+        """Copy with its own vectors and no target, for a frame snapshot."""
+        prev = self.prev_position
+        return replace(
+            self, position=self.position.copy(), prev_position=None if prev is None else prev.copy(), target=None
+        )
+
+    def render_position(self, alpha: float) -> pygame.Vector2:
+        """Position blended between the last two simulation ticks."""
+        if self.prev_position is None:
+            return self.position
+        return self.prev_position.lerp(self.position, alpha)
+
+    def posed(self, alpha: float) -> "Ally":
+        """Shallow copy standing at render_position(alpha), for drawing."""
+        return replace(self, position=self.render_position(alpha))
+
+    def update(self, dt: float, grid: EnemyGrid, combat: CombatResolver) -> None:
+        """Chase and fight the target AllySquad assigned; idle while there is none."""
+        self.flash_cooldown_timer = max(0, self.flash_cooldown_timer - dt)
+        self.punch_cooldown_timer = max(0, self.punch_cooldown_timer - dt)
+        self.bob_phase = (self.bob_phase + dt * 0.005) % (2 * math.pi)
+        target = self.target
+        if target is None or target.is_dead():
+            return
+
+        direction = target.position - self.position
+        distance = direction.length()
+
+        if distance > ALLY_STAND_DISTANCE and direction.length_squared() > 0:
+            self.position += direction.normalize() * ALLY_SPEED
+            self.position.x = max(26, min(SCREEN_WIDTH - 26, self.position.x))
+
+        if self.flash_cooldown_timer <= 0 and distance <= ALLY_FLASH_RANGE:
+            self.flash_cooldown_timer = ALLY_FLASH_COOLDOWN
+            for enemy in grid.query_radius(self.position, ALLY_FLASH_RANGE):
+                combat.hit(enemy, "ally_flash", FLASH_DAMAGE_CAMERAMAN, stun=320)
+
+        if self.punch_cooldown_timer <= 0 and distance <= ALLY_PUNCH_RANGE:
+            self.punch_cooldown_timer = ALLY_PUNCH_COOLDOWN
+            push = target.position - self.position
+            knock = push.normalize() * 14 if push.length_squared() > 0 else None
+            combat.hit(target, "ally_punch", ALLY_PUNCH_DAMAGE, knock)
+
+    def bounds(self) -> pygame.Rect:
+        """Screen area covered by draw(): torso, camera head and health bar, including bob."""
+        return pygame.Rect(int(self.position.x) - 26, int(self.position.y) - 88, 52, 94)
+
+    def body_rect(self) -> pygame.Rect:
+        """Torso rect at the current position and bob; the head and health bar sit relative to it."""
+        bob = math.sin(self.bob_phase) * 2.6
+        torso = pygame.Rect(0, 0, 44, 58)
+        torso.midbottom = (self.position.x, self.position.y + bob)
+        return torso
+
+    def health_fill(self) -> int:
+        health_ratio = max(0, min(1, self.health / FORM_MAX_HEALTH["cameraman"]))
+        return int(42 * health_ratio)
+
+    def draw(self, surface: pygame.Surface) -> None:
+        self.draw_pose(surface, self.body_rect())
+
+    def draw_pose(self, surface: pygame.Surface, torso: pygame.Rect) -> None:
+        pygame.draw.rect(surface, (26, 118, 210), torso, border_radius=8)
+        jacket = torso.inflate(-12, -8)
+        pygame.draw.rect(surface, (18, 40, 80), jacket, border_radius=6, width=2)
+
+        head = pygame.Rect(0, 0, 32, 24)
+        head.midbottom = torso.midtop
+        pygame.draw.rect(surface, (224, 232, 246), head, border_radius=4)
+        lens = pygame.Rect(0, 0, 16, 10)
+        lens.midleft = head.midleft
+        pygame.draw.rect(surface, (30, 30, 34), lens, border_radius=3)
+        frame = lens.inflate(-6, -4)
+        pygame.draw.rect(surface, (140, 190, 240), frame, border_radius=2)
+        grip = pygame.Rect(0, 0, 10, 18)
+        grip.midright = head.midright
+        pygame.draw.rect(surface, (30, 34, 40), grip, border_radius=2)
+        visor = pygame.Rect(0, 0, 22, 6)
+        visor.midtop = head.midtop
+        pygame.draw.rect(surface, (50, 70, 120), visor, border_radius=2)
+
+        bar_width = 42
+        bar_height = 8
+        bar_rect = pygame.Rect(0, 0, bar_width, bar_height)
+        bar_rect.midbottom = (torso.centerx, torso.top - 8)
+        pygame.draw.rect(surface, (40, 20, 20), bar_rect.inflate(4, 4), border_radius=3)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = self.health_fill()
+        pygame.draw.rect(surface, (200, 80, 80), fill_rect, border_radius=3)
+        pygame.draw.rect(surface, (255, 220, 180), bar_rect, width=2, border_radius=3)
+
+
+class AllySquad:
+    """Shared target assignment and spacing for any number of allies.
+
+    Each ally re-picks its target every ALLY_RETARGET_INTERVAL, with the timers
+    staggered across the squad so only a slice of it searches on any one tick.
+    Searches go through the enemy grid and weigh distance against how many
+    allies already hold a target, which spreads the squad over the horde.
+    After moving, a sweep along the street pushes apart allies standing closer
+    than ALLY_SPACING.
+    """
+
+    @staticmethod
+    def formation(center_x: float, size: int) -> List[Ally]:
+        """Line ``size`` allies up around ``center_x`` with staggered retarget timers."""
+        spread = min(180, (SCREEN_WIDTH - 120) / max(1, size - 1))
+        allies = []
+        for i in range(size):
+            x = max(26, min(SCREEN_WIDTH - 26, center_x + spread * (i - (size - 1) / 2)))
+            allies.append(Ally(pygame.Vector2(x, PLAYER_GROUND_Y), retarget_timer=i * ALLY_RETARGET_INTERVAL // size))
+        return allies
+
+    def update(
+        self,
+        dt: float,
+        allies: List[Ally],
+        enemies: List[SkibidiToilet],
+        grid: EnemyGrid,
+        combat: CombatResolver,
+    ) -> None:
+        if not allies:
+            return
+        if enemies:
+            self.assign(dt, allies, enemies, grid)
+        for ally in allies:
+            ally.update(dt, grid, combat)
+        self.spread(allies)
+
+    def assign(self, dt: float, allies: List[Ally], enemies: List[SkibidiToilet], grid: EnemyGrid) -> None:
+        load: dict[int, int] = {}
+        for ally in allies:
+            if ally.target is not None and not ally.target.is_dead():
+                load[id(ally.target)] = load.get(id(ally.target), 0) + 1
+        for ally in allies:
+            ally.retarget_timer -= dt
+            current = ally.target
+            valid = current is not None and not current.is_dead()
+            if valid and ally.retarget_timer > 0:
+                continue
+            ally.retarget_timer = max(ally.retarget_timer + ALLY_RETARGET_INTERVAL, 1)
+            if valid:
+                load[id(current)] -= 1
+            candidates = grid.query_radius(ally.position, ALLY_SEARCH_RADIUS) or enemies
+            position = ally.position
+            target = min(
+                candidates,
+                key=lambda e: e.position.distance_to(position) + ALLY_CROWD_PENALTY * load.get(id(e), 0),
+            )
+            ally.target = target
+            load[id(target)] = load.get(id(target), 0) + 1
+
+    @staticmethod
+    def spread(allies: List[Ally]) -> None:
+        if len(allies) < 2:
+            return
+        ordered = sorted(allies, key=lambda ally: ally.position.x)
+        for left, right in zip(ordered, ordered[1:]):
+            gap = right.position.x - left.position.x
+            if gap < ALLY_SPACING:
+                push = (ALLY_SPACING - gap) / 2
+                left.position.x = max(26, left.position.x - push)
+                right.position.x = min(SCREEN_WIDTH - 26, right.position.x + push)
+
+
+class FontLibrary:
+    """System font files resolved once per machine and remembered on disk between launches.
+
+    ``pygame.font.SysFont`` scans every font directory on each call. This looks a
+    family up once, stores its file path (or that it has none) in a small JSON
+    file and afterwards loads fonts straight from that path.
+    """
+
+    def __init__(self, cache_path: str | None = FONT_CACHE_PATH) -> None:
+        self.cache_path = cache_path
+        self.paths: dict[str, str | None] = {}
+        self.fonts: dict[tuple[str, int], pygame.font.Font] = {}
+        self.lookups = 0
+        self.changed = False
+        if cache_path is not None:
+            try:
+                with open(cache_path, encoding="utf-8") as handle:
+                    paths = json.load(handle)
+            except (OSError, ValueError):
+                paths = {}
+            if isinstance(paths, dict):
+                self.paths = {str(name): path for name, path in paths.items() if path is None or isinstance(path, str)}
+
+    def path(self, name: str) -> str | None:
+        """File for the named family, or None for pygame's bundled default font."""
+        if name in self.paths:
+            path = self.paths[name]
+            if path is None or os.path.exists(path):
+                return path
+        # Only a miss (or a font file that has since disappeared) pays for the directory scan.
+        self.lookups += 1
+        path = pygame.font.match_font(name)
+        self.paths[name] = path
+        self.changed = True
+        return path
+
+    def font(self, name: str, size: int) -> pygame.font.Font:
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(self.path(name), size)
+        return font
+
+    def save(self) -> None:
+        if not self.changed or self.cache_path is None:
+            return
+        temp_path = f"{self.cache_path}.{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump(self.paths, handle, indent=2)
+            # Balance-sim workers may all save at once; replace() keeps the file whole.
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            return  # a read-only home just means resolving again next launch
+        self.changed = False
+
+
+class TextCache:
+    """Least-recently-used cache of rendered text surfaces keyed by (string, colour)."""
+
+    def __init__(self, font: pygame.font.Font, capacity: int = 256) -> None:
+        self.font = font
+        self.capacity = capacity
+        self.surfaces: OrderedDict[tuple[str, tuple[int, int, int]], pygame.Surface] = OrderedDict()
+
+    def render(self, text: str, color: tuple[int, int, int]) -> pygame.Surface:
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font.render(text, True, color).convert_alpha()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class EffectRenderer:
+    """Pre-rendered ability overlays, faded per frame with surface alpha instead of redrawn."""
+
+    def __init__(self) -> None:
+        self.beams: dict[tuple[int, int, bool, bool], pygame.Surface] = {}
+        self.blasts: dict[int, pygame.Surface] = {}
+        self.panels: dict[tuple[tuple[int, int], tuple[int, int, int]], pygame.Surface] = {}
+        # Coarse fades snap intensity to EFFECT_FADE_STEPS pre-faded copies. Blitting those
+        # skips SDL's per-pixel alpha modulation, which costs several times the plain blend.
+        self.coarse = False
+        self.faded: dict[tuple, pygame.Surface] = {}
+
+    def beam(self, size: tuple[int, int], stun: bool, facing_left: bool, intensity: float) -> pygame.Surface:
+        key = (size[0], size[1], stun, facing_left)
+        overlay = self.beams.get(key)
+        if overlay is None:
+            width, height = size
+            overlay = pygame.Surface(size, pygame.SRCALPHA)
+            primary_color = (255, 200, 120) if not stun else (150, 130, 255)
+            fringe_color = (80, 170, 255) if not stun else (220, 180, 255)
+            for i in range(width):
+                t = i / width
+                alpha = int(180 * (1 - t * 0.65))
+                pygame.draw.line(overlay, (*primary_color, alpha), (i, 0), (i, height))
+                if i % 16 == 0:
+                    pygame.draw.line(overlay, (*fringe_color, int(alpha * 0.6)), (i, 0), (i, height))
+            mid_x = width // 3 if facing_left else width // 3 * 2
+            pygame.draw.line(overlay, (*fringe_color, 220), (mid_x, 0), (mid_x, height), 3)
+            overlay = overlay.convert_alpha()
+            self.beams[key] = overlay
+        return self.fade(key, overlay, intensity)
+
+    def blast(self, radius: int, strength: float) -> pygame.Surface:
+        overlay = self.blasts.get(radius)
+        if overlay is None:
+            overlay = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            for r in range(radius, 0, -16):
+                alpha = int(160 * (r / radius))
+                pygame.draw.circle(overlay, (180, 160, 255, alpha), (radius, radius), r, width=8)
+            pygame.draw.circle(overlay, (255, 210, 140, 140), (radius, radius), radius // 3)
+            overlay = overlay.convert_alpha()
+            self.blasts[radius] = overlay
+        return self.fade(radius, overlay, strength)
+
+    def fade(self, key: tuple | int, overlay: pygame.Surface, intensity: float) -> pygame.Surface:
+        if not self.coarse:
+            overlay.set_alpha(int(255 * intensity))
+            return overlay
+        step = max(1, math.ceil(intensity * EFFECT_FADE_STEPS))
+        faded = self.faded.get((key, step))
+        if faded is None:
+            faded = overlay.copy()
+            faded.set_alpha(None)
+            faded.fill((255, 255, 255, 255 * step // EFFECT_FADE_STEPS), special_flags=pygame.BLEND_RGBA_MULT)
+            self.faded[(key, step)] = faded
+        return faded
+
+    def panel(self, size: tuple[int, int], color: tuple[int, int, int], alpha: int) -> pygame.Surface:
+        """Solid translucent rectangle for wave/kick highlights and screen dimming."""
+        key = (size, color)
+        overlay = self.panels.get(key)
+        if overlay is None:
+            overlay = pygame.Surface(size).convert()
+            overlay.fill(color)
+            self.panels[key] = overlay
+        overlay.set_alpha(alpha)
+        return overlay
+
+
+class Viewport:
+    """Draws logical SCREEN_WIDTH x SCREEN_HEIGHT coordinates onto a frame rendered at ``scale``.
+
+    It stands in for the frame surface in draw routines that only blit or fill.
+    Each source surface is scaled once and cached, and destinations go through
+    the single scale factor. Every call returns the logical rect it covered, so
+    dirty-rect bookkeeping stays in screen coordinates. Plain rects and ellipses
+    go through draw_rect()/draw_ellipse(), straight onto the frame at scaled
+    coordinates; anything more detailed is baked into a sprite first.
+    """
+
+    def __init__(self, frame: pygame.Surface, scale: float, smooth: bool = False) -> None:
+        self.frame = frame
+        self.scale = scale
+        self.resize = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        # id(source) -> (source, scaled copy); holding the source keeps its id from being reused.
+        self.cache: OrderedDict[int, tuple[pygame.Surface, pygame.Surface]] = OrderedDict()
+
+    def get_width(self) -> int:
+        return SCREEN_WIDTH
+
+    def get_height(self) -> int:
+        return SCREEN_HEIGHT
+
+    def to_frame(self, rect: pygame.Rect) -> pygame.Rect:
+        scale = self.scale
+        left, top = math.floor(rect[0] * scale), math.floor(rect[1] * scale)
+        right, bottom = math.ceil((rect[0] + rect[2]) * scale), math.ceil((rect[1] + rect[3]) * scale)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def to_logical(self, pos: tuple[int, int]) -> tuple[int, int]:
+        return int(pos[0] / self.scale), int(pos[1] / self.scale)
+
+    def scaled(self, source: pygame.Surface) -> pygame.Surface:
+        key = id(source)
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] is source:
+            self.cache.move_to_end(key)
+            scaled = entry[1]
+        else:
+            width, height = source.get_size()
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            scaled = self.resize(source, size)
+            self.cache[key] = (source, scaled)
+            if len(self.cache) > VIEWPORT_CACHE_LIMIT:
+                self.cache.popitem(last=False)
+        scaled.set_alpha(source.get_alpha())  # effect fades change the source's alpha every frame
+        return scaled
+
+    def blit(self, source: pygame.Surface, dest) -> pygame.Rect:
+        x, y = dest[0], dest[1]
+        scale = self.scale
+        self.frame.blit(self.scaled(source), (math.floor(x * scale), math.floor(y * scale)))
+        return pygame.Rect(int(x), int(y), *source.get_size())
+
+    def blits(self, sequence, doreturn: bool = True) -> List[pygame.Rect] | None:
+        pairs = list(sequence)
+        scale = self.scale
+        self.frame.blits(
+            [(self.scaled(source), (math.floor(x * scale), math.floor(y * scale))) for source, (x, y) in pairs],
+            doreturn=False,
+        )
+        if doreturn:
+            return [pygame.Rect(int(x), int(y), *source.get_size()) for source, (x, y) in pairs]
+        return None
+
+    def fill(self, color, rect=None) -> pygame.Rect:
+        rect = pygame.Rect(rect) if rect is not None else pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.frame.fill(color, self.to_frame(rect))
+        return rect
+
+    def draw_rect(self, color, rect: pygame.Rect, width: int = 0, border_radius: int = 0) -> pygame.Rect:
+        scale = self.scale
+        pygame.draw.rect(
+            self.frame,
+            color,
+            self.to_frame(rect),
+            max(1, round(width * scale)) if width else 0,
+            border_radius=round(border_radius * scale),
+        )
+        return rect.clip(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+    def draw_ellipse(self, color, rect: pygame.Rect, width: int = 0) -> pygame.Rect:
+        pygame.draw.ellipse(self.frame, color, self.to_frame(rect), max(1, round(width * self.scale)) if width else 0)
+        return rect.clip(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+
+def draw_rect(
+    surface: "pygame.Surface | Viewport", color, rect: pygame.Rect, width: int = 0, border_radius: int = 0
+) -> pygame.Rect:
+    """pygame.draw.rect on a Surface, or straight onto a Viewport's frame at scaled coordinates."""
+    if isinstance(surface, Viewport):
+        return surface.draw_rect(color, rect, width, border_radius)
+    return pygame.draw.rect(surface, color, rect, width, border_radius=border_radius)
+
+
+def draw_ellipse(surface: "pygame.Surface | Viewport", color, rect: pygame.Rect, width: int = 0) -> pygame.Rect:
+    """pygame.draw.ellipse on a Surface, or straight onto a Viewport's frame at scaled coordinates."""
+    if isinstance(surface, Viewport):
+        return surface.draw_ellipse(color, rect, width)
+    return pygame.draw.ellipse(surface, color, rect, width)
+
+
+class FrameProfiler:
+    """Times the phases of each tick and frame for the debug overlay and Chrome trace export.
+
+    Phases are laps: begin() starts the clock and each lap(name) charges the time
+    since the previous lap to ``name``. Laps cost a single check while disabled.
+    end_frame() folds the frame's laps (summed over however many ticks it ran)
+    into the rolling window the overlay averages.
+    """
+
+    def __init__(self, window: int = PROFILE_WINDOW) -> None:
+        self.enabled = False
+        self.origin = time.perf_counter()
+        # Each thread laps from its own mark, so a simulation thread can time ticks while the main thread draws.
+        self.local = threading.local()
+        # Both threads add to ``current`` while the main thread swaps it out in end_frame().
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.current: dict[str, float] = {}
+        self.history: deque[dict[str, float]] = deque(maxlen=window)
+        self.phases: dict[str, None] = {}  # first-seen order for a stable overlay
+        self.events: deque[tuple[str, float, float, str]] = deque(maxlen=TRACE_EVENT_LIMIT)
+
+    def begin(self) -> None:
+        if self.enabled:
+            self.local.mark = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        mark = getattr(self.local, "mark", self.origin)
+        elapsed = now - mark
+        with self.lock:
+            self.current[name] = self.current.get(name, 0.0) + elapsed
+        self.phases.setdefault(name)
+        self.events.append((name, mark, elapsed, threading.current_thread().name))
+        self.local.mark = now
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            finished, self.current = self.current, {}
+        self.history.append(finished)
+        self.frames += 1
+
+    def breakdown(self) -> List[tuple[str, float, float]]:
+        """(phase, mean ms, max ms) over the rolling window, in first-seen order."""
+        frames = len(self.history) or 1
+        rows = []
+        for name in list(self.phases):  # the simulation thread may add a phase meanwhile
+            samples = [frame.get(name, 0.0) for frame in self.history]
+            rows.append((name, sum(samples) * 1000 / frames, max(samples, default=0.0) * 1000))
+        return rows
+
+    def dump_trace(self, path: str) -> None:
+        """Write the recorded laps as Chrome trace events (chrome://tracing or ui.perfetto.dev)."""
+        trace = []
+        tids: dict[str, int] = {}
+        # list() copies in one step, so a simulation thread still lapping cannot change it mid-loop.
+        for name, start, elapsed, thread in list(self.events):
+            tid = tids.get(thread)
+            if tid is None:
+                tid = tids[thread] = len(tids) + 1
+                label = "game loop" if thread == threading.main_thread().name else thread
+                trace.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": label}})
+            trace.append({
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": elapsed * 1e6,
+                "pid": 1,
+                "tid": tid,
+            })
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, handle)
+
+
+class QualityScaler:
+    """Rolling frame-time histogram that trades eye candy for frame rate.
+
+    record() files each frame's work time into a HISTOGRAM_BUCKET_MS bucket for
+    the last QUALITY_WINDOW frames and for the whole session. When p95 over the
+    window exceeds the budget, the next item in QUALITY_STEPS is dropped. Once
+    p95 falls under QUALITY_HEADROOM of the budget, the latest dropped item comes
+    back. A step up that is undone within two cooldowns doubles the wait before
+    the next try, so a level right at the edge does not flicker. ``adaptive=False``
+    pins the level.
+    """
+
+    def __init__(self, budget_ms: float = QUALITY_BUDGET_MS, level: int = 0, adaptive: bool = True) -> None:
+        self.budget_ms = budget_ms
+        self.level = level
+        self.adaptive = adaptive
+        self.window: deque[float] = deque()
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.window_missed = 0
+        self.session_counts = [0] * HISTOGRAM_BUCKETS
+        self.frames = 0
+        self.missed = 0
+        self.worst_ms = 0.0
+        self.since_change = 0
+        self.last_step = 0
+        self.backoff = 1
+        self.steps_down = 0
+        self.steps_up = 0
+
+    def drops(self, step: str) -> bool:
+        return self.level > QUALITY_STEPS.index(step)
+
+    def record(self, ms: float) -> bool:
+        """Add one frame; returns True when the quality level changed."""
+        bucket = min(HISTOGRAM_BUCKETS - 1, int(ms / HISTOGRAM_BUCKET_MS))
+        missed = ms > self.budget_ms
+        self.window.append(ms)
+        self.counts[bucket] += 1
+        self.window_missed += missed
+        if len(self.window) > QUALITY_WINDOW:
+            oldest = self.window.popleft()
+            self.counts[min(HISTOGRAM_BUCKETS - 1, int(oldest / HISTOGRAM_BUCKET_MS))] -= 1
+            self.window_missed -= oldest > self.budget_ms
+        self.session_counts[bucket] += 1
+        self.frames += 1
+        self.missed += missed
+        self.worst_ms = max(self.worst_ms, ms)
+        self.since_change += 1
+        if not self.adaptive or self.since_change < QUALITY_COOLDOWN:
+            return False
+        p95 = self.percentile(95)
+        if p95 > self.budget_ms and self.level < len(QUALITY_STEPS):
+            if self.last_step < 0 and self.since_change < 2 * QUALITY_COOLDOWN * self.backoff:
+                self.backoff = min(QUALITY_MAX_BACKOFF, self.backoff * 2)
+            self.step(1)
+            return True
+        if (
+            p95 < self.budget_ms * QUALITY_HEADROOM
+            and self.level > 0
+            and self.since_change >= QUALITY_COOLDOWN * self.backoff
+        ):
+            self.step(-1)
+            return True
+        return False
+
+    def step(self, delta: int) -> None:
+        self.level += delta
+        self.last_step = delta
+        if delta > 0:
+            self.steps_down += 1
+        else:
+            self.steps_up += 1
+        # The old level's frames say nothing about the new one.
+        self.window.clear()
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.window_missed = 0
+        self.since_change = 0
+
+    def percentile(self, pct: float, counts: List[int] | None = None) -> float:
+        """Upper edge of the bucket holding the ``pct``th percentile frame, in milliseconds."""
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = math.ceil(total * pct / 100)
+        seen = 0
+        for bucket, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return (bucket + 1) * HISTOGRAM_BUCKET_MS
+        return HISTOGRAM_BUCKETS * HISTOGRAM_BUCKET_MS
+
+    def overlay_rows(self) -> List[tuple[str, str]]:
+        """Rolling stats for the profiler overlay."""
+        rows = [
+            ("frame p50", f"{self.percentile(50):.1f}"),
+            ("frame p95", f"{self.percentile(95):.1f}"),
+            ("frame p99", f"{self.percentile(99):.1f}"),
+            ("missed", f"{self.window_missed}/{len(self.window)}"),
+            ("quality", f"{len(QUALITY_STEPS) - self.level}/{len(QUALITY_STEPS)}"),
+        ]
+        rows += [(f"- {step}", "off") for step in QUALITY_STEPS[:self.level]]
+        return rows
+
+    def report(self) -> str:
+        counts = self.session_counts
+        share = 100 * self.missed / self.frames if self.frames else 0.0
+        return (
+            f"frames: {self.frames}, p50 {self.percentile(50, counts):.1f}ms, p95 {self.percentile(95, counts):.1f}ms, "
+            f"p99 {self.percentile(99, counts):.1f}ms, worst {self.worst_ms:.1f}ms; "
+            f"missed {self.budget_ms:.1f}ms deadline {self.missed}x ({share:.1f}%); "
+            f"quality stepped down {self.steps_down}x, up {self.steps_up}x, ended at "
+            f"{len(QUALITY_STEPS) - self.level}/{len(QUALITY_STEPS)}"
+        )
+
+
+def dirty_coverage(rects: List[pygame.Rect], tile: int = 32) -> float:
+    """Fraction of the screen covered by ``rects``, measured on a coarse tile grid so overlaps count once."""
+    cols = (SCREEN_WIDTH + tile - 1) // tile
+    rows = (SCREEN_HEIGHT + tile - 1) // tile
+    covered = bytearray(cols * rows)
+    for rect in rects:
+        left = max(0, rect.left // tile)
+        right = min(cols - 1, (rect.right - 1) // tile)
+        top = max(0, rect.top // tile)
+        bottom = min(rows - 1, (rect.bottom - 1) // tile)
+        if left > right or top > bottom:
+            continue
+        span = b"\x01" * (right - left + 1)
+        for row in range(top, bottom + 1):
+            start = row * cols + left
+            covered[start:start + len(span)] = span
+    return covered.count(1) / len(covered)
+
+
+@dataclass
+class Replay:
+    """A recorded session: its seed, fixed dt, one input bitmask per tick and periodic state hashes."""
+
+    seed: int
+    dt: float = SIM_DT
+    vectorized: bool = False
+    hash_interval: int = 1
+    squad_size: int = ALLY_SQUAD_SIZE
+    endless: bool = False
+    inputs: bytearray = field(default_factory=bytearray)
+    hashes: List[int] = field(default_factory=list)
+
+    def to_bytes(self) -> bytes:
+        runs = bytearray()
+        run_count = 0
+        index = 0
+        while index < len(self.inputs):
+            buttons = self.inputs[index]
+            length = 1
+            while index + length < len(self.inputs) and self.inputs[index + length] == buttons and length < 0xFFFF:
+                length += 1
+            runs += REPLAY_RUN.pack(buttons, length)
+            run_count += 1
+            index += length
+        flags = (REPLAY_VECTORIZED if self.vectorized else 0) | (REPLAY_ENDLESS if self.endless else 0)
+        header = REPLAY_HEADER.pack(
+            REPLAY_MAGIC,
+            REPLAY_VERSION,
+            flags,
+            self.seed,
+            self.dt,
+            self.hash_interval,
+            self.squad_size,
+            len(self.inputs),
+            run_count,
+        )
+        return header + bytes(runs) + struct.pack(f"<{len(self.hashes)}I", *self.hashes)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        magic, version, flags, seed, dt, hash_interval, squad_size, ticks, run_count = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(
+                f"Not a Skibidi City Showdown replay (or version {version}; this build plays version {REPLAY_VERSION})."
+            )
+        offset = REPLAY_HEADER.size
+        inputs = bytearray()
+        for _ in range(run_count):
+            buttons, length = REPLAY_RUN.unpack_from(data, offset)
+            inputs += bytes((buttons,)) * length
+            offset += REPLAY_RUN.size
+        if len(inputs) != ticks:
+            raise ValueError("Replay input runs do not add up to the recorded tick count.")
+        hash_count = (len(data) - offset) // 4
+        hashes = list(struct.unpack_from(f"<{hash_count}I", data, offset))
+        return cls(
+            seed, dt, bool(flags & REPLAY_VECTORIZED), hash_interval, squad_size, bool(flags & REPLAY_ENDLESS), inputs, hashes
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as handle:
+            handle.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        with open(path, "rb") as handle:
+            return cls.from_bytes(handle.read())
+
+
+class ReplayRecorder:
+    """Records the session begun by the latest Game.reset() and writes it to disk on save()."""
+
+    def __init__(self, path: str, hash_interval: int = 1) -> None:
+        self.path = path
+        self.hash_interval = max(1, hash_interval)
+        self.replay: Replay | None = None
+
+    def start(self, game: "Game") -> None:
+        self.replay = Replay(
+            seed=game.seed,
+            vectorized=game.swarm is not None,
+            hash_interval=self.hash_interval,
+            squad_size=game.squad_size,
+            endless=game.endless,
+        )
+
+    def record(self, game: "Game", dt: float) -> None:
+        replay = self.replay
+        if replay is None:
+            return
+        if dt != replay.dt:
+            raise ValueError(f"Replays need a fixed dt of {replay.dt} ms, got {dt} ms.")
+        tick = len(replay.inputs)
+        replay.inputs.append(game.buttons)
+        if tick % replay.hash_interval == 0:
+            replay.hashes.append(game.state_hash())
+
+    def save(self) -> None:
+        if self.replay is not None and self.replay.inputs:
+            self.replay.save(self.path)
+
+
+@dataclass
+class GameSnapshot:
+    """Complete simulation state as plain JSON-compatible data, built by Game.snapshot().
+
+    Game.restore() rebuilds live objects from it without replaying any ticks, so
+    retrying a wave or jumping to a late one costs the same as starting wave 1.
+    """
+
+    state: dict
+
+    @property
+    def wave(self) -> int:
+        return self.state["wave"]
+
+    @staticmethod
+    def save_all(path: str, snapshots: dict[int, "GameSnapshot"]) -> None:
+        payload = {"version": SNAPSHOT_VERSION, "waves": {str(wave): snap.state for wave, snap in snapshots.items()}}
+        with open(path, "wb") as handle:
+            handle.write(SNAPSHOT_MAGIC + zlib.compress(json.dumps(payload, separators=(",", ":")).encode()))
 
-        water_center = (base_rect.centerx, base_rect.centery + wobble_offset)
-        pygame.draw.circle(surface, (130, 190, 255), water_center, 8)
-        pygame.draw.circle(surface, (220, 240, 255), water_center, 4)
+    @classmethod
+    def load_all(cls, path: str) -> dict[int, "GameSnapshot"]:
+        with open(path, "rb") as handle:
+            data = handle.read()
+        if not data.startswith(SNAPSHOT_MAGIC):
+            raise ValueError("Not a Skibidi City Showdown snapshot file.")
+        payload = json.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]))
+        if payload.get("version") != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported snapshot version.")
+        return {int(wave): cls(state) for wave, state in payload["waves"].items()}
 
-        # Face
-        eye_y = base_rect.top + 8 * self.scale + wobble_offset
-        eye_offset = 10 * self.scale
-        eye_radius = max(3, int(5 * self.scale))
-        pupil_radius = max(2, int(3 * self.scale))
-        pygame.draw.circle(surface, (255, 255, 255), (base_rect.centerx - eye_offset, int(eye_y)), eye_radius)
-        pygame.draw.circle(surface, (255, 255, 255), (base_rect.centerx + eye_offset, int(eye_y)), eye_radius)
-        pygame.draw.circle(surface, self.eye_color, (base_rect.centerx - eye_offset, int(eye_y)), pupil_radius)
-        pygame.draw.circle(surface, self.eye_color, (base_rect.centerx + eye_offset, int(eye_y)), pupil_radius)
-        mouth_rect = pygame.Rect(0, 0, int(18 * self.scale), int(8 * self.scale))
-        mouth_rect.midtop = (base_rect.centerx, eye_y + 8 * self.scale)
-        pygame.draw.arc(surface, (180, 60, 60), mouth_rect, math.radians(10), math.radians(170), max(2, int(2 * self.scale)))
 
-        if self.is_saint:
-            halo_rect = pygame.Rect(0, 0, 40, 10)
-            halo_rect.midbottom = (tank_rect.centerx, tank_rect.top - 8)
-            halo_rect.y += math.sin(self.wobble_phase * 1.4) * 2
-            pygame.draw.ellipse(surface, (255, 225, 120), halo_rect, width=3)
-            pygame.draw.ellipse(surface, (255, 245, 200), halo_rect.inflate(-6, -4), width=2)
+@dataclass(frozen=True, slots=True)
+class FrameSnapshot:
+    """Everything a rendered frame reads from the simulation, built by Game.frame_snapshot().
 
-        if self.is_saint:
-            bar_width = 120
-            bar_height = 12
-            bar_rect = pygame.Rect(0, 0, bar_width, bar_height)
-            bar_rect.midbottom = (base_rect.centerx, base_rect.top - 6)
-            pygame.draw.rect(surface, (40, 20, 20), bar_rect.inflate(4, 4), border_radius=4)
-            health_ratio = max(0, min(1, self.health / 14))
-            fill_rect = bar_rect.copy()
-            fill_rect.width = int(bar_width * health_ratio)
-            pygame.draw.rect(surface, (220, 120, 120), fill_rect, border_radius=3)
-            pygame.draw.rect(surface, (255, 220, 180), bar_rect, width=2, border_radius=4)
+    A live snapshot refers to the game's own objects and is drawn between ticks
+    on the same thread. A detached one owns copies of everything that moves, so
+    the render thread can draw it while the simulation thread carries on.
+    """
 
-        if self.label:
-            if SkibidiToilet._label_font is None:
-                SkibidiToilet._label_font = pygame.font.SysFont("arial", 14)
-            label_surface = SkibidiToilet._label_font.render(self.label, True, (20, 20, 40))
-            label_rect = label_surface.get_rect(center=(base_rect.centerx, base_rect.top - 12))
-            surface.blit(label_surface, label_rect)
+    time: float  # perf_counter() when it was built; --threaded interpolates from it
+    state: str
+    wave: int
+    score: int
+    game_over: bool
+    intermission_timer: float
+    can_retry: bool  # the current wave has a start snapshot for W
+    restores: int  # Game.restores; a change tells the renderer to redraw everything
+    hud: tuple  # Game.hud_state()
+    punch_active: bool
+    city: CityMap
+    player: CameraMan
+    allies: List[Ally]
+    enemies: List[SkibidiToilet]
+    flash_circle: tuple[pygame.Vector2, float] | None
+    flash_beam_rect: pygame.Rect | None
+    flash_active_time: float
+    soundwave_active_time: float
+    stun_active_time: float
+    stab_active_time: float
+    kick_active_time: float
 
 
-class CityMap:
-    def __init__(self, mode: str = "street") -> None:
-        self.buildings: List[pygame.Rect] = []
-        self.street_lines: List[int] = (
-            [SCREEN_HEIGHT - 190, SCREEN_HEIGHT - 120] if mode == "center" else [SCREEN_HEIGHT - 160, SCREEN_HEIGHT - 110]
-        )
-        self.mode = mode
-        start_x = 0
-        building_count = 16 if self.mode == "street" else 22
-        for _ in range(building_count):
-            if self.mode == "center":
-                w, h = random.randint(180, 280), random.randint(220, 320)
-                y_offset = random.randint(60, 120)
+class FrameExchange:
+    """Latest-wins hand-off of FrameSnapshots from the simulation thread to the renderer.
+
+    It is a triple buffer whose slots are immutable snapshots: the simulation
+    builds the next one on its own (back), publish() swaps it into ``ready`` with
+    one reference assignment and take() gives the renderer the newest (front).
+    Neither side ever waits for the other. Snapshots replaced before the renderer
+    took them are never drawn; frames drawn again from the snapshot the renderer
+    already had are counted as repeats.
+    """
+
+    def __init__(self) -> None:
+        self.ready: FrameSnapshot | None = None
+        self.front: FrameSnapshot | None = None
+        self.published = 0
+        self.taken = 0
+        self.repeated = 0
+
+    def publish(self, snapshot: FrameSnapshot) -> None:
+        self.ready = snapshot
+        self.published += 1
+
+    def take(self) -> FrameSnapshot | None:
+        snapshot = self.ready
+        if snapshot is self.front:
+            self.repeated += 1
+        else:
+            self.front = snapshot
+            self.taken += 1
+        return snapshot
+
+
+class SimulationThread(threading.Thread):
+    """Runs Game.update at the fixed tick on its own thread for ``--threaded``.
+
+    The main thread forwards input through ``inputs``: action bitmasks, the
+    newest of which drives the following ticks, and commands (callables such as
+    Game.reset) that run between ticks. deque append and popleft are atomic, so
+    neither side takes a lock. After each batch of due ticks the thread publishes
+    a detached FrameSnapshot and streams to spectators, then sleeps until the
+    next tick. Ticks follow the clock rather than rendered frames, so a slow
+    frame no longer holds the simulation back, and a slow tick only makes the
+    renderer draw the previous snapshot again.
+    """
+
+    def __init__(self, game: "Game") -> None:
+        super().__init__(name="simulation", daemon=True)
+        self.game = game
+        self.inputs: deque[int | Callable[[], None]] = deque()
+        self.frames = FrameExchange()
+        self.buttons = 0
+        self.stopping = threading.Event()
+        self.error: BaseException | None = None
+        self.ticks = 0
+        self.late_ms = 0.0  # worst time a tick started behind its schedule
+
+    def run(self) -> None:
+        game = self.game
+        game.input_source = lambda: self.buttons
+        interval = SIM_DT / 1000 / game.fast_forward
+        due = time.perf_counter()
+        try:
+            while not self.stopping.is_set():
+                self.drain()
+                now = time.perf_counter()
+                # Like the single-threaded accumulator, never catch up on more than MAX_FRAME_TIME at once.
+                due = max(due, now - MAX_FRAME_TIME / 1000)
+                if due <= now:
+                    self.late_ms = max(self.late_ms, (now - due) * 1000)
+                    while due <= now:
+                        game.update(SIM_DT)
+                        self.ticks += 1
+                        due += interval
+                    self.publish()
+                self.stopping.wait(max(0.0, due - time.perf_counter()))
+        except BaseException as error:  # re-raised on the main thread by stop()
+            self.error = error
+
+    def drain(self) -> None:
+        inputs = self.inputs
+        while inputs:
+            item = inputs.popleft()
+            if callable(item):
+                item()
             else:
-                w, h = random.randint(80, 200), random.randint(80, 180)
-                y_offset = random.randint(120, 200)
-            x = start_x + random.randint(30, 120)
-            start_x = x + w + random.randint(40, 140 if self.mode == "center" else 120)
-            y = SCREEN_HEIGHT - h - y_offset
-            self.buildings.append(pygame.Rect(x, y, w, h))
-
-    def update(self, dt: int) -> None:
-        dx = (CITY_SCROLL_SPEED_CENTER if self.mode == "center" else CITY_SCROLL_SPEED) * (dt / 1000.0)
-        for building in list(self.buildings):
-            building.x -= dx
-            if building.right < -80:
-                self.buildings.remove(building)
-                if self.mode == "center":
-                    w, h = random.randint(180, 280), random.randint(220, 320)
-                    y_offset = random.randint(60, 120)
-                else:
-                    w, h = random.randint(80, 200), random.randint(80, 180)
-                    y_offset = random.randint(120, 200)
-                x = SCREEN_WIDTH + random.randint(40, 180)
-                y = SCREEN_HEIGHT - h - y_offset
-                self.buildings.append(pygame.Rect(x, y, w, h))
+                self.buttons = item
 
-    def draw(self, surface: pygame.Surface) -> None:
-        surface.fill((26, 30, 40) if self.mode == "center" else (30, 34, 42))
-        # Grid floor to hint the cameraman is moving right across the city.
-        for x in range(-CITY_GRID_SIZE, SCREEN_WIDTH + CITY_GRID_SIZE, CITY_GRID_SIZE):
-            pygame.draw.line(surface, (48, 54, 63), (x, 0), (x, SCREEN_HEIGHT))
-        for y in range(0, SCREEN_HEIGHT, CITY_GRID_SIZE):
-            pygame.draw.line(surface, (48, 54, 63), (0, y), (SCREEN_WIDTH, y))
-
-        for building in self.buildings:
-            pygame.draw.rect(surface, (70, 82, 102) if self.mode == "center" else (58, 68, 83), building)
-            window_palette = (
-                [(255, 220, 120), (140, 180, 230), (90, 110, 160)]
-                if self.mode == "center"
-                else [(255, 200, 40), (120, 150, 190), (70, 90, 120)]
-            )
-            window_color = random.choice(window_palette)
-            for _ in range(random.randint(3, 7)):
-                size = random.randint(6, 10)
-                px = random.randint(building.left + 6, building.right - 6)
-                py = random.randint(building.top + 6, building.bottom - 6)
-                pygame.draw.rect(surface, window_color, pygame.Rect(px, py, size, size))
+    def publish(self) -> None:
+        game = self.game
+        game.profiler.begin()
+        punch_active = game.state == "playing" and bool(game.buttons & ACTION_PUNCH) and not game.player.can_punch()
+        self.frames.publish(game.frame_snapshot(punch_active, detached=True))
+        game.profiler.lap("sim.snapshot")
+        if game.spectator is not None:
+            game.spectator.publish(game)
+            game.profiler.lap("spectator.encode")
 
-        # Street lane markers to sell the walking-forward direction.
-        street_y = SCREEN_HEIGHT - (140 if self.mode == "center" else 80)
-        pygame.draw.rect(surface, (20, 22, 28) if self.mode == "center" else (26, 28, 34), pygame.Rect(0, street_y, SCREEN_WIDTH, SCREEN_HEIGHT - street_y))
-        dash_step = 60 if self.mode == "center" else 80
-        for i in range(0, SCREEN_WIDTH, dash_step):
-            pygame.draw.rect(surface, (255, 215, 120), pygame.Rect(i + 10, street_y + 38, 40, 6), border_radius=3)
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.is_alive():
+            self.join()
+        if self.error is not None:
+            raise self.error
 
+    def report(self) -> str:
+        frames = self.frames
+        return (
+            f"simulation thread: {self.ticks} ticks, worst {self.late_ms:.1f}ms behind schedule; "
+            f"{frames.published} snapshots, {frames.published - frames.taken} never drawn, "
+            f"{frames.repeated} frames redrew the previous one"
+        )
 
-@dataclass
-class Ally:
-    position: pygame.Vector2
-    health: int = FORM_MAX_HEALTH["cameraman"]
-    flash_cooldown_timer: int = 0
-    punch_cooldown_timer: int = 0
-    bob_phase: float = 0.0
 
-    def update(self, dt: int, enemies: List["SkibidiToilet"]) -> None:
-        self.flash_cooldown_timer = max(0, self.flash_cooldown_timer - dt)
-        self.punch_cooldown_timer = max(0, self.punch_cooldown_timer - dt)
-        self.bob_phase = (self.bob_phase + dt * 0.005) % (2 * math.pi)
-        if not enemies:
-            return
+def quantise(value: float) -> int:
+    """Screen coordinate to int16 spectator units."""
+    return max(-32768, min(32767, round(value * SPECTATOR_POSITION_SCALE)))
 
-        target = min(enemies, key=lambda e: e.position.distance_to(self.position))
-        distance = target.position.distance_to(self.position)
-        direction = target.position - self.position
 
-        if distance > ALLY_STAND_DISTANCE and direction.length_squared() > 0:
-            step = direction.normalize() * ALLY_SPEED
-            self.position += step
-            self.position.x = max(26, min(SCREEN_WIDTH - 26, self.position.x))
+class SpectatorServer:
+    """Streams quantised state deltas to localhost spectators from an asyncio loop on its own thread.
 
-        if self.flash_cooldown_timer <= 0 and distance <= ALLY_FLASH_RANGE:
-            self.flash_cooldown_timer = ALLY_FLASH_COOLDOWN
-            for enemy in enemies:
-                if enemy.position.distance_to(self.position) <= ALLY_FLASH_RANGE:
-                    enemy.take_damage(FLASH_DAMAGE_CAMERAMAN)
-                    enemy.stun_timer = max(enemy.stun_timer, 320)
+    The game thread calls publish() once per rendered frame. That diffs the
+    toilets against what was last sent, so one message batches every tick since
+    the previous frame, and hands the bytes to the loop with
+    call_soon_threadsafe. Writes never wait on a socket: a spectator whose
+    unsent backlog passes SPECTATOR_MAX_BACKLOG is disconnected instead. A new
+    connection makes the next message a keyframe carrying every toilet.
+    """
 
-        if self.punch_cooldown_timer <= 0 and distance <= ALLY_PUNCH_RANGE:
-            self.punch_cooldown_timer = ALLY_PUNCH_COOLDOWN
-            target.take_damage(ALLY_PUNCH_DAMAGE)
-            push = target.position - self.position
-            if push.length_squared() > 0:
-                target.position += push.normalize() * 14
+    def __init__(self, host: str = "127.0.0.1", port: int = SPECTATOR_PORT) -> None:
+        self.host = host
+        self.port = port
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        self.ready = threading.Event()
+        self.stopping: asyncio.Event | None = None
+        self.error: BaseException | None = None
+        self.writers: set[asyncio.StreamWriter] = set()  # only touched on the loop thread
+        self.tasks: set[asyncio.Task] = set()
+        self.clients = 0
+        self.keyframe_due = False
+        self.sent: dict[int, tuple[int, int, int, int]] = {}  # uid -> last (x, y, health, flags) sent
+        self.bytes_sent = 0
 
-    def draw(self, surface: pygame.Surface) -> None:
-        bob = math.sin(self.bob_phase) * 2.6
-        torso = pygame.Rect(0, 0, 44, 58)
-        torso.midbottom = (self.position.x, self.position.y + bob)
-        pygame.draw.rect(surface, (26, 118, 210), torso, border_radius=8)
-        jacket = torso.inflate(-12, -8)
-        pygame.draw.rect(surface, (18, 40, 80), jacket, border_radius=6, width=2)
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._serve, name="spectator-server", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
 
-        head = pygame.Rect(0, 0, 32, 24)
-        head.midbottom = torso.midtop
-        pygame.draw.rect(surface, (224, 232, 246), head, border_radius=4)
-        lens = pygame.Rect(0, 0, 16, 10)
-        lens.midleft = head.midleft
-        pygame.draw.rect(surface, (30, 30, 34), lens, border_radius=3)
-        frame = lens.inflate(-6, -4)
-        pygame.draw.rect(surface, (140, 190, 240), frame, border_radius=2)
-        grip = pygame.Rect(0, 0, 10, 18)
-        grip.midright = head.midright
-        pygame.draw.rect(surface, (30, 34, 40), grip, border_radius=2)
-        visor = pygame.Rect(0, 0, 22, 6)
-        visor.midtop = head.midtop
-        pygame.draw.rect(surface, (50, 70, 120), visor, border_radius=2)
+    def stop(self) -> None:
+        if self.loop is not None and self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        if self.thread is not None:
+            self.thread.join(timeout=2)
 
-        bar_width = 42
-        bar_height = 8
-        bar_rect = pygame.Rect(0, 0, bar_width, bar_height)
-        bar_rect.midbottom = (torso.centerx, torso.top - 8)
-        pygame.draw.rect(surface, (40, 20, 20), bar_rect.inflate(4, 4), border_radius=3)
-        health_ratio = max(0, min(1, self.health / FORM_MAX_HEALTH["cameraman"]))
-        fill_rect = bar_rect.copy()
-        fill_rect.width = int(bar_width * health_ratio)
-        pygame.draw.rect(surface, (200, 80, 80), fill_rect, border_radius=3)
-        pygame.draw.rect(surface, (255, 220, 180), bar_rect, width=2, border_radius=3)
+    def _serve(self) -> None:
+        try:
+            asyncio.run(self._main())
+        except BaseException as error:  # surfaced to start(); the game thread owns reporting
+            self.error = error
+            self.ready.set()
+
+    async def _main(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]  # resolves port 0 to the one picked
+        self.ready.set()
+        async with server:
+            await self.stopping.wait()
+        # Closing the sockets ends each _client read loop, so shutdown cancels nothing mid-read.
+        for writer in self.writers:
+            writer.close()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.keyframe_due = True  # set before the count so publish() never sends a newcomer a bare delta
+        self.writers.add(writer)
+        self.clients = len(self.writers)
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            while await reader.read(1024):
+                pass  # spectators only listen; reading just notices the disconnect
+        except ConnectionError:
+            pass
+        finally:
+            self.tasks.discard(task)
+            self.writers.discard(writer)
+            self.clients = len(self.writers)
+            writer.close()
+
+    def _broadcast(self, message: bytes) -> None:
+        for writer in list(self.writers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > SPECTATOR_MAX_BACKLOG:
+                self.writers.discard(writer)
+                writer.close()
+                continue
+            writer.write(message)
+        self.clients = len(self.writers)
+
+    def publish(self, game: "Game") -> None:
+        """Encode the frame's changes and queue them for every spectator; free when nobody watches."""
+        if self.loop is None or not self.clients:
+            self.sent = {}
+            return
+        keyframe = self.keyframe_due
+        self.keyframe_due = False
+        message = self.encode(game, keyframe)
+        self.bytes_sent += len(message)
+        self.loop.call_soon_threadsafe(self._broadcast, message)
+
+    @staticmethod
+    def toilet_records(game: "Game") -> List[tuple[int, int, int, int]]:
+        """Quantised (x, y, health, flags) per toilet, in enemy list order."""
+        swarm = game.swarm
+        if swarm is not None:
+            # Straight from the swarm columns instead of building a Vector2 per view.
+            n = swarm.count
+            xs = np.clip(np.rint(swarm.x[:n] * SPECTATOR_POSITION_SCALE), -32768, 32767).astype(int).tolist()
+            ys = np.clip(np.rint(swarm.y[:n] * SPECTATOR_POSITION_SCALE), -32768, 32767).astype(int).tolist()
+            health = np.clip(swarm.health[:n], 0, 0xFFFF).tolist()
+            flags = (swarm.angry[:n] * SPECTATOR_ANGRY | (swarm.stun[:n] > 0) * SPECTATOR_STUNNED).tolist()
+            return list(zip(xs, ys, health, flags))
+        return [
+            (
+                quantise(enemy.position.x),
+                quantise(enemy.position.y),
+                max(0, min(0xFFFF, enemy.health)),
+                (SPECTATOR_ANGRY if enemy.angry else 0) | (SPECTATOR_STUNNED if enemy.stun_timer > 0 else 0),
+            )
+            for enemy in game.enemies
+        ]
+
+    def encode(self, game: "Game", keyframe: bool) -> bytes:
+        previous = {} if keyframe else self.sent
+        current: dict[int, tuple[int, int, int, int]] = {}
+        spawns: List[bytes] = []
+        updates: List[bytes] = []
+        for enemy, record in zip(game.enemies, self.toilet_records(game)):
+            uid = enemy.uid
+            current[uid] = record
+            last = previous.get(uid)
+            if last is None:
+                spawns.append(
+                    SPECTATOR_SPAWN.pack(
+                        uid,
+                        SPECTATOR_KINDS.index(enemy.label) if enemy.label in SPECTATOR_KINDS else 0,
+                        min(255, round(enemy.scale * 20)),
+                        min(255, round(float(enemy.wiggle_amp) * 20)),
+                        *enemy.body_color,
+                        *enemy.rim_color,
+                        *enemy.eye_color,
+                        *record,
+                    )
+                )
+            elif last != record:
+                updates.append(SPECTATOR_UPDATE.pack(uid, *record))
+        removed = [SPECTATOR_REMOVE.pack(uid) for uid in previous if uid not in current]
+        self.sent = current
+
+        player = game.player
+        header = SPECTATOR_HEADER.pack(
+            SPECTATOR_KEYFRAME if keyframe else SPECTATOR_DELTA,
+            game.tick,
+            SPECTATOR_STATES.index(game.state),
+            min(0xFF, game.wave),
+            int(game.intermission_timer // 10),
+            min(0xFFFFFFFF, game.score),
+            list(FORM_PROFILES).index(player.form),
+            player.health,
+            quantise(player.position.x),
+            quantise(player.position.y),
+            -1 if player.facing.x < 0 else 1,
+            *(
+                min(255, int(timer // 4))
+                for timer in (
+                    game.flash_active_time,
+                    game.soundwave_active_time,
+                    game.stun_active_time,
+                    game.stab_active_time,
+                    game.kick_active_time,
+                )
+            ),
+            len(spawns),
+            len(updates),
+            len(removed),
+            min(255, len(game.allies)),
+        )
+        allies = [
+            SPECTATOR_ALLY.pack(quantise(ally.position.x), quantise(ally.position.y), ally.health)
+            for ally in game.allies[:255]
+        ]
+        body = b"".join([header, *spawns, *updates, *removed, *allies])
+        return SPECTATOR_LENGTH.pack(len(body)) + body
 
 
 class Game:
-    def __init__(self) -> None:
-        pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    def __init__(
+        self,
+        headless: bool = False,
+        fast_forward: int = 1,
+        vectorized: bool = False,
+        dirty_rects: bool = False,
+        render_hz: int = FPS,
+        squad_size: int = ALLY_SQUAD_SIZE,
+        seed: int | None = None,
+        recorder: ReplayRecorder | None = None,
+        profile: bool = False,
+        trace_path: str = "trace.json",
+        report_startup: bool = False,
+        snapshot_path: str | None = None,
+        spectator: SpectatorServer | None = None,
+        endless: bool = False,
+        quality: int | None = None,
+        render_scale: float = 1.0,
+        scaled_display: bool = False,
+        smooth_upscale: bool = False,
+        threaded: bool = False,
+    ) -> None:
+        self.startup_clock = time.perf_counter()
+        self.startup_ms: dict[str, float] = {}
+        self.report_startup = report_startup
+        self.headless = headless
+        self.profiler = FrameProfiler()
+        self.profiler.enabled = profile
+        self.profiler_layer: pygame.Surface | None = None
+        # A pinned ``quality`` (number of QUALITY_STEPS dropped) turns the adaptive scaler off.
+        self.quality = QualityScaler(level=quality or 0, adaptive=quality is None)
+        self.trace_path = trace_path
+        self.snapshot_path = snapshot_path
+        self.spectator = spectator
+        self.session_seed = seed
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        # Every gameplay roll goes through this one generator so a seed reproduces a session.
+        self.rng = random.Random(self.seed)
+        self.recorder = recorder
+        self.fast_forward = max(1, fast_forward)
+        self.dirty_rects = dirty_rects
+        self.render_hz = render_hz
+        # Threaded runs step the simulation on a SimulationThread while this thread renders its snapshots.
+        self.threaded = threaded
+        self.sim: SimulationThread | None = None
+        self.squad_size = squad_size
+        # Endless mode keeps ramping waves past MAX_WAVE instead of ending in victory.
+        self.endless = endless
+        self.squad = AllySquad()
+        self.dirty: List[pygame.Rect] = []
+        self.prev_dirty: List[pygame.Rect] = []
+        self.presented_state: str | None = None
+        self.presented_map: str | None = None
+        self.force_full_present = True
+        # Counts restore() calls on the simulation side; render() compares it with the count it last drew.
+        self.restores = 0
+        self.presented_restores = 0
+        if vectorized and np is None:
+            raise RuntimeError("The vectorised enemy store needs numpy (pip install numpy).")
+        if self.headless:
+            # The dummy driver gives us a real display surface without opening a window.
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        # Only the modules we use: a full pygame.init() also brings up audio and joysticks.
+        pygame.display.init()
+        pygame.font.init()
+        # The scene renders at render_scale. With scaled_display the window itself has that size and
+        # SDL stretches it to the screen (pygame.SCALED); otherwise we upscale on the CPU before the UI.
+        self.render_scale = max(MIN_RENDER_SCALE, min(1.0, render_scale))
+        frame_size = (round(SCREEN_WIDTH * self.render_scale), round(SCREEN_HEIGHT * self.render_scale))
+        if scaled_display and not headless:
+            self.screen = pygame.display.set_mode(frame_size, pygame.SCALED | pygame.RESIZABLE)
+            self.display_scale = self.render_scale
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.display_scale = 1.0
+        self.frame: pygame.Surface | None = None
+        self.canvas: pygame.Surface | Viewport = self.screen
+        self.ui_canvas: pygame.Surface | Viewport = self.screen
+        if self.display_scale != 1.0:
+            self.canvas = self.ui_canvas = Viewport(self.screen, self.display_scale, smooth_upscale)
+        elif self.render_scale != 1.0:
+            self.frame = pygame.Surface(frame_size).convert()
+            self.canvas = Viewport(self.frame, self.render_scale, smooth_upscale)
         pygame.display.set_caption("Skibidi City Showdown")
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont("arial", 20)
+        self.startup_lap("display")
+        self.fonts = FontLibrary()
+        self.font = self.fonts.font("arial", 20)
+        self.text = TextCache(self.font)
+        self.debug_font = self.fonts.font("monospace", 14)
+        SkibidiToilet._label_font = self.fonts.font("arial", 14)
+        self.fonts.save()
+        self.startup_lap("fonts")
+        self.hud_key: tuple | None = None
+        self.hud_layer: pygame.Surface | None = None
+        self.hud_rects: List[pygame.Rect] = []
+        self.instruction_layers: dict[str, pygame.Surface] = {}
+        # Returns the action bitmask for the next tick; benchmarks, bots and replays swap it out.
+        self.input_source: Callable[[], int] = read_keyboard
+        self.buttons = 0
+        self.tick = 0
+        self.next_uid = 0
+        # Wave number -> state at the start of the latest run of that wave, for retries and jumps.
+        self.wave_snapshots: dict[int, GameSnapshot] = {}
+        self.snapshot_pending = False
 
         self.state = "menu"
         self.start_button = pygame.Rect(0, 0, 220, 72)
         self.start_button.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40)
         self.intermission_timer = 0
 
-        self.city = CityMap()
+        self.city = CityMap(rng=self.rng)
         self.player = CameraMan(pygame.Vector2(SCREEN_WIDTH // 2, PLAYER_GROUND_Y), pygame.Vector2(1, 0))
         self.enemies: List[SkibidiToilet] = []
+        self.toilet_pool = ToiletPool()
+        self.swarm = ToiletSwarm(self.enemies, self.toilet_pool) if vectorized else None
+        self.enemy_grid = EnemyGrid()
+        self.toilet_sprites = ToiletSpriteCache()
+        self.actor_sprites = ActorSpriteCache()
+        self.effects = EffectRenderer()
+        # Particles are cosmetic: headless runs and installs without NumPy go without them.
+        self.particles = ParticleSystem() if np is not None and not headless else None
+        self.combat = CombatResolver()
         self.allies: List[Ally] = []
         self.last_spawn = 0
         self.score = 0
@@ -563,11 +3016,39 @@ class Game:
         self.wave_kills = 0
         self.saint_spawned = False
         self.pending_wave: int | None = None
+        self.startup_lap("world")
+        if not self.headless:
+            self.prewarm()
+        self.startup_lap("prewarm")
+
+    def startup_lap(self, name: str) -> None:
+        """Record milliseconds since the previous startup phase ended."""
+        now = (time.perf_counter() - self.startup_clock) * 1000
+        self.startup_ms[name] = now - sum(self.startup_ms.values())
 
-    def reset(self) -> None:
-        self.city = CityMap()
+    def startup_report(self) -> str:
+        phases = ", ".join(f"{name} {ms:.1f}ms" for name, ms in self.startup_ms.items())
+        fonts = "font cache miss" if self.fonts.lookups else "font cache hit"
+        return f"startup: {phases} ({fonts}); total {sum(self.startup_ms.values()):.1f}ms"
+
+    def prewarm(self) -> None:
+        """Render the menu, toilet labels and opening HUD text now so no early frame stalls on glyphs."""
+        for label in ("Medium", "Police", "Large"):
+            SkibidiToilet.label_surface(label)
+        self.instructions_layer(self.player.form)
+        self.draw_menu(self.city)
+
+    def reset(self, seed: int | None = None) -> None:
+        if seed is None:
+            seed = self.session_seed if self.session_seed is not None else random.randrange(1 << 32)
+        self.seed = seed
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.city = CityMap(rng=self.rng)
         self.player = CameraMan(pygame.Vector2(SCREEN_WIDTH // 2, PLAYER_GROUND_Y), pygame.Vector2(1, 0))
-        self.enemies = []
+        self.clear_enemies()
+        if self.particles is not None:
+            self.particles.clear()
         self.allies = []
         self.last_spawn = 0
         self.score = 0
@@ -583,10 +3064,12 @@ class Game:
         self.intermission_timer = 0
         self.pending_wave = None
         self.start_wave(1)
+        if self.recorder is not None:
+            self.recorder.start(self)
 
     def goal_for_wave(self, wave: int) -> int:
         if wave > MAX_WAVE:
-            return 0
+            return 16 + (wave - MAX_WAVE) * ENDLESS_WAVE_GROWTH if self.endless else 0
         if wave == 5:
             return 1
         return min(16, 8 + (wave - 1) * 2)
@@ -596,41 +3079,37 @@ class Game:
         self.wave_goal = self.goal_for_wave(wave)
         self.wave_kills = 0
         self.saint_spawned = False
-        self.enemies = []
+        self.clear_enemies()
         self.last_spawn = 0
         self.pending_wave = None
         self.state = "playing"
         if self.wave == 7:
-            self.city = CityMap(mode="center")
-            self.allies = [
-                Ally(pygame.Vector2(self.player.position.x - 90, PLAYER_GROUND_Y)),
-                Ally(pygame.Vector2(self.player.position.x + 90, PLAYER_GROUND_Y)),
-            ]
+            self.city = CityMap(mode="center", rng=self.rng)
+            self.allies = AllySquad.formation(self.player.position.x, self.squad_size)
+        # Taken once the current tick finishes, so the snapshot sits cleanly between ticks.
+        self.snapshot_pending = True
 
-    def current_flash_beam_rect(self) -> pygame.Rect:
-        direction = 1 if self.player.facing.x >= 0 else -1
-        length = FLASH_BEAM_LENGTH
-        if self.player.form == "speakerman":
-            length += 30
-        if self.player.form == "large_speakerman":
-            length += 70
-        if self.player.form == "large_cameraman":
-            length += 50
-        start_x = self.player.position.x + (20 * direction)
-        rect = pygame.Rect(0, 0, length, FLASH_BEAM_WIDTH)
-        if direction < 0:
-            rect.right = start_x
-        else:
-            rect.left = start_x
-        rect.centery = self.player.position.y - 4
-        return rect
+    def endless_ramp(self) -> int:
+        """Waves past MAX_WAVE in endless mode, capped at ENDLESS_RAMP_CAP_WAVE; 0 otherwise."""
+        if not self.endless:
+            return 0
+        return max(0, min(self.wave, ENDLESS_RAMP_CAP_WAVE) - MAX_WAVE)
+
+    def spawn_burst(self) -> int:
+        """Toilets to spawn this spawn interval: more per interval as endless waves grow, within the entity budget."""
+        if not self.endless:
+            return 1
+        burst = 1 + self.endless_ramp() // 2
+        remaining = self.wave_goal - self.wave_kills - len(self.enemies)
+        return max(0, min(burst, remaining, ENDLESS_ENTITY_BUDGET - len(self.enemies)))
 
     def spawn_enemy(self) -> None:
         if self.wave == 5:
             if not self.saint_spawned:
-                pos = pygame.Vector2(SCREEN_WIDTH + 40, PLAYER_GROUND_Y + random.uniform(-6, 6))
-                saint = SkibidiToilet(
-                    position=pos,
+                y = PLAYER_GROUND_Y + self.rng.uniform(-6, 6)
+                saint = self.toilet_pool.acquire(
+                    SCREEN_WIDTH + 40,
+                    y,
                     health=14,
                     speed=1.1,
                     wiggle_amp=2.6,
@@ -642,24 +3121,26 @@ class Game:
                     scale=1.35,
                     score_value=5,
                 )
-                self.enemies.append(saint)
+                self.add_enemy(saint)
                 self.saint_spawned = True
             return
 
         base_health = 2 + max(0, self.wave - 1) * 0.2
-        base_speed = 1.2 + max(0, self.wave - 1) * 0.08
-        pos = pygame.Vector2(SCREEN_WIDTH + 40, PLAYER_GROUND_Y + random.uniform(-6, 6))
-        wiggle_amp = random.uniform(2.0, 3.5)
-
-        health_variation = random.choice([0, 0, 1])
-        speed_variation = random.uniform(-0.05, 0.25)
-        is_large = self.wave >= 8 and random.random() < 0.38
-        is_police = (not is_large) and self.wave >= 6 and random.random() < 0.32
-        is_medium = not (is_police or is_large) and self.wave >= 2 and random.random() < 0.35
+        base_speed = 1.2 + max(0, min(self.wave, ENDLESS_RAMP_CAP_WAVE) - 1) * 0.08
+        y = PLAYER_GROUND_Y + self.rng.uniform(-6, 6)
+        wiggle_amp = self.rng.uniform(2.0, 3.5)
+
+        health_variation = self.rng.choice([0, 0, 1])
+        speed_variation = self.rng.uniform(-0.05, 0.25)
+        ramp = self.endless_ramp()
+        is_large = self.wave >= 8 and self.rng.random() < 0.38 + 0.015 * ramp
+        is_police = (not is_large) and self.wave >= 6 and self.rng.random() < 0.32 + 0.01 * ramp
+        is_medium = not (is_police or is_large) and self.wave >= 2 and self.rng.random() < 0.35
         label = "Police" if is_police else ("Medium" if is_medium else ("Large" if is_large else ""))
         contact_damage = 4 if is_large else (POLICE_DAMAGE if is_police else ENEMY_DAMAGE)
-        enemy = SkibidiToilet(
-            position=pos,
+        enemy = self.toilet_pool.acquire(
+            SCREEN_WIDTH + 40,
+            y,
             health=int(
                 base_health
                 + health_variation
@@ -672,8 +3153,8 @@ class Game:
             body_color=
                 (118, 118, 128)
                 if is_police
-                else (195, 195, 205) if is_large else random.choice([(214, 214, 220), (222, 228, 234), (210, 216, 224)]),
-            rim_color=(175, 175, 182) if is_police else ((240, 240, 245) if is_large else random.choice([(240, 240, 245), (236, 240, 242)])),
+                else (195, 195, 205) if is_large else self.rng.choice([(214, 214, 220), (222, 228, 234), (210, 216, 224)]),
+            rim_color=(175, 175, 182) if is_police else ((240, 240, 245) if is_large else self.rng.choice([(240, 240, 245), (236, 240, 242)])),
             label=label,
             scale=1.1 if is_police else (1.25 if is_medium else (2.1 if is_large else 1.0)),
             is_medium=is_medium,
@@ -681,23 +3162,70 @@ class Game:
             score_value=2 if is_medium else (4 if is_large else 1),
             contact_damage=contact_damage,
         )
+        self.add_enemy(enemy)
+
+    def add_enemy(self, enemy: SkibidiToilet) -> SkibidiToilet:
+        self.next_uid += 1
+        enemy.uid = self.next_uid
+        if self.swarm is not None:
+            view = self.swarm.add(enemy)
+            self.toilet_pool.retire([enemy])  # the view copied everything it needs
+            return view
         self.enemies.append(enemy)
+        return enemy
 
-    def punch_hitbox(self) -> pygame.Rect:
-        if self.player.facing.length_squared() == 0:
-            facing = pygame.Vector2(0, -1)
+    def release_targets(self, gone: set) -> None:
+        """Drop ally targets whose toilet (or swarm view) is about to be recycled for a new spawn."""
+        for ally in self.allies:
+            if ally.target is not None and id(ally.target) in gone:
+                ally.target = None
+
+    def remove_enemy(self, enemy: SkibidiToilet) -> None:
+        self.release_targets({id(enemy)})
+        if self.swarm is not None:
+            self.swarm.remove(enemy)
         else:
-            facing = self.player.facing.normalize()
+            self.enemies.remove(enemy)
+        self.toilet_pool.retire([enemy])
 
-        punch_origin = self.player.position + facing * 28
-        hitbox_center = punch_origin + facing * (PUNCH_RANGE // 2)
-        size = (26, 26)
-        hitbox = pygame.Rect(0, 0, *size)
-        hitbox.center = (int(hitbox_center.x), int(hitbox_center.y))
-        return hitbox
+    def remove_enemies(self, dead: List[SkibidiToilet]) -> None:
+        """Remove a batch of toilets with one compaction instead of one list.remove each."""
+        gone = {id(enemy) for enemy in dead}
+        self.release_targets(gone)
+        if self.swarm is not None:
+            self.swarm.remove_many(dead)
+        else:
+            self.enemies[:] = [enemy for enemy in self.enemies if id(enemy) not in gone]
+        self.toilet_pool.retire(dead)
+
+    def clear_enemies(self) -> None:
+        for ally in self.allies:
+            ally.target = None
+        self.toilet_pool.retire(self.enemies)
+        if self.swarm is not None:
+            self.swarm.clear()
+        else:
+            self.enemies.clear()
+
+    def update(self, dt: float) -> None:
+        """Advance one simulation tick using the input source's buttons for this tick."""
+        self.profiler.begin()
+        self.buttons = self.input_source()
+        self.simulate(dt)
+        self.tick += 1
+        if self.snapshot_pending:
+            self.snapshot_pending = False
+            self.wave_snapshots[self.wave] = self.snapshot()
+        if self.recorder is not None:
+            self.recorder.record(self, dt)
 
-    def update(self, dt: int) -> None:
+    def simulate(self, dt: float) -> None:
+        self.combat.clear()
+        self.toilet_pool.recycle()
+        if not self.headless:
+            self.store_previous_positions()
         self.city.update(dt)
+        self.profiler.lap("update.city")
         self.flash_active_time = max(0, self.flash_active_time - dt)
         self.soundwave_active_time = max(0, self.soundwave_active_time - dt)
         self.stun_active_time = max(0, self.stun_active_time - dt)
@@ -707,6 +3235,9 @@ class Game:
             self.flash_beam_rect = None
             self.flash_circle = None
         self.player.update(dt)
+        if self.particles is not None:
+            self.particles.update(dt)
+            self.profiler.lap("update.particles")
 
         if self.state == "menu" or self.state == "game_over":
             return
@@ -717,104 +3248,63 @@ class Game:
                 self.start_wave(self.pending_wave)
             return
 
-        keys = pygame.key.get_pressed()
-        self.player.handle_input(keys)
+        buttons = self.buttons
+        self.player.handle_input(buttons)
 
-        if keys[pygame.K_u] and self.player.form == "cameraman" and self.score >= SPEAKERMAN_SCORE_COST:
-            self.score -= SPEAKERMAN_SCORE_COST
-            self.player.upgrade_to_speakerman()
-
-        if keys[pygame.K_u] and self.player.form == "speakerman" and self.score >= TVMAN_SCORE_COST:
-            self.score -= TVMAN_SCORE_COST
-            self.player.upgrade_to_tvman()
-
-        if keys[pygame.K_u] and self.player.form == "tvman":
-            if self.score >= LARGE_SPEAKER_SCORE_COST:
-                self.score -= LARGE_SPEAKER_SCORE_COST
-                self.player.upgrade_to_large_speakerman()
-            elif self.score >= LARGE_CAM_SCORE_COST:
-                self.score -= LARGE_CAM_SCORE_COST
-                self.player.upgrade_to_large_cameraman()
-
-        if keys[pygame.K_i] and self.player.form == "tvman" and self.score >= LARGE_SPEAKER_SCORE_COST:
-            self.score -= LARGE_SPEAKER_SCORE_COST
-            self.player.upgrade_to_large_speakerman()
+        # A held key can chain several upgrades in one tick when the score covers them all.
+        upgrading = True
+        while upgrading:
+            for action, cost, form in self.player.profile.upgrades:
+                if buttons & action and self.score >= cost:
+                    self.score -= cost
+                    self.player.become(form)
+                    break
+            else:
+                upgrading = False
+        self.profiler.lap("update.input")
 
-        if keys[pygame.K_u] and self.player.form == "large_cameraman" and self.score >= LARGE_SPEAKER_SCORE_COST:
-            self.score -= LARGE_SPEAKER_SCORE_COST
-            self.player.upgrade_to_large_speakerman()
+        self.enemy_grid.invalidate(self.enemies)
+        combat = self.combat
 
-        if keys[pygame.K_SPACE] and self.player.can_punch():
+        profile = self.player.profile
+        if buttons & ACTION_PUNCH and self.player.can_punch():
             self.player.start_punch()
-            hitbox = self.punch_hitbox()
-            for enemy in list(self.enemies):
-                if hitbox.collidepoint(enemy.position):
-                    if self.player.form == "tvman":
-                        damage = PUNCH_DAMAGE_TVMAN
-                    elif self.player.form == "speakerman":
-                        damage = PUNCH_DAMAGE_SPEAKERMAN
-                    elif self.player.form == "large_speakerman":
-                        damage = PUNCH_DAMAGE_LARGE_SPEAK
-                    elif self.player.form == "large_cameraman":
-                        damage = PUNCH_DAMAGE_LARGE
-                    else:
-                        damage = PUNCH_DAMAGE_CAMERAMAN
-                    enemy.take_damage(damage)
-                    offset = (enemy.position - self.player.position)
-                    if offset.length_squared() > 0:
-                        knock = 16 if self.player.form in {"speakerman", "tvman"} else 12
-                        enemy.position += offset.normalize() * knock
-                    if enemy.is_dead():
-                        self.enemies.remove(enemy)
-                        self.score += enemy.score_value
-                        self.wave_kills += 1
-
-        if keys[pygame.K_f] and self.player.can_flash():
+            hitbox = self.player.punch_hitbox()
+            damage, knock = profile.punch_damage, profile.punch_knockback
+            for enemy in self.enemy_grid.query_rect(hitbox):
+                offset = enemy.position - self.player.position
+                combat.hit(enemy, "punch", damage, offset.normalize() * knock if offset.length_squared() > 0 else None)
+        self.profiler.lap("update.punch")
+
+        if buttons & ACTION_FLASH and self.player.can_flash():
             self.player.start_flash()
-            if self.player.form == "large_speakerman":
+            if profile.flash == "blast":
                 self.flash_beam_rect = None
                 self.flash_circle = (self.player.position.copy(), ULTRA_BLAST_RADIUS)
                 self.flash_active_time = 260
-                for enemy in list(self.enemies):
-                    if enemy.position.distance_to(self.player.position) <= ULTRA_BLAST_RADIUS:
-                        enemy.take_damage(FLASH_DAMAGE_LARGE_SPEAK)
-                        push = (enemy.position - self.player.position)
-                        if push.length_squared() > 0:
-                            enemy.position += push.normalize() * 36
-                        if enemy.is_dead():
-                            self.enemies.remove(enemy)
-                            self.score += enemy.score_value
-                            self.wave_kills += 1
+                if self.particles is not None:
+                    self.particles.emit("shockwave", [self.player.position.x], [self.player.position.y], BLAST_DUST_COUNT)
+                for enemy in self.enemy_grid.query_radius(self.player.position, ULTRA_BLAST_RADIUS):
+                    push = enemy.position - self.player.position
+                    knock = push.normalize() * 36 if push.length_squared() > 0 else None
+                    combat.hit(enemy, "blast", profile.flash_damage, knock)
             else:
-                beam_rect = self.current_flash_beam_rect()
+                beam_rect = self.player.beam_rect()
                 self.flash_beam_rect = beam_rect
                 self.flash_circle = None
-                if self.player.form == "tvman":
+                if profile.flash == "stun":
                     self.stun_active_time = 260
-                    for enemy in list(self.enemies):
-                        if beam_rect.collidepoint(enemy.position.x, enemy.position.y):
-                            enemy.stun_timer = STUN_DURATION
+                    for enemy in self.enemy_grid.query_rect(beam_rect):
+                        combat.hit(enemy, "stun", 0, stun=STUN_DURATION)
                 else:
                     self.flash_active_time = 260
-                    for enemy in list(self.enemies):
-                        if beam_rect.collidepoint(enemy.position.x, enemy.position.y):
-                            if self.player.form == "speakerman":
-                                flash_damage = FLASH_DAMAGE_SPEAKERMAN
-                            elif self.player.form == "large_cameraman":
-                                flash_damage = FLASH_DAMAGE_LARGE
-                            else:
-                                flash_damage = FLASH_DAMAGE_CAMERAMAN
-                            enemy.take_damage(flash_damage)
-                            push = (enemy.position - self.player.position)
-                            if push.length_squared() > 0:
-                                push_strength = 20
-                                enemy.position += push.normalize() * push_strength
-                            if enemy.is_dead():
-                                self.enemies.remove(enemy)
-                                self.score += enemy.score_value
-                                self.wave_kills += 1
-
-        if self.player.form == "speakerman" and keys[pygame.K_x] and self.player.can_soundwave():
+                    for enemy in self.enemy_grid.query_rect(beam_rect):
+                        push = enemy.position - self.player.position
+                        knock = push.normalize() * 20 if push.length_squared() > 0 else None
+                        combat.hit(enemy, "flash", profile.flash_damage, knock)
+        self.profiler.lap("update.flash")
+
+        if buttons & ACTION_SPECIAL and self.player.can_soundwave():
             self.player.start_soundwave()
             self.soundwave_active_time = 240
             direction = 1 if self.player.facing.x >= 0 else -1
@@ -824,17 +3314,11 @@ class Game:
                 SOUNDWAVE_RANGE * direction,
                 SOUNDWAVE_HEIGHT,
             )
-            for enemy in list(self.enemies):
-                if wave_rect.collidepoint(enemy.position.x, enemy.position.y):
-                    enemy.take_damage(SOUNDWAVE_DAMAGE)
-                    push_dir = pygame.Vector2(direction, 0)
-                    enemy.position += push_dir * 26
-                    if enemy.is_dead():
-                        self.enemies.remove(enemy)
-                        self.score += enemy.score_value
-                        self.wave_kills += 1
-
-        if self.player.form == "large_speakerman" and keys[pygame.K_x] and self.player.can_kick():
+            for enemy in self.enemy_grid.query_rect(wave_rect):
+                combat.hit(enemy, "soundwave", SOUNDWAVE_DAMAGE, pygame.Vector2(direction * 26, 0))
+        self.profiler.lap("update.soundwave")
+
+        if buttons & ACTION_SPECIAL and self.player.can_kick():
             self.player.start_kick()
             self.kick_active_time = 180
             direction = self.player.facing if self.player.facing.length_squared() > 0 else pygame.Vector2(1, 0)
@@ -842,58 +3326,64 @@ class Game:
             kick_origin = self.player.position + direction * 24
             kick_rect = pygame.Rect(0, 0, KICK_RANGE, 40)
             kick_rect.center = (kick_origin.x + direction.x * (KICK_RANGE // 2), kick_origin.y - 6)
-            for enemy in list(self.enemies):
-                if kick_rect.collidepoint(enemy.position.x, enemy.position.y):
-                    enemy.take_damage(KICK_DAMAGE)
-                    enemy.position += direction * 34
-                    if enemy.is_dead():
-                        self.enemies.remove(enemy)
-                        self.score += enemy.score_value
-                        self.wave_kills += 1
-
-        if self.player.form == "tvman" and keys[pygame.K_x] and self.player.can_stab():
+            for enemy in self.enemy_grid.query_rect(kick_rect):
+                combat.hit(enemy, "kick", KICK_DAMAGE, direction * 34)
+        self.profiler.lap("update.kick")
+
+        if buttons & ACTION_SPECIAL and self.player.can_stab():
             self.player.start_stab()
             self.stab_active_time = 150
             direction = self.player.facing if self.player.facing.length_squared() > 0 else pygame.Vector2(1, 0)
             stab_origin = self.player.position + direction.normalize() * 22
             stab_rect = pygame.Rect(0, 0, STAB_RANGE, 32)
             stab_rect.center = (stab_origin.x + direction.x * (STAB_RANGE // 2), stab_origin.y)
-            for enemy in list(self.enemies):
-                if stab_rect.collidepoint(enemy.position.x, enemy.position.y):
-                    enemy.take_damage(STAB_DAMAGE)
-                    enemy.stun_timer = max(enemy.stun_timer, 240)
-                    if enemy.is_dead():
-                        self.enemies.remove(enemy)
-                        self.score += enemy.score_value
-                        self.wave_kills += 1
-
-        for ally in list(self.allies):
-            ally.update(dt, self.enemies)
-            if ally.health <= 0:
-                self.allies.remove(ally)
-
-        for enemy in list(self.enemies):
-            if enemy.is_dead():
-                self.enemies.remove(enemy)
-                self.score += enemy.score_value
-                self.wave_kills += 1
-
-        for enemy in list(self.enemies):
-            enemy.update(self.player.position, dt)
-            if enemy.stun_timer <= 0 and enemy.position.distance_to(self.player.position) <= ENEMY_CONTACT_DISTANCE:
-                self.player.take_damage(enemy.contact_damage)
-                away = (enemy.position - self.player.position)
-                if away.length_squared() > 0:
-                    enemy.position += away.normalize() * 16
-            for ally in list(self.allies):
-                if enemy.stun_timer <= 0 and enemy.position.distance_to(ally.position) <= ENEMY_CONTACT_DISTANCE:
-                    ally.health = max(0, ally.health - enemy.contact_damage)
-                    repel = (enemy.position - ally.position)
-                    if repel.length_squared() > 0:
-                        enemy.position += repel.normalize() * 10
+            for enemy in self.enemy_grid.query_rect(stab_rect):
+                combat.hit(enemy, "stab", STAB_DAMAGE, stun=240)
+        self.profiler.lap("update.stab")
+
+        self.squad.update(dt, self.allies, self.enemies, self.enemy_grid, combat)
+        self.profiler.lap("update.allies")
+
+        killed = combat.resolve()
+        if self.particles is not None and combat.events:
+            self.emit_particles(combat.events)
+        if killed:
+            self.remove_enemies(killed)
+            self.score += sum(enemy.score_value for enemy in killed)
+            self.wave_kills += len(killed)
+        self.profiler.lap("update.combat")
+
+        if self.swarm is not None:
+            self.swarm.step(self.player.position, dt)
+            self.swarm.resolve_contacts(self.player, self.allies)
+        else:
+            contact_sq = ENEMY_CONTACT_DISTANCE * ENEMY_CONTACT_DISTANCE
+            for enemy in self.enemies:
+                enemy.update(self.player.position, dt)
+                if enemy.stun_timer <= 0 and enemy.position.distance_squared_to(self.player.position) <= contact_sq:
+                    self.player.take_damage(enemy.contact_damage)
+                    away = enemy.position - self.player.position
+                    if away.length_squared() > 0:
+                        enemy.position += away.normalize() * 16
+
+            if self.allies:
+                # Ally contact goes through the grid instead of an enemies x allies scan.
+                self.enemy_grid.invalidate(self.enemies)
+                for ally in self.allies:
+                    for enemy in self.enemy_grid.query_radius(ally.position, ENEMY_CONTACT_DISTANCE):
+                        if enemy.stun_timer > 0:
+                            continue
+                        ally.health = max(0, ally.health - enemy.contact_damage)
+                        repel = enemy.position - ally.position
+                        if repel.length_squared() > 0:
+                            enemy.position += repel.normalize() * 10
+                            self.enemy_grid.move(enemy)
+        if any(ally.health <= 0 for ally in self.allies):
+            self.allies = [ally for ally in self.allies if ally.health > 0]
+        self.profiler.lap("update.enemies")
 
         if self.wave_kills >= self.wave_goal and not self.enemies and not self.pending_wave:
-            if self.wave >= MAX_WAVE:
+            if self.wave >= MAX_WAVE and not self.endless:
                 self.game_over = True
                 self.state = "victory"
             else:
@@ -913,93 +3403,273 @@ class Game:
                     (ENEMY_SPAWN_TIME - self.wave * 80) - self.score * 20,
                 )
                 if self.last_spawn >= spawn_delay:
-                    self.spawn_enemy()
+                    for _ in range(self.spawn_burst()):
+                        self.spawn_enemy()
                     self.last_spawn = 0
 
         if self.player.health <= 0:
             self.game_over = True
             self.state = "game_over"
+        self.profiler.lap("update.spawn")
+
+    def emit_particles(self, events: List[CombatEvent]) -> None:
+        """Sparks, embers or dust for each landed hit and debris for each kill, batched into one emit per kind."""
+        origins: dict[str, tuple[List[float], List[float]]] = {}
+        for event in events:
+            name = "debris" if event.kind == "kill" else HIT_PARTICLES.get(event.source)
+            if name is None:
+                continue  # stuns land without a mark
+            xs, ys = origins.setdefault(name, ([], []))
+            xs.append(event.enemy.position.x)
+            ys.append(event.enemy.position.y - 10)
+        for name, (xs, ys) in origins.items():
+            self.particles.emit(name, xs, ys)
 
-    def draw_ui(self) -> None:
-        text = self.font.render(f"Score: {self.score}", True, (255, 255, 255))
-        form_label = (
-            "Cameraman"
-            if self.player.form == "cameraman"
-            else "Speakerman"
-            if self.player.form == "speakerman"
-            else "TV Man"
-            if self.player.form == "tvman"
-            else "Large Speakerman"
-            if self.player.form == "large_speakerman"
-            else "Large Cameraman"
+    def snapshot(self) -> GameSnapshot:
+        """Capture everything the simulation reads, including the RNG, between two ticks."""
+        player = self.player
+        skip = {"position", "facing", "prev_position", "profile", "target"}
+        enemy_index = {id(enemy): i for i, enemy in enumerate(self.enemies)}
+        enemies = []
+        for enemy in self.enemies:
+            values = {}
+            for f in fields(SkibidiToilet):
+                if f.name not in skip:
+                    value = getattr(enemy, f.name)
+                    values[f.name] = value.item() if hasattr(value, "item") else value  # NumPy scalars from the swarm
+            enemies.append([enemy.position.x, enemy.position.y, values])
+        allies = [
+            [
+                ally.position.x,
+                ally.position.y,
+                {f.name: getattr(ally, f.name) for f in fields(Ally) if f.name not in skip},
+                enemy_index.get(id(ally.target), -1),
+            ]
+            for ally in self.allies
+        ]
+        version, internal, gauss = self.rng.getstate()
+        state = {
+            "seed": self.seed,
+            "endless": self.endless,
+            "tick": self.tick,
+            "rng": [version, list(internal), gauss],
+            "state": self.state,
+            "game_over": self.game_over,
+            "wave": self.wave,
+            "wave_goal": self.wave_goal,
+            "wave_kills": self.wave_kills,
+            "saint_spawned": self.saint_spawned,
+            "pending_wave": self.pending_wave,
+            "intermission_timer": self.intermission_timer,
+            "last_spawn": self.last_spawn,
+            "score": self.score,
+            "active": [
+                self.flash_active_time,
+                self.soundwave_active_time,
+                self.stun_active_time,
+                self.stab_active_time,
+                self.kick_active_time,
+            ],
+            "flash_beam_rect": list(self.flash_beam_rect) if self.flash_beam_rect else None,
+            "flash_circle": (
+                [self.flash_circle[0].x, self.flash_circle[0].y, self.flash_circle[1]] if self.flash_circle else None
+            ),
+            "player": [
+                player.position.x,
+                player.position.y,
+                player.facing.x,
+                player.facing.y,
+                {f.name: getattr(player, f.name) for f in fields(CameraMan) if f.name not in skip},
+            ],
+            "enemies": enemies,
+            "allies": allies,
+            "city": [
+                self.city.mode,
+                [[list(b.rect), b.color, b.window_color, b.windows] for b in self.city.buildings],
+            ],
+        }
+        # One JSON round trip makes the snapshot plain data that later ticks cannot mutate.
+        return GameSnapshot(json.loads(json.dumps(state)))
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """Replace the simulation state with ``snapshot``; play continues as it would have from there."""
+        state = snapshot.state
+        version, internal, gauss = state["rng"]
+        self.seed = state["seed"]
+        self.endless = state.get("endless", False)
+        self.rng = random.Random()
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.tick = state["tick"]
+        for name in (
+            "state", "game_over", "wave", "wave_goal", "wave_kills", "saint_spawned",
+            "pending_wave", "intermission_timer", "last_spawn", "score",
+        ):
+            setattr(self, name, state[name])
+        (
+            self.flash_active_time,
+            self.soundwave_active_time,
+            self.stun_active_time,
+            self.stab_active_time,
+            self.kick_active_time,
+        ) = state["active"]
+        self.flash_beam_rect = pygame.Rect(state["flash_beam_rect"]) if state["flash_beam_rect"] else None
+        circle = state["flash_circle"]
+        self.flash_circle = (pygame.Vector2(circle[0], circle[1]), circle[2]) if circle else None
+
+        x, y, fx, fy, values = state["player"]
+        self.player = CameraMan(pygame.Vector2(x, y), pygame.Vector2(fx, fy), **values)
+
+        self.clear_enemies()
+        if self.particles is not None:
+            self.particles.clear()
+        for x, y, values in state["enemies"]:
+            values = {name: tuple(value) if isinstance(value, list) else value for name, value in values.items()}
+            self.add_enemy(self.toilet_pool.acquire(x, y, **values))
+        self.allies = []
+        for x, y, values, target in state["allies"]:
+            ally = Ally(pygame.Vector2(x, y), **values)
+            ally.target = self.enemies[target] if target >= 0 else None
+            self.allies.append(ally)
+
+        mode, buildings = state["city"]
+        self.city = CityMap(
+            mode,
+            self.rng,
+            [
+                Building(pygame.Rect(rect), tuple(color), tuple(window), [tuple(w) for w in windows])
+                for rect, color, window, windows in buildings
+            ],
+        )
+        self.snapshot_pending = False
+        self.restores += 1
+        if self.recorder is not None:
+            self.recorder.replay = None  # a replay has to start from reset(); this session no longer does
+
+    def save_snapshots(self) -> None:
+        """Merge the wave snapshots seen this run into the snapshot file, keeping waves not reached."""
+        if self.snapshot_path is None or not self.wave_snapshots:
+            return
+        snapshots = GameSnapshot.load_all(self.snapshot_path) if os.path.exists(self.snapshot_path) else {}
+        snapshots.update(self.wave_snapshots)
+        GameSnapshot.save_all(self.snapshot_path, snapshots)
+
+    def state_hash(self) -> int:
+        """CRC32 of the simulation state, used to check that a replay reproduces its recording."""
+        player = self.player
+        summary = (
+            f"{self.state}|{player.form}|{self.wave}|{self.wave_kills}|{self.score}|{self.last_spawn}|"
+            f"{player.health}|{player.punch_cooldown_timer}|{player.flash_cooldown_timer}"
         )
-        form = self.font.render(f"Form: {form_label}", True, (190, 255, 210))
-        cooldown = max(0, math.ceil(self.player.punch_cooldown_timer / 100))
-        cd_text = self.font.render(f"Punch: {cooldown/10:.1f}s", True, (210, 210, 210))
-        flash_cd = max(0, math.ceil(self.player.flash_cooldown_timer / 100))
-        if self.player.form == "tvman":
-            flash_name = "Stun Screen"
-        elif self.player.form == "large_speakerman":
-            flash_name = "Ultra Blast"
+        crc = zlib.crc32(summary.encode())
+        crc = zlib.crc32(struct.pack("<2d", player.position.x, player.position.y), crc)
+        for enemy in self.enemies:
+            state = struct.pack("<3did", enemy.position.x, enemy.position.y, enemy.wobble_phase, enemy.health, enemy.stun_timer)
+            crc = zlib.crc32(state, crc)
+        for ally in self.allies:
+            crc = zlib.crc32(struct.pack("<2di", ally.position.x, ally.position.y, ally.health), crc)
+        return crc
+
+    def play_replay(self, replay: Replay) -> int | None:
+        """Feed a recording back through update(); returns the first tick whose state hash differs."""
+        self.reset(seed=replay.seed)
+        self.input_source = lambda: replay.inputs[self.tick]
+        for tick in range(len(replay.inputs)):
+            self.update(replay.dt)
+            if tick % replay.hash_interval == 0:
+                index = tick // replay.hash_interval
+                if index < len(replay.hashes) and self.state_hash() != replay.hashes[index]:
+                    return tick
+        return None
+
+    def hud_state(self) -> tuple:
+        """Everything the status block shows, with cooldowns at the displayed tenth of a second."""
+        special = self.player.profile.special
+        if special is None:
+            special_timer = 0
+        elif special == "stab":
+            special_timer = self.player.stab_cooldown_timer
         else:
-            flash_name = "Flash"
-        flash_text = self.font.render(f"{flash_name}: {flash_cd/10:.1f}s", True, (190, 235, 255))
-        sound_cd = max(0, math.ceil(self.player.soundwave_cooldown_timer / 100)) if self.player.form in {"speakerman", "large_speakerman"} else 0
-        stab_cd = max(0, math.ceil(self.player.stab_cooldown_timer / 100)) if self.player.form == "tvman" else 0
-        wave_text = self.font.render(f"Wave {self.wave}", True, (255, 235, 180))
-        self.screen.blit(text, (12, 12))
-        self.screen.blit(form, (12, 36))
-        self.screen.blit(cd_text, (12, 60))
-        self.screen.blit(flash_text, (12, 84))
-        wave_y = 108
-        if self.player.form == "speakerman":
-            sound_label = self.font.render(f"Soundwave: {sound_cd/10:.1f}s", True, (220, 200, 255))
-            self.screen.blit(sound_label, (12, wave_y))
-            wave_y += 24
-        if self.player.form == "large_speakerman":
-            sound_label = self.font.render(f"Kick: {sound_cd/10:.1f}s", True, (255, 200, 180))
-            self.screen.blit(sound_label, (12, wave_y))
-            wave_y += 24
-        if self.player.form == "tvman":
-            stab_label = self.font.render(f"Stab: {stab_cd/10:.1f}s", True, (255, 205, 170))
-            self.screen.blit(stab_label, (12, wave_y))
-            wave_y += 24
-        self.screen.blit(wave_text, (12, wave_y))
-
-        max_health = FORM_MAX_HEALTH[self.player.form]
+            special_timer = self.player.soundwave_cooldown_timer
+        return (
+            self.score,
+            self.player.form,
+            max(0, math.ceil(self.player.punch_cooldown_timer / 100)),
+            max(0, math.ceil(self.player.flash_cooldown_timer / 100)),
+            max(0, math.ceil(special_timer / 100)),
+            self.wave,
+            self.player.health,
+        )
+
+    def frame_snapshot(self, punch_active: bool, detached: bool = False) -> FrameSnapshot:
+        """What rendering a frame reads from the simulation right now.
+
+        A live snapshot refers to the game's own objects. ``detached`` copies
+        everything that moves so a render thread can draw it while ticks continue.
+        """
+        city, player, allies, enemies = self.city, self.player, self.allies, self.enemies
+        flash_circle, flash_beam_rect = self.flash_circle, self.flash_beam_rect
+        if detached:
+            city = city.detached()
+            player = player.detached()
+            allies = [ally.detached() for ally in allies]
+            enemies = self.swarm.detached() if self.swarm is not None else [enemy.detached() for enemy in enemies]
+            if flash_circle is not None:
+                flash_circle = (flash_circle[0].copy(), flash_circle[1])
+            if flash_beam_rect is not None:
+                flash_beam_rect = flash_beam_rect.copy()
+        return FrameSnapshot(
+            time=time.perf_counter(),
+            state=self.state,
+            wave=self.wave,
+            score=self.score,
+            game_over=self.game_over,
+            intermission_timer=self.intermission_timer,
+            can_retry=self.wave in self.wave_snapshots,
+            restores=self.restores,
+            hud=self.hud_state(),
+            punch_active=punch_active,
+            city=city,
+            player=player,
+            allies=allies,
+            enemies=enemies,
+            flash_circle=flash_circle,
+            flash_beam_rect=flash_beam_rect,
+            flash_active_time=self.flash_active_time,
+            soundwave_active_time=self.soundwave_active_time,
+            stun_active_time=self.stun_active_time,
+            stab_active_time=self.stab_active_time,
+            kick_active_time=self.kick_active_time,
+        )
+
+    def compose_hud(self, state: tuple) -> pygame.Surface:
+        score, form, cooldown, flash_cd, special_cd, wave, health = state
+        profile = FORM_PROFILES[form]
+        lines = []
+        lines.append((f"Score: {score}", (255, 255, 255)))
+        lines.append((f"Form: {profile.label}", (190, 255, 210)))
+        lines.append((f"Punch: {cooldown/10:.1f}s", (210, 210, 210)))
+        lines.append((f"{profile.flash_label}: {flash_cd/10:.1f}s", (190, 235, 255)))
+        if profile.special is not None:
+            lines.append((f"{profile.special_label}: {special_cd/10:.1f}s", profile.special_color))
+        lines.append((f"Wave {wave}", (255, 235, 180)))
+
+        max_health = profile.max_health
+        hearts_y = 12 + 24 * (len(lines) - 1) + 28
+        labels = [self.text.render(line, color) for line, color in lines]
+        width = 12 + max([max_health * 26] + [label.get_width() for label in labels])
+        layer = pygame.Surface((width, hearts_y + 16), pygame.SRCALPHA)
+        for i, label in enumerate(labels):
+            layer.blit(label, (12, 12 + 24 * i))
         for i in range(max_health):
-            color = (255, 90, 90) if i < self.player.health else (70, 60, 60)
-            pygame.draw.rect(self.screen, color, pygame.Rect(12 + i * 26, wave_y + 28, 20, 16), border_radius=4)
-
-        instructions = ["Move: A/D or Arrows", "Punch: Space"]
-        if self.player.form == "cameraman":
-            instructions += [
-                "F: Beam flash",
-                f"U ({SPEAKERMAN_SCORE_COST} pts): Speakerman",
-            ]
-        elif self.player.form == "speakerman":
-            instructions += [
-                "F: Beam flash",
-                "X: Soundwave cone",
-                f"U ({TVMAN_SCORE_COST} pts): TV Man",
-            ]
-        elif self.player.form == "tvman":
-            instructions += [
-                "F: Stun screen",
-                "X: Stab",
-                f"U ({LARGE_CAM_SCORE_COST} pts): Large Cam",
-                f"I ({LARGE_SPEAKER_SCORE_COST} pts): Large Speakerman",
-            ]
-        elif self.player.form == "large_cameraman":
-            instructions += [
-                "F: Heavy beam",
-            ]
-        elif self.player.form == "large_speakerman":
-            instructions += [
-                "F: Ultra sound blast (360°)",
-                "X: Kick strike",
-            ]
+            color = (255, 90, 90) if i < health else (70, 60, 60)
+            pygame.draw.rect(layer, color, pygame.Rect(12 + i * 26, hearts_y, 20, 16), border_radius=4)
+        return layer.convert_alpha()
 
+    def instructions_layer(self, form: str) -> pygame.Surface:
+        layer = self.instruction_layers.get(form)
+        if layer is not None:
+            return layer
+        instructions = ["Move: A/D or Arrows", "Punch: Space", *FORM_PROFILES[form].instructions]
         instructions += [
             "Clear toilets to start intermission",
             "Wave 5: Saint boss only",
@@ -1007,22 +3677,41 @@ class Game:
             "Wave 7-8: Center city showdown",
             "Wave 8: Huge Skibidi appears",
         ]
-        for i, line in enumerate(instructions):
-            label = self.font.render(line, True, (200, 215, 230))
-            self.screen.blit(label, (12, SCREEN_HEIGHT - 24 * (len(instructions) - i)))
-
-    def draw_menu(self) -> None:
-        self.city.draw(self.screen)
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        self.screen.blit(overlay, (0, 0))
-        title = self.font.render("Skibidi City Showdown", True, (255, 235, 180))
-        subtitle = self.font.render("Press Start to defend the streets", True, (210, 220, 235))
-        pygame.draw.rect(self.screen, (40, 160, 240), self.start_button, border_radius=12)
-        start_label = self.font.render("Start", True, (255, 255, 255))
-        self.screen.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 70)))
-        self.screen.blit(subtitle, subtitle.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 40)))
-        self.screen.blit(start_label, start_label.get_rect(center=self.start_button.center))
+        labels = [self.text.render(line, (200, 215, 230)) for line in instructions]
+        layer = pygame.Surface((12 + max(label.get_width() for label in labels), 24 * len(labels)), pygame.SRCALPHA)
+        for i, label in enumerate(labels):
+            layer.blit(label, (12, 24 * i))
+        layer = layer.convert_alpha()
+        self.instruction_layers[form] = layer
+        return layer
+
+    def draw_ui(self, scene: FrameSnapshot) -> None:
+        # The HUD is a retained layer: it is only re-composed when a displayed value changes.
+        state = scene.hud
+        changed = state != self.hud_key or self.hud_layer is None
+        if changed:
+            self.hud_key = state
+            self.hud_layer = self.compose_hud(state)
+        hud_rect = self.ui_canvas.blit(self.hud_layer, (0, 0))
+        instructions = self.instructions_layer(scene.player.form)
+        instructions_rect = self.ui_canvas.blit(instructions, (0, SCREEN_HEIGHT - instructions.get_height()))
+        if changed:
+            # Old and new layer areas both need presenting; the new layer may be smaller.
+            self.dirty.extend(self.hud_rects)
+            self.hud_rects = [hud_rect, instructions_rect]
+            self.dirty.extend(self.hud_rects)
+
+    def draw_menu(self, city: CityMap, alpha: float = 1.0) -> None:
+        city.draw(self.canvas, alpha)
+        self.compose_frame()
+        self.ui_canvas.blit(self.effects.panel((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0), 120), (0, 0))
+        title = self.text.render("Skibidi City Showdown", (255, 235, 180))
+        subtitle = self.text.render("Press Start to defend the streets", (210, 220, 235))
+        draw_rect(self.ui_canvas, (40, 160, 240), self.start_button, border_radius=12)
+        start_label = self.text.render("Start", (255, 255, 255))
+        self.ui_canvas.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 70)))
+        self.ui_canvas.blit(subtitle, subtitle.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 40)))
+        self.ui_canvas.blit(start_label, start_label.get_rect(center=self.start_button.center))
 
         updates = [
             "Updates:",
@@ -1035,156 +3724,489 @@ class Game:
             "- Allies now fight with you",
         ]
         for i, line in enumerate(updates):
-            label = self.font.render(line, True, (200, 215, 230))
-            self.screen.blit(label, (SCREEN_WIDTH - 320, SCREEN_HEIGHT - 24 * (len(updates) - i)))
+            label = self.text.render(line, (200, 215, 230))
+            self.ui_canvas.blit(label, (SCREEN_WIDTH - 320, SCREEN_HEIGHT - 24 * (len(updates) - i)))
 
-    def draw(self, punch_active: bool) -> None:
-        if self.state == "menu":
-            self.draw_menu()
-            pygame.display.flip()
+    def draw(self, punch_active: bool, alpha: float = 1.0) -> None:
+        """Render the live game ``alpha`` of the way from the previous simulation tick to the latest one."""
+        self.render(self.frame_snapshot(punch_active), alpha)
+
+    def render(self, scene: FrameSnapshot, alpha: float = 1.0) -> None:
+        """Render ``scene`` ``alpha`` of the way from its previous tick to its latest one."""
+        if scene.restores != self.presented_restores:
+            # The snapshot came from a restore(): the HUD and the whole window are drawn afresh.
+            self.presented_restores = scene.restores
+            self.hud_key = None
+            self.force_full_present = True
+        if alpha < 1.0:
+            scene = replace(
+                scene, player=scene.player.posed(alpha), allies=[ally.posed(alpha) for ally in scene.allies]
+            )
+        self.draw_scene(scene, alpha)
+
+    def draw_scene(self, scene: FrameSnapshot, alpha: float) -> None:
+        self.dirty = []
+        self.profiler.begin()
+        if scene.state == "menu":
+            self.draw_menu(scene.city, alpha)
+            self.profiler.lap("draw.menu")
+            self.present(scene)
+            self.profiler.lap("draw.present")
             return
 
-        self.city.draw(self.screen)
-        self.player.draw(self.screen)
+        dirty = self.dirty
+        quality = self.quality
+        self.effects.coarse = quality.drops("effect fades")
+        canvas = self.canvas
+        dirty.extend(scene.city.draw(canvas, alpha, windows=not quality.drops("building windows")))
+        self.profiler.lap("draw.city")
+        self.actor_sprites.draw_player(canvas, scene.player, detailed=not quality.drops("tv crack"))
+        dirty.append(scene.player.bounds())
 
-        for ally in self.allies:
-            ally.draw(self.screen)
+        for ally in scene.allies:
+            self.actor_sprites.draw_ally(canvas, ally)
+            dirty.append(ally.bounds())
 
-        for enemy in self.enemies:
-            enemy.draw(self.screen)
+        self.toilet_sprites.draw_all(
+            canvas, scene.enemies, dirty, alpha, scene.player.position, quality.drops("toilet detail")
+        )
+        self.profiler.lap("draw.entities")
+        if self.particles is not None:
+            particle_rect = self.particles.draw(canvas)
+            if particle_rect is not None:
+                dirty.append(particle_rect)
+            self.profiler.lap("draw.particles")
 
-        if punch_active:
-            hitbox = self.punch_hitbox()
-            pygame.draw.rect(self.screen, (255, 100, 100), hitbox, width=2)
+        if scene.punch_active:
+            hitbox = scene.player.punch_hitbox()
+            dirty.append(draw_rect(canvas, (255, 100, 100), hitbox, width=2))
 
-        if self.flash_circle and self.flash_active_time > 0:
-            center, radius = self.flash_circle
+        if scene.flash_circle and scene.flash_active_time > 0:
+            center, radius = scene.flash_circle
             int_radius = int(radius)
-            overlay = pygame.Surface((int_radius * 2, int_radius * 2), pygame.SRCALPHA)
-            strength = self.flash_active_time / 260
-            for r in range(int_radius, 0, -16):
-                alpha = int(160 * strength * (r / int_radius))
-                pygame.draw.circle(overlay, (180, 160, 255, alpha), (int_radius, int_radius), r, width=8)
-            pygame.draw.circle(overlay, (255, 210, 140, int(140 * strength)), (int_radius, int_radius), int_radius // 3)
-            self.screen.blit(overlay, (center.x - int_radius, center.y - int_radius))
-
-        if (self.flash_active_time > 0 or self.stun_active_time > 0) and self.flash_beam_rect:
-            rect = self.flash_beam_rect
-            active_time = self.flash_active_time if self.flash_active_time > 0 else self.stun_active_time
-            intensity = active_time / 260
-            overlay = pygame.Surface(rect.size, pygame.SRCALPHA)
-            primary_color = (255, 200, 120) if self.player.form != "tvman" else (150, 130, 255)
-            fringe_color = (80, 170, 255) if self.player.form != "tvman" else (220, 180, 255)
-            for i in range(rect.width):
-                t = i / rect.width
-                alpha = int(180 * intensity * (1 - t * 0.65))
-                edge_alpha = int(alpha * 0.6)
-                pygame.draw.line(overlay, (*primary_color, alpha), (i, 0), (i, rect.height))
-                if i % 16 == 0:
-                    pygame.draw.line(overlay, (*fringe_color, edge_alpha), (i, 0), (i, rect.height))
-            mid_x = rect.width // 3 if self.player.facing.x < 0 else rect.width // 3 * 2
-            pygame.draw.line(overlay, (*fringe_color, int(220 * intensity)), (mid_x, 0), (mid_x, rect.height), 3)
-            self.screen.blit(overlay, rect.topleft)
+            overlay = self.effects.blast(int_radius, scene.flash_active_time / 260)
+            dirty.append(canvas.blit(overlay, (center.x - int_radius, center.y - int_radius)))
 
-        if self.soundwave_active_time > 0:
-            direction = 1 if self.player.facing.x >= 0 else -1
-            start_x = self.player.position.x + (16 * direction)
+        if (scene.flash_active_time > 0 or scene.stun_active_time > 0) and scene.flash_beam_rect:
+            rect = scene.flash_beam_rect
+            active_time = scene.flash_active_time if scene.flash_active_time > 0 else scene.stun_active_time
+            overlay = self.effects.beam(
+                rect.size, scene.player.profile.flash == "stun", scene.player.facing.x < 0, active_time / 260
+            )
+            dirty.append(canvas.blit(overlay, rect.topleft))
+
+        if scene.soundwave_active_time > 0:
+            direction = 1 if scene.player.facing.x >= 0 else -1
+            start_x = scene.player.position.x + (16 * direction)
             rect = pygame.Rect(0, 0, SOUNDWAVE_RANGE, SOUNDWAVE_HEIGHT)
             if direction < 0:
                 rect.right = start_x
             else:
                 rect.left = start_x
-            alpha = int(180 * (self.soundwave_active_time / 240))
-            overlay = pygame.Surface(rect.size, pygame.SRCALPHA)
-            overlay.fill((150, 110, 255, alpha))
-            self.screen.blit(overlay, rect.topleft)
+            fade = int(180 * (scene.soundwave_active_time / 240))
+            dirty.append(canvas.blit(self.effects.panel(rect.size, (150, 110, 255), fade), rect.topleft))
 
-        if self.kick_active_time > 0:
-            direction = self.player.facing if self.player.facing.length_squared() > 0 else pygame.Vector2(1, 0)
+        if scene.kick_active_time > 0:
+            direction = scene.player.facing if scene.player.facing.length_squared() > 0 else pygame.Vector2(1, 0)
             direction = direction.normalize()
-            kick_origin = self.player.position + direction * 24
+            kick_origin = scene.player.position + direction * 24
             rect = pygame.Rect(0, 0, KICK_RANGE, 40)
             rect.center = (kick_origin.x + direction.x * (KICK_RANGE // 2), kick_origin.y - 6)
-            alpha = int(180 * (self.kick_active_time / 180))
-            overlay = pygame.Surface(rect.size, pygame.SRCALPHA)
-            overlay.fill((255, 140, 100, alpha))
-            self.screen.blit(overlay, rect.topleft)
+            fade = int(180 * (scene.kick_active_time / 180))
+            dirty.append(canvas.blit(self.effects.panel(rect.size, (255, 140, 100), fade), rect.topleft))
 
-        if self.stab_active_time > 0:
-            direction = self.player.facing if self.player.facing.length_squared() > 0 else pygame.Vector2(1, 0)
-            stab_origin = self.player.position + direction.normalize() * 22
+        if scene.stab_active_time > 0:
+            direction = scene.player.facing if scene.player.facing.length_squared() > 0 else pygame.Vector2(1, 0)
+            stab_origin = scene.player.position + direction.normalize() * 22
             stab_rect = pygame.Rect(0, 0, STAB_RANGE, 32)
             stab_rect.center = (stab_origin.x + direction.x * (STAB_RANGE // 2), stab_origin.y)
-            pygame.draw.rect(self.screen, (255, 200, 120), stab_rect, width=2)
+            dirty.append(draw_rect(canvas, (255, 200, 120), stab_rect, width=2))
+        self.profiler.lap("draw.effects")
+        self.compose_frame()
 
-        self.draw_ui()
+        self.draw_ui(scene)
 
-        if self.state == "intermission":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 130))
-            self.screen.blit(overlay, (0, 0))
-            seconds = max(0, math.ceil(self.intermission_timer / 100) / 10)
-            title = self.font.render("Intermission", True, (255, 230, 180))
-            timer_text = self.font.render(f"Next wave in {seconds:.1f}s", True, (210, 220, 255))
-            note_text = "City center ahead..." if self.wave >= 6 else "All toilets cleared!"
-            note = self.font.render(note_text, True, (200, 255, 200))
+        if scene.state == "intermission":
+            self.ui_canvas.blit(self.effects.panel((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0), 130), (0, 0))
+            seconds = max(0, math.ceil(scene.intermission_timer / 100) / 10)
+            title = self.text.render("Intermission", (255, 230, 180))
+            timer_text = self.text.render(f"Next wave in {seconds:.1f}s", (210, 220, 255))
+            note_text = "City center ahead..." if scene.wave >= 6 else "All toilets cleared!"
+            note = self.text.render(note_text, (200, 255, 200))
             center_x = SCREEN_WIDTH // 2
-            self.screen.blit(title, title.get_rect(center=(center_x, SCREEN_HEIGHT // 2 - 20)))
-            self.screen.blit(timer_text, timer_text.get_rect(center=(center_x, SCREEN_HEIGHT // 2 + 8)))
-            self.screen.blit(note, note.get_rect(center=(center_x, SCREEN_HEIGHT // 2 + 36)))
-
-        if self.game_over and self.state == "victory":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 30, 40, 180))
-            self.screen.blit(overlay, (0, 0))
-            title = self.font.render("City Secured!", True, (180, 255, 210))
-            prompt = self.font.render("Press R to restart", True, (230, 230, 230))
-            score_text = self.font.render(f"Final score: {self.score}", True, (200, 220, 255))
-            wave_text = self.font.render("Center streets are safe.", True, (200, 255, 200))
-            self.screen.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30)))
-            self.screen.blit(score_text, score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
-            self.screen.blit(wave_text, wave_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 26)))
-            self.screen.blit(prompt, prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 56)))
-
-        if self.game_over and self.state == "game_over":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            self.screen.blit(overlay, (0, 0))
-            title = self.font.render("Skibidi City Fell!", True, (255, 120, 120))
-            prompt = self.font.render("Press R to restart", True, (230, 230, 230))
-            score_text = self.font.render(f"Final score: {self.score}", True, (200, 220, 255))
-            self.screen.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20)))
-            self.screen.blit(score_text, score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10)))
-            self.screen.blit(prompt, prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40)))
-        pygame.display.flip()
+            self.ui_canvas.blit(title, title.get_rect(center=(center_x, SCREEN_HEIGHT // 2 - 20)))
+            self.ui_canvas.blit(timer_text, timer_text.get_rect(center=(center_x, SCREEN_HEIGHT // 2 + 8)))
+            self.ui_canvas.blit(note, note.get_rect(center=(center_x, SCREEN_HEIGHT // 2 + 36)))
 
-    def run(self) -> None:
+        if scene.game_over and scene.state == "victory":
+            self.ui_canvas.blit(self.effects.panel((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 30, 40), 180), (0, 0))
+            title = self.text.render("City Secured!", (180, 255, 210))
+            prompt = self.text.render("Press R to restart", (230, 230, 230))
+            score_text = self.text.render(f"Final score: {scene.score}", (200, 220, 255))
+            wave_text = self.text.render("Center streets are safe.", (200, 255, 200))
+            self.ui_canvas.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30)))
+            self.ui_canvas.blit(score_text, score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+            self.ui_canvas.blit(wave_text, wave_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 26)))
+            self.ui_canvas.blit(prompt, prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 56)))
+
+        if scene.game_over and scene.state == "game_over":
+            self.ui_canvas.blit(self.effects.panel((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0), 150), (0, 0))
+            title = self.text.render("Skibidi City Fell!", (255, 120, 120))
+            prompt = self.text.render(
+                "Press R to restart, W to retry the wave" if scene.can_retry else "Press R to restart",
+                (230, 230, 230),
+            )
+            score_text = self.text.render(f"Final score: {scene.score}", (200, 220, 255))
+            self.ui_canvas.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20)))
+            self.ui_canvas.blit(score_text, score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10)))
+            self.ui_canvas.blit(prompt, prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40)))
+        self.profiler.lap("draw.ui")
+
+        if self.profiler.enabled:
+            dirty.append(self.draw_profiler())
+            self.profiler.lap("draw.profiler")
+        self.present(scene)
+        self.profiler.lap("draw.present")
+
+    def to_logical(self, pos: tuple[int, int]) -> tuple[int, int]:
+        """Window position to game coordinates; they differ when the display itself is scaled."""
+        return self.ui_canvas.to_logical(pos) if self.display_scale != 1.0 else pos
+
+    def compose_frame(self) -> None:
+        """Upscale a reduced-resolution scene onto the window so the UI can draw over it at full resolution."""
+        if self.frame is not None:
+            self.canvas.resize(self.frame, (SCREEN_WIDTH, SCREEN_HEIGHT), self.screen)
+            self.profiler.lap("draw.upscale")
+
+    def draw_profiler(self) -> pygame.Rect:
+        """Blit the rolling per-phase breakdown; the layer is only re-composed every PROFILE_REFRESH frames."""
+        if self.profiler_layer is None or self.profiler.frames % PROFILE_REFRESH == 0:
+            rows = self.profiler.breakdown()
+            total = sum(mean for _, mean, _ in rows)
+            header, body, footer = (255, 235, 180), (210, 220, 235), (190, 255, 210)
+            lines = [(("phase", "mean", "max"), header)]
+            lines += [((name, f"{mean:.2f}", f"{worst:.2f}"), body) for name, mean, worst in rows]
+            lines.append((("frame", f"{total:.2f}", ""), footer))
+            lines += [((name, value, ""), header) for name, value in self.quality.overlay_rows()]
+            # Columns are blitted separately so the numbers line up in any font.
+            cells = [[self.debug_font.render(text, True, color) for text in line] for line, color in lines]
+            name_width = max(row[0].get_width() for row in cells) + 12
+            column = max(cell.get_width() for row in cells for cell in row[1:]) + 12
+            layer = pygame.Surface((name_width + 2 * column + 16, 16 * len(cells) + 12), pygame.SRCALPHA)
+            layer.fill((0, 0, 0, 170))
+            for i, (name, mean, worst) in enumerate(cells):
+                y = 6 + 16 * i
+                layer.blit(name, (8, y))
+                layer.blit(mean, (8 + name_width + column - mean.get_width(), y))
+                layer.blit(worst, (8 + name_width + 2 * column - worst.get_width(), y))
+            self.profiler_layer = layer.convert_alpha()
+        return self.ui_canvas.blit(self.profiler_layer, (SCREEN_WIDTH - self.profiler_layer.get_width() - 8, 8))
+
+    def present(self, scene: FrameSnapshot) -> None:
+        """Show the frame: a full flip, or in dirty-rect mode only the areas touched this frame or last."""
+        if not self.dirty_rects:
+            pygame.display.flip()
+            return
+        rects = self.prev_dirty + self.dirty
+        full = (
+            self.force_full_present
+            or scene.state != "playing"
+            or self.presented_state != scene.state
+            or self.presented_map != scene.city.mode
+            or dirty_coverage(rects) > DIRTY_FULL_FLIP_RATIO
+        )
+        if full:
+            pygame.display.flip()
+        elif self.display_scale != 1.0:
+            pygame.display.update([self.ui_canvas.to_frame(rect) for rect in rects])
+        else:
+            pygame.display.update(rects)
+        self.prev_dirty = self.dirty
+        self.presented_state = scene.state
+        self.presented_map = scene.city.mode
+        self.force_full_present = False
+
+    def store_previous_positions(self) -> None:
+        """Remember where everything was at the start of the tick so draw() can interpolate."""
+        for actor in (self.player, *self.allies):
+            if actor.prev_position is None:
+                actor.prev_position = actor.position.copy()
+            else:
+                actor.prev_position.update(actor.position)
+        if self.swarm is not None:
+            self.swarm.store_previous()
+            return
+        for enemy in self.enemies:
+            if enemy.prev_position is None:
+                enemy.prev_position = enemy.position.copy()
+            else:
+                enemy.prev_position.update(enemy.position)
+
+    def run(self, start: GameSnapshot | None = None) -> None:
+        """Fixed-timestep loop: the simulation always advances in SIM_DT ticks, decoupled from render rate.
+
+        Rendered frames interpolate between the last two ticks. A slow frame runs
+        several ticks before the next render instead of slowing gameplay down.
+        With ``threaded`` the ticks run on a SimulationThread instead. ``start``
+        skips the menu and begins play from that snapshot.
+        """
+        if start is not None:
+            self.wave_snapshots[start.wave] = start
+            self.restore(start)
+        if self.spectator is not None:
+            self.spectator.start()
+            print(f"Spectators can connect to {self.spectator.host}:{self.spectator.port}")
+        if self.threaded:
+            self.run_threaded()
+        else:
+            self.run_frames()
+
+        if self.recorder is not None:
+            self.recorder.save()
+        self.save_snapshots()
+        if self.spectator is not None:
+            self.spectator.stop()
+        print(self.quality.report())
+        if self.sim is not None:
+            print(self.sim.report())
+        pygame.quit()
+        sys.exit()
+
+    def run_frames(self) -> None:
+        """Single-threaded loop: each frame runs the ticks that are due, then draws."""
         running = True
+        accumulator = 0.0
         while running:
-            dt = self.clock.tick(FPS)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                if self.state == "menu":
-                    if event.type == pygame.MOUSEBUTTONDOWN and self.start_button.collidepoint(event.pos):
-                        self.reset()
-                    if event.type == pygame.KEYDOWN and event.key in (pygame.K_RETURN, pygame.K_SPACE):
-                        self.reset()
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_r and self.game_over:
-                    self.reset()
+            frame_time = self.clock.tick(self.render_hz)
+            frame_start = time.perf_counter()
+            accumulator = min(accumulator + frame_time * self.fast_forward, MAX_FRAME_TIME * self.fast_forward)
+            running = self.handle_events(self)
 
             punch_active = (
-                self.state == "playing" and pygame.key.get_pressed()[pygame.K_SPACE] and not self.player.can_punch()
+                self.state == "playing" and bool(self.buttons & ACTION_PUNCH) and not self.player.can_punch()
             )
+            while accumulator >= SIM_DT:
+                self.update(SIM_DT)
+                accumulator -= SIM_DT
+            self.draw(punch_active, accumulator / SIM_DT)
+            if self.spectator is not None:
+                self.spectator.publish(self)
+                self.profiler.lap("spectator.encode")
+            self.finish_frame(frame_start)
+
+    def run_threaded(self) -> None:
+        """Render loop for ``threaded``: ticks run on a SimulationThread and each frame draws its newest snapshot.
+
+        This thread keeps the window, events and keyboard, as SDL requires, and
+        forwards the action bitmask every frame. Particles are only drawn here, so
+        the simulation reaches them through a ParticleRelay.
+        """
+        source = self.input_source
+        if self.particles is not None:
+            self.particles = ParticleRelay(self.particles)
+        sim = self.sim = SimulationThread(self)
+        sim.publish()  # the first frame has a snapshot to draw before the thread has ticked
+        sim.start()
+        interval = SIM_DT / self.fast_forward
+        running = True
+        try:
+            while running:
+                self.clock.tick(self.render_hz)
+                frame_start = time.perf_counter()
+                scene = sim.frames.take()
+                running = self.handle_events(scene)
+                sim.inputs.append(source())
+                # Snapshots are taken as a tick ends, so the time since then says how far into the next tick we are.
+                self.render(scene, min(1.0, (frame_start - scene.time) * 1000 / interval))
+                self.finish_frame(frame_start)
+        finally:
+            sim.stop()
+
+    def handle_events(self, scene: "Game | FrameSnapshot") -> bool:
+        """Window, debug and menu keys; returns False once the window closes.
+
+        ``scene`` is what the player is looking at, which decides what R, W and
+        the menu do. State changes go through command().
+        """
+        running = True
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.WINDOWEXPOSED:
+                self.force_full_present = True
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.enabled = not self.profiler.enabled
+                self.profiler_layer = None
+                self.force_full_present = True
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and self.profiler.events:
+                self.profiler.dump_trace(self.trace_path)
+                print(f"Wrote {self.trace_path}")
+            if scene.state == "menu":
+                if event.type == pygame.MOUSEBUTTONDOWN and self.start_button.collidepoint(self.to_logical(event.pos)):
+                    self.command(self.reset)
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_RETURN, pygame.K_SPACE):
+                    self.command(self.reset)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r and scene.game_over:
+                self.command(self.reset)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_w and scene.state == "game_over":
+                self.command(self.retry_wave)
+        return running
+
+    def command(self, action: Callable[[], None]) -> None:
+        """Apply a state change now, or between ticks on the simulation thread when there is one."""
+        if self.sim is not None:
+            self.sim.inputs.append(action)
+        else:
+            action()
+
+    def retry_wave(self) -> None:
+        snapshot = self.wave_snapshots.get(self.wave)
+        if snapshot is not None:
+            self.restore(snapshot)
+
+    def finish_frame(self, frame_start: float) -> None:
+        self.profiler.end_frame()
+        if self.quality.record((time.perf_counter() - frame_start) * 1000):
+            self.force_full_present = True
+        if "first_frame" not in self.startup_ms:
+            self.startup_lap("first_frame")
+            if self.report_startup:
+                print(self.startup_report())
+
+    def run_headless(self, max_ticks: int, dt: float = SIM_DT, snapshot: GameSnapshot | None = None) -> int:
+        """Step a fresh session (or one restored from ``snapshot``) with a fixed dt and no rendering
+        until it ends or max_ticks pass."""
+        self.reset()
+        if snapshot is not None:
+            self.restore(snapshot)
+        ticks = 0
+        while ticks < max_ticks and not self.game_over:
             self.update(dt)
-            self.draw(punch_active)
+            self.profiler.end_frame()
+            ticks += 1
+        return ticks
 
-        pygame.quit()
-        sys.exit()
+
+def seed_arg(text: str) -> int:
+    """argparse type for --seed: replays store the seed as an unsigned 64-bit field."""
+    seed = int(text)
+    if not 0 <= seed < 1 << 64:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and 2**64 - 1, got {seed}")
+    return seed
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Skibidi City Showdown")
+    parser.add_argument("--headless", action="store_true", help="simulate without a window or rendering")
+    parser.add_argument("--ticks", type=int, default=FPS * 600, help="maximum simulation steps for --headless")
+    parser.add_argument("--fast-forward", type=int, default=1, help="simulation steps per rendered frame")
+    parser.add_argument("--vectorized", action="store_true", help="step toilets with the NumPy enemy store")
+    parser.add_argument("--dirty-rects", action="store_true", help="present only changed screen areas")
+    parser.add_argument(
+        "--render-scale", type=float, default=1.0, metavar="S",
+        help=f"render the scene at S times the window resolution ({MIN_RENDER_SCALE}-1) and upscale it",
+    )
+    parser.add_argument(
+        "--scaled", action="store_true",
+        help="open a pygame.SCALED window at the render resolution and let SDL stretch it (resizable)",
+    )
+    parser.add_argument("--smooth-upscale", action="store_true", help="upscale with smoothscale instead of nearest pixel")
+    parser.add_argument(
+        "--quality", type=int, choices=range(len(QUALITY_STEPS) + 1), metavar="DROPPED",
+        help=f"pin quality by dropping the first DROPPED of: {', '.join(QUALITY_STEPS)} (default: adapt to frame times)",
+    )
+    parser.add_argument("--render-hz", type=int, default=FPS, help="render frame cap (0 = uncapped); simulation stays fixed")
+    parser.add_argument(
+        "--threaded", action="store_true",
+        help="run the simulation on its own thread and render its latest snapshot on the main thread",
+    )
+    parser.add_argument("--endless", action="store_true", help="keep ramping waves past wave 8 instead of ending")
+    parser.add_argument("--squad", type=int, default=ALLY_SQUAD_SIZE, help="allies that join you from wave 7")
+    parser.add_argument("--seed", type=seed_arg, help="seed every session with this value instead of a random one")
+    parser.add_argument("--record", metavar="PATH", help="write the last played session to a replay file on exit")
+    parser.add_argument("--hash-interval", type=int, default=1, help="ticks between state hashes in recordings")
+    parser.add_argument("--replay", metavar="PATH", help="play a replay back headless and verify its state hashes")
+    parser.add_argument("--profile", action="store_true", help="start with the phase profiler overlay on (toggle with F3)")
+    parser.add_argument("--trace", default="trace.json", metavar="PATH", help="where F4 (or --headless --profile) writes a Chrome trace")
+    parser.add_argument("--startup-timing", action="store_true", help="print how long each startup phase took")
+    parser.add_argument("--snapshots", metavar="PATH", help="file the session's wave-start snapshots are written to on exit")
+    parser.add_argument("--start-wave", type=int, metavar="N", help="start from wave N's snapshot in the --snapshots file")
+    parser.add_argument(
+        "--serve", type=int, nargs="?", const=SPECTATOR_PORT, metavar="PORT",
+        help=f"stream state deltas to spectator.py clients on localhost (default port {SPECTATOR_PORT})",
+    )
+    return parser.parse_args(argv)
+
+
+def load_start_snapshot(path: str | None, wave: int) -> GameSnapshot:
+    if path is None:
+        sys.exit("--start-wave needs --snapshots PATH")
+    snapshots = GameSnapshot.load_all(path)
+    if wave not in snapshots:
+        sys.exit(f"{path} has no snapshot for wave {wave} (waves: {', '.join(map(str, sorted(snapshots))) or 'none'})")
+    return snapshots[wave]
 
 
 def main() -> None:
-    Game().run()
+    args = parse_args()
+    start = load_start_snapshot(args.snapshots, args.start_wave) if args.start_wave is not None else None
+    if args.replay:
+        try:
+            replay = Replay.load(args.replay)
+        except ValueError as error:
+            sys.exit(f"{args.replay}: {error}")
+        game = Game(headless=True, vectorized=replay.vectorized, squad_size=replay.squad_size, endless=replay.endless)
+        mismatch = game.play_replay(replay)
+        pygame.quit()
+        result = "verified" if mismatch is None else f"diverged at tick {mismatch}"
+        print(f"seed={replay.seed} ticks={len(replay.inputs)} state={game.state} wave={game.wave} score={game.score} {result}")
+        sys.exit(0 if mismatch is None else 1)
+    if args.headless:
+        game = Game(
+            headless=True,
+            vectorized=args.vectorized,
+            squad_size=args.squad,
+            seed=args.seed,
+            recorder=ReplayRecorder(args.record, args.hash_interval) if args.record else None,
+            endless=args.endless,
+            profile=args.profile,
+            trace_path=args.trace,
+            snapshot_path=args.snapshots,
+        )
+        if args.startup_timing:
+            print(game.startup_report())
+        ticks = game.run_headless(args.ticks, snapshot=start)
+        game.save_snapshots()
+        if game.recorder is not None:
+            game.recorder.save()
+        print(f"state={game.state} wave={game.wave} score={game.score} ticks={ticks} sim_ms={round(ticks * SIM_DT)}")
+        if args.profile:
+            for name, mean, worst in game.profiler.breakdown():
+                print(f"{name:<18} mean={mean:.3f}ms max={worst:.3f}ms")
+            game.profiler.dump_trace(args.trace)
+            print(f"Wrote {args.trace}")
+        pygame.quit()
+        return
+    Game(
+        fast_forward=args.fast_forward,
+        vectorized=args.vectorized,
+        dirty_rects=args.dirty_rects,
+        render_hz=args.render_hz,
+        squad_size=args.squad,
+        seed=args.seed,
+        recorder=ReplayRecorder(args.record, args.hash_interval) if args.record else None,
+        profile=args.profile,
+        trace_path=args.trace,
+        report_startup=args.startup_timing,
+        snapshot_path=args.snapshots,
+        spectator=SpectatorServer(port=args.serve) if args.serve is not None else None,
+        endless=args.endless,
+        quality=args.quality,
+        render_scale=args.render_scale,
+        scaled_display=args.scaled,
+        smooth_upscale=args.smooth_upscale,
+        threaded=args.threaded,
+    ).run(start)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,283 @@
+"""Thin spectator client for a game started with ``python main.py --serve``.
+
+Connects to the game over localhost TCP, applies the quantised keyframes and
+deltas it streams and draws the player, allies, toilets, ability effects and a
+small HUD from them. It runs no simulation of its own, so any number of
+spectators can watch one game.
+
+    python spectator.py
+    python spectator.py --port 8765 --frames 600
+"""
+
+import argparse
+import math
+import socket
+import sys
+from typing import Dict, List
+
+import pygame
+
+from main import (
+    FORM_PROFILES,
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    SPECTATOR_ALLY,
+    SPECTATOR_ANGRY,
+    SPECTATOR_HEADER,
+    SPECTATOR_KEYFRAME,
+    SPECTATOR_KINDS,
+    SPECTATOR_LENGTH,
+    SPECTATOR_PORT,
+    SPECTATOR_POSITION_SCALE,
+    SPECTATOR_REMOVE,
+    SPECTATOR_SPAWN,
+    SPECTATOR_STATES,
+    SPECTATOR_STUNNED,
+    SPECTATOR_UPDATE,
+    ULTRA_BLAST_RADIUS,
+    Ally,
+    CameraMan,
+    CityMap,
+    EffectRenderer,
+    FontLibrary,
+    SkibidiToilet,
+    TextCache,
+    ToiletSpriteCache,
+)
+
+FORMS = list(FORM_PROFILES)
+
+
+class SpectatorState:
+    """The scene as last described by the stream.
+
+    Toilets are plain SkibidiToilet objects keyed by their uid, so the game's
+    own sprite cache can draw them. Deltas are ignored until the first keyframe.
+    """
+
+    def __init__(self) -> None:
+        self.synced = False
+        self.tick = 0
+        self.state = "menu"
+        self.wave = 1
+        self.intermission_timer = 0
+        self.score = 0
+        self.player = CameraMan(pygame.Vector2(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 104), pygame.Vector2(1, 0))
+        self.effect_timers = (0, 0, 0, 0, 0)  # flash, soundwave, stun, stab, kick in ms
+        self.toilets: Dict[int, SkibidiToilet] = {}
+        self.allies: List[Ally] = []
+        self.messages = 0
+
+    def apply(self, body: bytes) -> None:
+        (
+            kind, tick, state, wave, intermission, score, form, health, x, y, facing,
+            flash, soundwave, stun, stab, kick, spawns, updates, removals, allies,
+        ) = SPECTATOR_HEADER.unpack_from(body)
+        if kind == SPECTATOR_KEYFRAME:
+            self.toilets.clear()
+            self.synced = True
+        elif not self.synced:
+            return
+        self.messages += 1
+        self.tick = tick
+        self.state = SPECTATOR_STATES[state]
+        self.wave = wave
+        self.intermission_timer = intermission * 10
+        self.score = score
+        self.effect_timers = tuple(timer * 4 for timer in (flash, soundwave, stun, stab, kick))
+        player = self.player
+        if player.form != FORMS[form]:
+            player.become(FORMS[form])
+        player.health = health
+        player.position.update(x / SPECTATOR_POSITION_SCALE, y / SPECTATOR_POSITION_SCALE)
+        player.facing.update(facing, 0)
+
+        offset = SPECTATOR_HEADER.size
+        for _ in range(spawns):
+            uid, toilet_kind, scale, wiggle, *colors, tx, ty, toilet_health, flags = SPECTATOR_SPAWN.unpack_from(body, offset)
+            offset += SPECTATOR_SPAWN.size
+            label = SPECTATOR_KINDS[toilet_kind]
+            toilet = SkibidiToilet(
+                pygame.Vector2(tx / SPECTATOR_POSITION_SCALE, ty / SPECTATOR_POSITION_SCALE),
+                toilet_health,
+                0.0,
+                label=label,
+                scale=scale / 20,
+                is_saint=label == "Saint",
+                is_medium=label == "Medium",
+                is_police=label == "Police",
+                wiggle_amp=wiggle / 20,
+                body_color=tuple(colors[0:3]),
+                rim_color=tuple(colors[3:6]),
+                eye_color=tuple(colors[6:9]),
+                uid=uid,
+            )
+            self.set_flags(toilet, flags)
+            self.toilets[uid] = toilet
+        for _ in range(updates):
+            uid, tx, ty, toilet_health, flags = SPECTATOR_UPDATE.unpack_from(body, offset)
+            offset += SPECTATOR_UPDATE.size
+            toilet = self.toilets.get(uid)
+            if toilet is not None:
+                toilet.position.update(tx / SPECTATOR_POSITION_SCALE, ty / SPECTATOR_POSITION_SCALE)
+                toilet.health = toilet_health
+                self.set_flags(toilet, flags)
+        for _ in range(removals):
+            (uid,) = SPECTATOR_REMOVE.unpack_from(body, offset)
+            offset += SPECTATOR_REMOVE.size
+            self.toilets.pop(uid, None)
+        self.allies = []
+        for _ in range(allies):
+            ax, ay, ally_health = SPECTATOR_ALLY.unpack_from(body, offset)
+            offset += SPECTATOR_ALLY.size
+            self.allies.append(Ally(pygame.Vector2(ax / SPECTATOR_POSITION_SCALE, ay / SPECTATOR_POSITION_SCALE), ally_health))
+
+    @staticmethod
+    def set_flags(toilet: SkibidiToilet, flags: int) -> None:
+        toilet.stun_timer = 1 if flags & SPECTATOR_STUNNED else 0
+        if flags & SPECTATOR_ANGRY and not toilet.angry:
+            toilet.angry = True
+            if toilet.is_saint:
+                toilet.eye_color = (160, 20, 20)
+
+    def animate(self, dt: int) -> None:
+        """Advance the purely visual bob and wobble between messages."""
+        self.player.bob_phase = (self.player.bob_phase + dt * 0.005) % (2 * math.pi)
+        for ally in self.allies:
+            ally.bob_phase = (ally.bob_phase + dt * 0.005) % (2 * math.pi)
+        for toilet in self.toilets.values():
+            toilet.wobble_phase = (toilet.wobble_phase + dt * 0.01) % (2 * math.pi)
+
+
+class SpectatorConnection:
+    """Non-blocking socket that yields complete length-prefixed messages."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.sock.setblocking(False)
+        self.buffer = bytearray()
+        self.closed = False
+
+    def poll(self) -> List[bytes]:
+        while True:
+            try:
+                chunk = self.sock.recv(1 << 16)
+            except BlockingIOError:
+                break
+            except ConnectionError:
+                chunk = b""
+            if not chunk:
+                self.closed = True
+                break
+            self.buffer += chunk
+        messages = []
+        offset = 0
+        while len(self.buffer) - offset >= SPECTATOR_LENGTH.size:
+            (length,) = SPECTATOR_LENGTH.unpack_from(self.buffer, offset)
+            end = offset + SPECTATOR_LENGTH.size + length
+            if end > len(self.buffer):
+                break
+            messages.append(bytes(self.buffer[offset + SPECTATOR_LENGTH.size:end]))
+            offset = end
+        del self.buffer[:offset]
+        return messages
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class SpectatorView:
+    """Draws a SpectatorState with the game's own sprite, effect and backdrop caches."""
+
+    def __init__(self, screen: pygame.Surface, address: str) -> None:
+        self.screen = screen
+        self.address = address
+        self.sprites = ToiletSpriteCache()
+        self.effects = EffectRenderer()
+        fonts = FontLibrary()
+        self.text = TextCache(fonts.font("arial", 20))
+        fonts.save()
+        # Buildings are not streamed; the static backdrop and street are enough to place the action.
+        self.cities = {mode: CityMap(mode, buildings=[]) for mode in ("street", "center")}
+
+    def draw(self, scene: SpectatorState) -> None:
+        screen = self.screen
+        self.cities["center" if scene.wave >= 7 else "street"].draw(screen)
+        if not scene.synced:
+            label = self.text.render(f"Waiting for {self.address}...", (210, 220, 235))
+            screen.blit(label, label.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+            return
+
+        player = scene.player
+        player.draw(screen)
+        for ally in scene.allies:
+            ally.draw(screen)
+        self.sprites.draw_all(screen, list(scene.toilets.values()), focus=player.position)
+
+        flash, _, stun, _, _ = scene.effect_timers
+        profile = player.profile
+        if flash > 0 and profile.flash == "blast":
+            overlay = self.effects.blast(ULTRA_BLAST_RADIUS, flash / 260)
+            screen.blit(overlay, (player.position.x - ULTRA_BLAST_RADIUS, player.position.y - ULTRA_BLAST_RADIUS))
+        elif flash > 0 or stun > 0:
+            rect = player.beam_rect()
+            overlay = self.effects.beam(rect.size, profile.flash == "stun", player.facing.x < 0, max(flash, stun) / 260)
+            screen.blit(overlay, rect.topleft)
+
+        lines = [
+            f"Spectating {self.address}",
+            f"Wave {scene.wave}   Score {scene.score}   {profile.label} {scene.player.health}/{profile.max_health}",
+        ]
+        if scene.state == "intermission":
+            lines.append(f"Intermission: next wave in {scene.intermission_timer / 1000:.1f}s")
+        elif scene.state in ("victory", "game_over"):
+            lines.append("City Secured!" if scene.state == "victory" else "Skibidi City Fell!")
+        for i, line in enumerate(lines):
+            screen.blit(self.text.render(line, (230, 235, 245)), (12, 12 + 24 * i))
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Watch a game started with main.py --serve.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SPECTATOR_PORT)
+    parser.add_argument("--frames", type=int, default=0, help="quit after this many frames (0 = until the game closes)")
+    parser.add_argument("--fps", type=int, default=60)
+    return parser.parse_args(argv)
+
+
+def run_spectator() -> None:
+    args = parse_args()
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Skibidi City Showdown - spectator")
+    address = f"{args.host}:{args.port}"
+    try:
+        connection = SpectatorConnection(args.host, args.port)
+    except OSError as error:
+        sys.exit(f"Could not connect to {address}: {error}")
+    scene = SpectatorState()
+    view = SpectatorView(screen, address)
+    clock = pygame.time.Clock()
+    frames = 0
+    running = True
+    while running and not connection.closed:
+        dt = clock.tick(args.fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        for message in connection.poll():
+            scene.apply(message)
+        scene.animate(dt)
+        view.draw(scene)
+        pygame.display.flip()
+        frames += 1
+        if args.frames and frames >= args.frames:
+            running = False
+    connection.close()
+    pygame.quit()
+    print(f"{scene.messages} messages, last tick {scene.tick}, wave {scene.wave}, score {scene.score}")
+
+
+if __name__ == "__main__":
+    run_spectator()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# Headless games open a window-less display; set the driver before anything initialises pygame.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from balance_sim import BotPolicy  # noqa: E402
+from main import Game  # noqa: E402
+
+
+@pytest.fixture(
+    params=[False, pytest.param(True, marks=pytest.mark.skipif(main.np is None, reason="needs numpy"))],
+    ids=["scalar", "swarm"],
+)
+def vectorized(request) -> bool:
+    """Runs a test once per enemy store."""
+    return request.param
+
+
+@pytest.fixture
+def new_game():
+    """Factory for a reset headless Game driven by the balance simulator's bot."""
+
+    def make(seed: int = 11, **options) -> Game:
+        game = Game(headless=True, seed=seed, **options)
+        game.reset()
+        game.input_source = BotPolicy(game)
+        return game
+
+    return make
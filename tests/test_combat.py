@@ -0,0 +1,41 @@
+import pygame
+
+import bench
+from main import CombatResolver, SkibidiToilet
+
+
+def test_hits_apply_in_queue_order_and_a_dead_toilet_takes_no_more():
+    toilet = SkibidiToilet(pygame.Vector2(100, 200), health=3, speed=1.0)
+    combat = CombatResolver()
+    combat.hit(toilet, "punch", 2, knock=pygame.Vector2(5, 0), stun=120)
+    combat.hit(toilet, "ally_punch", 2)
+    combat.hit(toilet, "blast", 4)
+
+    assert combat.resolve() == [toilet]
+    assert toilet.health == -1
+    assert toilet.position == pygame.Vector2(105, 200)
+    assert toilet.stun_timer == 120
+    assert [(event.kind, event.source) for event in combat.events] == [
+        ("hit", "punch"),
+        ("hit", "ally_punch"),
+        ("kill", "ally_punch"),
+    ]
+    assert combat.events[-1].score == toilet.score_value
+    assert not combat.pending
+
+
+def test_batched_removal_keeps_the_survivors_in_order(new_game, vectorized):
+    game = new_game(vectorized=vectorized)
+    game.start_wave(8)
+    bench.fill_horde(game, 30)
+    before = list(game.enemies)
+    dead = before[::3]
+    survivors = [(enemy.uid, tuple(enemy.position), enemy.health) for enemy in before if enemy not in dead]
+
+    game.remove_enemies(dead)
+
+    assert [(enemy.uid, tuple(enemy.position), enemy.health) for enemy in game.enemies] == survivors
+    if vectorized:
+        assert game.swarm.count == len(survivors)
+        assert [view.slot for view in game.enemies] == list(range(len(survivors)))
+        assert all(view.slot == -1 for view in dead)
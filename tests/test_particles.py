@@ -0,0 +1,68 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import pygame  # noqa: E402
+
+from balance_sim import BotPolicy  # noqa: E402
+from main import PARTICLE_KINDS, SIM_DT, Game, ParticleRelay, ParticleSystem  # noqa: E402
+
+
+def test_emits_wrap_around_the_ring_and_overwrite_the_oldest():
+    particles = ParticleSystem(capacity=8)
+    particles.emit("spark", [10.0], [20.0], count=5)
+    assert (particles.head, particles.live) == (5, 5)
+
+    particles.emit("spark", [300.0], [40.0], count=5)
+    assert (particles.head, particles.live) == (2, 8)
+    assert particles.position[:2, 0].tolist() == [300.0, 300.0]  # the two oldest were reused
+    assert particles.position[2:5, 0].tolist() == [10.0, 10.0, 10.0]
+
+    particles.emit("debris", [1.0, 2.0], [1.0, 2.0], count=50)  # more than fits: clamped to one full ring
+    assert (particles.head, particles.live) == (2, 8)
+
+
+def test_particles_expire_and_clear():
+    particles = ParticleSystem(capacity=64)
+    particles.emit("ember", [50.0, 60.0], [50.0, 60.0])
+    assert particles.live == 2 * PARTICLE_KINDS["ember"].count
+    particles.update(SIM_DT)
+    assert 0 < particles.live <= 2 * PARTICLE_KINDS["ember"].count
+    for _ in range(int(PARTICLE_KINDS["ember"].life / SIM_DT) + 1):
+        particles.update(SIM_DT)
+    assert particles.live == 0
+
+    particles.emit("dust", [5.0], [5.0])
+    particles.clear()
+    assert particles.live == 0 and not particles.life.any()
+
+
+def test_relay_replays_calls_in_order_when_drawn():
+    target = ParticleSystem(capacity=32)
+    relay = ParticleRelay(target)
+    relay.emit("spark", [10.0], [10.0], 4)
+    relay.update(SIM_DT)
+    relay.clear()
+    relay.emit("spark", [20.0], [20.0], 3)
+    assert target.live == 0  # nothing touches the arrays until the render thread draws
+
+    pygame.display.init()  # sprites are converted to the display format on first draw
+    assert relay.draw(pygame.display.set_mode((64, 64))) is not None
+    assert target.live == 3 and not relay.calls
+
+
+def test_particles_never_change_the_simulation():
+    games = []
+    for headless in (True, False):
+        game = Game(headless=headless, seed=8)
+        game.reset()
+        game.input_source = BotPolicy(game)
+        game.start_wave(4)
+        games.append(game)
+    plain, with_particles = games
+    assert plain.particles is None and with_particles.particles is not None
+    for tick in range(900):
+        plain.update(SIM_DT)
+        with_particles.update(SIM_DT)
+        assert with_particles.state_hash() == plain.state_hash(), f"particles changed the game at tick {tick}"
+    assert with_particles.particles.head > 0
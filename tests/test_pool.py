@@ -0,0 +1,35 @@
+import pygame
+
+import bench
+from main import ToiletPool
+
+
+def test_retired_toilets_come_back_only_after_recycle_and_reset():
+    pool = ToiletPool()
+    first = pool.acquire(10, 20, health=5, speed=1.0, angry=True, stun_timer=50, eye_color=(160, 20, 20))
+    first.prev_position = pygame.Vector2(8, 20)
+    position = first.position
+    pool.retire([first])
+
+    assert pool.acquire(30, 40, health=2, speed=0.5) is not first  # still described by this tick's events
+
+    pool.recycle()
+    again = pool.acquire(50, 60, health=3, speed=2.0)
+    assert again is first
+    assert again.position is position and again.position == pygame.Vector2(50, 60)
+    assert again.prev_position == pygame.Vector2(50, 60)
+    assert (again.health, again.speed, again.angry, again.stun_timer) == (3, 2.0, False, 0)
+    assert again.eye_color == (40, 40, 40)
+
+
+def test_a_warm_session_spawns_without_allocating_toilets(new_game, vectorized):
+    game = new_game(vectorized=vectorized)
+    game.start_wave(8)
+    bench.fill_horde(game, 40)
+    warm = list(game.enemies)  # held so their ids cannot be handed to new objects
+    game.remove_enemies(list(game.enemies))
+    game.toilet_pool.recycle()
+
+    bench.fill_horde(game, 40)
+
+    assert {id(enemy) for enemy in game.enemies} <= {id(enemy) for enemy in warm}
@@ -0,0 +1,96 @@
+import argparse
+import os
+import subprocess
+import sys
+import zlib
+
+import pytest
+
+import bench
+import main
+from main import (
+    ACTION_FLASH, ACTION_LEFT, ACTION_PUNCH, ACTION_RIGHT, ACTION_SPECIAL, SIM_DT, Game, Replay, ReplayRecorder, seed_arg,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def record(new_game, path, ticks: int = 1500, **options) -> Replay:
+    game = new_game(recorder=ReplayRecorder(str(path)), **options)
+    for _ in range(ticks):
+        game.update(SIM_DT)
+    game.recorder.save()
+    return Replay.load(str(path))
+
+
+def verify(replay: Replay) -> int | None:
+    game = Game(headless=True, vectorized=replay.vectorized, squad_size=replay.squad_size, endless=replay.endless)
+    return game.play_replay(replay)
+
+
+def test_replay_survives_a_byte_round_trip(new_game, tmp_path):
+    replay = record(new_game, tmp_path / "run.skr", ticks=600)
+    assert len(replay.inputs) == 600
+    assert any(replay.inputs)
+    assert Replay.from_bytes(replay.to_bytes()) == replay
+
+
+def test_recorded_session_verifies(new_game, tmp_path):
+    replay = record(new_game, tmp_path / "run.skr")
+    assert verify(replay) is None
+
+
+def test_changed_input_is_reported_as_a_divergence(new_game, tmp_path):
+    replay = record(new_game, tmp_path / "run.skr")
+    replay.inputs[300:330] = bytes((ACTION_LEFT,)) * 30
+    mismatch = verify(replay)
+    assert mismatch is not None and mismatch >= 300
+
+
+def test_other_format_versions_are_refused(new_game, tmp_path):
+    data = bytearray(record(new_game, tmp_path / "run.skr", ticks=60).to_bytes())
+    data[4] -= 1  # the version byte follows the 4-byte magic
+    with pytest.raises(ValueError):
+        Replay.from_bytes(bytes(data))
+
+
+def test_seed_arg_accepts_exactly_what_the_header_stores():
+    largest = (1 << 64) - 1
+    assert seed_arg("0") == 0 and seed_arg(str(largest)) == largest
+    for text in ("-1", str(1 << 64)):
+        with pytest.raises(argparse.ArgumentTypeError):
+            seed_arg(text)
+
+
+def test_headless_record_then_replay_from_the_command_line(tmp_path):
+    path = str(tmp_path / "headless.skr")
+    run = [sys.executable, os.path.join(ROOT, "main.py")]
+    subprocess.run([*run, "--headless", "--seed", "5", "--ticks", "900", "--record", path], check=True, cwd=tmp_path)
+    result = subprocess.run([*run, "--replay", path], capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "seed=5 ticks=" in result.stdout and result.stdout.rstrip().endswith("verified")
+
+
+# CRC32 of every tick's state hash in the scripted session below, at this REPLAY_VERSION. Anything that
+# moves it (movement, knockback, timer arithmetic) changes gameplay: bump REPLAY_VERSION and update it.
+PINNED_HASH = (6, 300676217)
+
+
+def scripted_buttons(tick: int) -> int:
+    walk = ACTION_RIGHT if tick // 90 % 2 else ACTION_LEFT
+    return walk | ACTION_PUNCH | (ACTION_FLASH if tick % 240 == 0 else 0) | (ACTION_SPECIAL if tick % 300 == 0 else 0)
+
+
+def test_state_hash_is_pinned_for_this_replay_version(vectorized):
+    game = Game(headless=True, seed=2024, squad_size=3, vectorized=vectorized)
+    game.reset()
+    game.input_source = lambda: scripted_buttons(game.tick)
+    game.start_wave(7)
+    bench.fill_horde(game, 60)
+    chain = 0
+    for _ in range(1200):
+        bench.keep_player_alive(game)
+        game.update(SIM_DT)
+        chain = zlib.crc32(game.state_hash().to_bytes(4, "little"), chain)
+    assert game.score > 0
+    assert (main.REPLAY_VERSION, chain) == PINNED_HASH
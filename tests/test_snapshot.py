@@ -0,0 +1,48 @@
+from main import SIM_DT, Game, GameSnapshot
+
+
+def play(game, ticks: int, buttons: list[int] | None = None) -> tuple[list[int], list[int]]:
+    """Step ``ticks`` ticks, replaying ``buttons`` if given; returns the buttons used and each tick's hash."""
+    used, hashes = [], []
+    if buttons is not None:
+        game.input_source = lambda: buttons[len(used)]
+    for _ in range(ticks):
+        game.update(SIM_DT)
+        used.append(game.buttons)
+        hashes.append(game.state_hash())
+    return used, hashes
+
+
+def test_restore_reproduces_the_state_and_what_follows(new_game, vectorized):
+    game = new_game(seed=7, squad_size=3, vectorized=vectorized)
+    game.start_wave(7)
+    play(game, 400)
+    snapshot = game.snapshot()
+    expected = game.state_hash()
+    buttons, hashes = play(game, 600)
+
+    game.restore(snapshot)
+    assert game.state_hash() == expected
+    assert play(game, 600, buttons)[1] == hashes
+
+    fresh = Game(headless=True, seed=99, squad_size=3, vectorized=vectorized)
+    fresh.reset()
+    fresh.restore(snapshot)
+    assert fresh.state_hash() == expected
+    assert play(fresh, 600, buttons)[1] == hashes
+
+
+def test_snapshot_file_round_trip(new_game, vectorized, tmp_path):
+    game = new_game(seed=4, vectorized=vectorized)
+    game.start_wave(3)
+    play(game, 300)
+    path = str(tmp_path / "waves.snap")
+    GameSnapshot.save_all(path, {game.wave: game.snapshot()})
+
+    loaded = GameSnapshot.load_all(path)
+    assert list(loaded) == [game.wave]
+    restored = Game(headless=True, vectorized=vectorized)
+    restored.reset()
+    restored.restore(loaded[game.wave])
+    assert restored.state_hash() == game.state_hash()
+    assert restored.snapshot().state == game.snapshot().state
@@ -0,0 +1,98 @@
+import bench
+from main import SIM_DT, SPECTATOR_LENGTH, SPECTATOR_POSITION_SCALE, SpectatorServer, quantise
+from spectator import SpectatorState
+
+
+def unframe(message: bytes) -> bytes:
+    """The body SpectatorConnection.poll() would hand to apply()."""
+    (length,) = SPECTATOR_LENGTH.unpack_from(message)
+    assert len(message) == SPECTATOR_LENGTH.size + length
+    return message[SPECTATOR_LENGTH.size:]
+
+
+def describe(game) -> dict:
+    """What a spectator should see of ``game``, at the stream's precision."""
+    return {
+        "tick": game.tick,
+        "state": game.state,
+        "wave": game.wave,
+        "score": game.score,
+        "intermission": int(game.intermission_timer // 10) * 10,
+        "effects": tuple(
+            min(255, int(timer // 4)) * 4
+            for timer in (
+                game.flash_active_time,
+                game.soundwave_active_time,
+                game.stun_active_time,
+                game.stab_active_time,
+                game.kick_active_time,
+            )
+        ),
+        "player": (game.player.form, game.player.health, quantise(game.player.position.x), quantise(game.player.position.y)),
+        "toilets": {
+            enemy.uid: (quantise(enemy.position.x), quantise(enemy.position.y), enemy.health, enemy.stun_timer > 0)
+            for enemy in game.enemies
+        },
+        "allies": [(quantise(ally.position.x), quantise(ally.position.y), ally.health) for ally in game.allies],
+    }
+
+
+def decoded(scene: SpectatorState) -> dict:
+    def units(value: float) -> int:
+        return round(value * SPECTATOR_POSITION_SCALE)
+
+    player = scene.player
+    return {
+        "tick": scene.tick,
+        "state": scene.state,
+        "wave": scene.wave,
+        "score": scene.score,
+        "intermission": scene.intermission_timer,
+        "effects": scene.effect_timers,
+        "player": (player.form, player.health, units(player.position.x), units(player.position.y)),
+        "toilets": {
+            uid: (units(toilet.position.x), units(toilet.position.y), toilet.health, toilet.stun_timer > 0)
+            for uid, toilet in scene.toilets.items()
+        },
+        "allies": [(units(ally.position.x), units(ally.position.y), ally.health) for ally in scene.allies],
+    }
+
+
+def test_decoded_stream_tracks_the_game(new_game, vectorized):
+    game = new_game(seed=7, squad_size=4, vectorized=vectorized)
+    game.start_wave(7)
+    server = SpectatorServer()
+    scene = SpectatorState()
+
+    scene.apply(unframe(server.encode(game, keyframe=False)))
+    assert not scene.synced  # deltas mean nothing before the first keyframe
+
+    scene.apply(unframe(server.encode(game, keyframe=True)))
+    removals = 0
+    for frame in range(400):
+        bench.keep_player_alive(game)
+        if frame % 100 == 0:
+            bench.fill_horde(game, 120)
+        before = {enemy.uid for enemy in game.enemies}
+        for _ in range(2):  # one message batches every tick since the last frame
+            game.update(SIM_DT)
+        removals += len(before - {enemy.uid for enemy in game.enemies})
+        scene.apply(unframe(server.encode(game, keyframe=False)))
+        assert decoded(scene) == describe(game), f"spectator out of sync at frame {frame}"
+    assert removals and scene.messages == 401
+
+
+def test_a_keyframe_syncs_a_late_joiner(new_game, vectorized):
+    game = new_game(seed=3, vectorized=vectorized)
+    game.start_wave(6)
+    bench.fill_horde(game, 60)
+    server = SpectatorServer()
+    server.encode(game, keyframe=True)
+    for _ in range(120):
+        game.update(SIM_DT)
+        server.encode(game, keyframe=False)
+
+    late = SpectatorState()
+    late.apply(unframe(server.encode(game, keyframe=True)))
+    assert late.synced
+    assert decoded(late) == describe(game)
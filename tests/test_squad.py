@@ -0,0 +1,30 @@
+import bench
+from main import ALLY_RETARGET_INTERVAL, SCREEN_WIDTH, SIM_DT, AllySquad
+
+
+def test_formation_staggers_retargeting_across_the_squad():
+    allies = AllySquad.formation(SCREEN_WIDTH / 2, 6)
+    timers = [ally.retarget_timer for ally in allies]
+    assert len(set(timers)) == len(allies)
+    assert all(0 <= timer < ALLY_RETARGET_INTERVAL for timer in timers)
+    xs = [ally.position.x for ally in allies]
+    assert xs == sorted(xs) and 26 <= xs[0] and xs[-1] <= SCREEN_WIDTH - 26
+
+
+def test_ally_targets_are_always_live_toilets(new_game, vectorized):
+    game = new_game(seed=5, squad_size=4, vectorized=vectorized)
+    game.start_wave(7)
+    targeted = False
+    for tick in range(900):
+        bench.keep_player_alive(game)
+        if tick % 150 == 0:
+            bench.fill_horde(game, 80)
+        game.update(SIM_DT)
+        live = {id(enemy) for enemy in game.enemies}
+        for ally in game.allies:
+            if ally.target is not None:
+                targeted = True
+                # A killed toilet goes back to the pool and may be respawned as a new one, so a
+                # target that is not in the enemy list would point at the wrong toilet.
+                assert id(ally.target) in live, f"stale ally target at tick {tick}"
+    assert targeted
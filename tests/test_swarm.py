@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+import bench  # noqa: E402
+from main import SIM_DT  # noqa: E402
+
+
+def play_side_by_side(scalar, swarm, ticks: int, per_tick=None) -> None:
+    for tick in range(ticks):
+        for game in (scalar, swarm):
+            if per_tick is not None:
+                per_tick(game, tick)
+            game.update(SIM_DT)
+        assert swarm.state_hash() == scalar.state_hash(), f"stores diverged at tick {tick}"
+
+
+@pytest.mark.parametrize("wave", [1, 5, 8])
+def test_vectorized_store_plays_the_same_game(new_game, wave):
+    scalar, swarm = new_game(seed=3), new_game(seed=3, vectorized=True)
+    for game in (scalar, swarm):
+        game.start_wave(wave)
+    play_side_by_side(scalar, swarm, 900)
+
+
+def test_vectorized_store_matches_under_a_horde_with_allies(new_game):
+    scalar, swarm = new_game(seed=9, squad_size=4), new_game(seed=9, squad_size=4, vectorized=True)
+    for game in (scalar, swarm):
+        game.start_wave(7)
+        bench.fill_horde(game, 150)
+
+    def per_tick(game, tick):
+        bench.keep_player_alive(game)
+        if tick % 200 == 0:
+            bench.fill_horde(game, 150)
+
+    play_side_by_side(scalar, swarm, 600, per_tick)